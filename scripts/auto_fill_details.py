@@ -1,7 +1,12 @@
 import re
-import json
+import argparse
 from pathlib import Path
 
+from catalog_io import CatalogWriter, iter_entries
+from change_log import ChangeLog, log_details, print_change_report
+from classification import load_engine
+from snapshot_store import record_catalog
+
 DATA_PATH = Path(r"S:\MedCare\src\data\medicines.json")
 
 DETAIL_LABELS = [
@@ -19,37 +24,18 @@ DETAIL_LABELS = [
     "Storage",
 ]
 
+# Strength in a display name. Looser than name_parser's folder-name pattern on purpose:
+# decimal ml/g amounts and dosages glued to the name ("Tadalafil20mg") count as well.
 DOSAGE_PATTERN = re.compile(r"(\d+(?:\.\d+)?)\s*(mg|ml|g)\b", re.IGNORECASE)
 
-# Simple active ingredient heuristics by category
-ACTIVE_KEYWORDS = [
-    # ED
-    "sildenafil", "tadalafil", "vardenafil", "avanafil", "dapoxetine",
-    # Antibiotics / antiparasitic
-    "azithromycin", "amoxicillin", "cefadroxil", "cefixime", "cefpodoxime", "ceftriaxone",
-    "doxycycline", "levofloxacin", "moxifloxacin", "roxithromycin", "clindamycin",
-    "ivermectin", "mebendazole", "triclabendazole", "nitazoxanide", "piperacillin", "tazobactam",
-    # Antiviral
-    "oseltamivir", "valacyclovir", "molnupiravir", "sofosbuvir", "ledipasvir", "daclatasvir", "velpatasvir", "ganciclovir",
-    # Hormones & Steroids
-    "testosterone", "progesterone", "anastrozole", "nandrolone", "methandienone", "minoxidil", "estradiol", "cyproterone",
-    "dienogest", "mesterolone", "enclomiphene", "clomiphene",
-    # Anti-malarial
-    "artemether", "lumefantrine", "artesunate", "hydroxychloroquine",
-    # Pain Relief
-    "naproxen", "carisoprodol", "amitriptyline", "paracetamol",
-]
-
-def load_json(path: Path):
-    with path.open("r", encoding="utf-8") as f:
-        return json.load(f)
-
-def save_json(path: Path, data):
-    with path.open("w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
-
+# Active ingredient names come from the shared keyword dataset (classification_keywords.json)
+ENGINE = load_engine()
 
 def infer_strength(entry):
+    """
+    >>> [infer_strength({"name": n}) for n in ("Lasix 2.5 ml", "Zolpidem 1.5g", "Foo 0.5 ml drops", "Tadalafil20mg Tablets")]
+    ['2.5 ml', '1.5 g', '0.5 ml', '20 mg']
+    """
     # Prefer explicit strength field
     s = str(entry.get("strength", "")).strip()
     if s:
@@ -63,19 +49,8 @@ def infer_strength(entry):
 
 
 def infer_actives(entry):
-    name = str(entry.get("name", "")).lower()
-    hits = []
-    for kw in ACTIVE_KEYWORDS:
-        if kw in name:
-            hits.append(kw)
-    # Keep unique order of appearance
-    seen = set()
-    out = []
-    for kw in hits:
-        if kw not in seen:
-            seen.add(kw)
-            out.append(kw)
-    return out[:2]  # limit to two actives for readability
+    # Unique, in dataset order; limit to two actives for readability
+    return ENGINE.find_ingredients(str(entry.get("name", "")), limit=2)
 
 
 def infer_composition(entry):
@@ -159,17 +134,33 @@ def normalize_details(entry):
     entry["details"] = merged
 
 
+STAGE = "auto-fill"
+
+
+def fill_entry(entry, log: ChangeLog = None) -> bool:
+    """Auto-fill one entry in place. Returns True if its details changed;
+    each changed details row is recorded in log."""
+    before = entry.get("details") or []
+    normalize_details(entry)
+    return log_details(log, entry.get("id"), STAGE, before, entry["details"])
+
+
 def main():
-    data = load_json(DATA_PATH)
+    parser = argparse.ArgumentParser(description="Auto-fill missing details in medicines.json")
+    parser.add_argument("--path", type=str, default=str(DATA_PATH), help="Path to medicines.json")
+    parser.add_argument("--audit", type=str, default=None, help="Write every changed field (id, field, before, after) to this JSON file")
+    args = parser.parse_args()
+
+    # Stream entry-by-entry: memory stays flat regardless of catalog size
     updated = 0
-    for e in data:
-        before = json.dumps(e.get("details") or [], ensure_ascii=False)
-        normalize_details(e)
-        after = json.dumps(e.get("details") or [], ensure_ascii=False)
-        if before != after:
-            updated += 1
-    save_json(DATA_PATH, data)
-    print(f"Auto-filled details for {updated} medicines. Total: {len(data)}")
+    with ChangeLog(args.audit) as log, CatalogWriter(args.path) as out:
+        for e in iter_entries(args.path):
+            if fill_entry(e, log):
+                updated += 1
+            out.write(e)
+    print(f"Auto-filled details for {updated} medicines. Total: {out.count}")
+    print_change_report(log)
+    record_catalog(args.path)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1 @@
+"""Scale benchmarks for the catalog scripts (see run_benchmarks.py)."""
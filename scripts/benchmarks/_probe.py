@@ -0,0 +1,55 @@
+"""Run one script as __main__ and record its wall time and peak memory.
+
+Invoked by run_benchmarks.py in a fresh interpreter per measurement:
+  python _probe.py <result.json> <script.py> [script args...]
+"""
+from __future__ import annotations
+import os
+import sys
+import json
+import time
+import runpy
+from typing import Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+try:
+    import psutil
+except Exception:  # pragma: no cover - optional dependency
+    psutil = None
+
+
+def peak_rss_mb() -> Optional[float]:
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is KiB on Linux, bytes on macOS
+        return peak / (1 << 20) if sys.platform == "darwin" else peak / 1024
+    if psutil is not None:
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss) / (1 << 20)
+    return None
+
+
+def main() -> None:
+    result_path, script = sys.argv[1], sys.argv[2]
+    sys.argv = [script] + sys.argv[3:]
+    sys.path[0] = os.path.dirname(os.path.abspath(script))
+    error = None
+    start = time.perf_counter()
+    try:
+        runpy.run_path(script, run_name="__main__")
+    except SystemExit as e:
+        if e.code not in (None, 0):
+            error = f"exit code {e.code}"
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    seconds = time.perf_counter() - start
+    with open(result_path, "w", encoding="utf-8") as f:
+        json.dump({"seconds": seconds, "peak_rss_mb": peak_rss_mb(), "error": error}, f)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""Time and memory-profile the catalog scripts on synthetic data at several catalog sizes.
+
+For every (script, scale) pair a fresh synthetic fixture is built in a temp directory
+(see synthetic.py; setup is not timed). The script then runs through its normal CLI
+in a new interpreter, which records wall time and peak RSS. Scales are multiples of
+the current catalog (517 entries, ~1,000 images), so --scales 1 10 100 answers "what
+happens at 10x / 100x".
+
+Results are saved as JSON (--save) and can be compared against an earlier baseline
+(--baseline). Any script that got slower or bigger than --tolerance is reported and
+the exit code is 1, so this can gate a change.
+
+Benchmarked scripts: generate_unified, categorize, merge_medicines, merge_old_details,
+auto_fill, fix_encoding.
+
+Usage (PowerShell):
+  py .\\scripts\\benchmarks\\run_benchmarks.py --scales 1 10 --save .\\scripts\\benchmarks\\baseline.json
+  py .\\scripts\\benchmarks\\run_benchmarks.py --scales 1 10 --baseline .\\scripts\\benchmarks\\baseline.json
+  py .\\scripts\\benchmarks\\run_benchmarks.py --only categorize auto_fill --scales 100 --repeat 3
+"""
+from __future__ import annotations
+import os
+import sys
+import json
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SCRIPTS_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, SCRIPTS_DIR)
+
+from synthetic import BASE_ENTRIES, make_catalog, make_flat_tree, make_medicine_tree, medicine_names  # noqa: E402
+
+BASELINE_VERSION = 1
+
+# setup(workdir, count) -> (script file, CLI args)
+Setup = Callable[[str, int], Tuple[str, List[str]]]
+
+
+def setup_generate_unified(work: str, count: int) -> Tuple[str, List[str]]:
+    tree = os.path.join(work, "medicines")
+    make_medicine_tree(tree, count)
+    return "generate_unified_medicines_json.py", [
+        "--medicines-dir", tree,
+        "--public-dir", os.path.join(work, "public"),
+        "--output", os.path.join(work, "medicines.json"),
+        "--copy-images",
+    ]
+
+
+def setup_categorize(work: str, count: int) -> Tuple[str, List[str]]:
+    base = os.path.join(work, "final_web")
+    make_flat_tree(base, count)
+    return "categorize_medicines.py", ["--base-dir", base]
+
+
+def setup_merge_medicines(work: str, count: int) -> Tuple[str, List[str]]:
+    # Two sources sharing a fifth of their names, so duplicate renaming is exercised
+    names = medicine_names(count, seed=0)
+    first, second = names[: count // 2], names[count // 2:]
+    second = first[: len(first) // 5] + second
+    sources = [os.path.join(work, "final_web"), os.path.join(work, "final_web_2")]
+    make_medicine_tree(sources[0], len(first), seed=1, images=1, names=first)
+    make_medicine_tree(sources[1], len(second), seed=2, images=1, names=second)
+    args = ["--medicines-dir", os.path.join(work, "medicines")]
+    for src in sources:
+        args += ["--source-dir", src]
+    return "merge_medicines.py", args
+
+
+def setup_merge_old_details(work: str, count: int) -> Tuple[str, List[str]]:
+    current = os.path.join(work, "medicines.json")
+    previous = os.path.join(work, "medicines.previous.json")
+    make_catalog(current, count)
+    make_catalog(previous, count, filled=True)
+    return "merge_old_details.py", ["--path", current, "--previous", previous]
+
+
+def setup_auto_fill(work: str, count: int) -> Tuple[str, List[str]]:
+    path = os.path.join(work, "medicines.json")
+    make_catalog(path, count)
+    return "auto_fill_details.py", ["--path", path]
+
+
+def setup_fix_encoding(work: str, count: int) -> Tuple[str, List[str]]:
+    path = os.path.join(work, "medicines.json")
+    make_catalog(path, count, filled=True)
+    return "fix_encoding_artifacts.py", ["--path", path]
+
+
+BENCHMARKS: Dict[str, Setup] = {
+    "generate_unified": setup_generate_unified,
+    "categorize": setup_categorize,
+    "merge_medicines": setup_merge_medicines,
+    "merge_old_details": setup_merge_old_details,
+    "auto_fill": setup_auto_fill,
+    "fix_encoding": setup_fix_encoding,
+}
+
+
+def run_once(name: str, count: int, keep: bool = False) -> Dict:
+    work = tempfile.mkdtemp(prefix=f"medcare-bench-{name}-")
+    try:
+        script, args = BENCHMARKS[name](work, count)
+        result_path = os.path.join(work, "probe.json")
+        cmd = [sys.executable, os.path.join(BENCH_DIR, "_probe.py"), result_path, os.path.join(SCRIPTS_DIR, script)] + args
+        subprocess.run(cmd, cwd=work, stdout=subprocess.DEVNULL, check=True)
+        with open(result_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    finally:
+        if keep:
+            print(f"  kept: {work}")
+        else:
+            shutil.rmtree(work, ignore_errors=True)
+
+
+def run_benchmark(name: str, scale: float, repeat: int, keep: bool = False) -> Dict:
+    """Best wall time and largest peak RSS over `repeat` fresh runs."""
+    count = max(1, int(BASE_ENTRIES * scale))
+    runs = [run_once(name, count, keep) for _ in range(repeat)]
+    errors = [r["error"] for r in runs if r.get("error")]
+    peaks = [r["peak_rss_mb"] for r in runs if r.get("peak_rss_mb") is not None]
+    return {
+        "script": name,
+        "scale": scale,
+        "entries": count,
+        "seconds": round(min(r["seconds"] for r in runs), 4),
+        "peak_rss_mb": round(max(peaks), 1) if peaks else None,
+        "error": errors[0] if errors else None,
+    }
+
+
+def load_baseline(path: str) -> Dict[Tuple[str, float], Dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if data.get("version") != BASELINE_VERSION:
+        raise ValueError(f"{path}: unsupported baseline version {data.get('version')}")
+    return {(r["script"], float(r["scale"])): r for r in data.get("results", [])}
+
+
+def compare(result: Dict, base: Optional[Dict], tolerance: float) -> List[str]:
+    if not base:
+        return []
+    problems = []
+    for key, unit in (("seconds", "s"), ("peak_rss_mb", " MB")):
+        new, old = result.get(key), base.get(key)
+        if new is None or not old:
+            continue
+        if new > old * (1 + tolerance):
+            problems.append(f"{key} {old}{unit} -> {new}{unit} (+{(new / old - 1) * 100:.0f}%)")
+    return problems
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the catalog scripts on synthetic data.")
+    parser.add_argument("--scales", type=float, nargs="+", default=[1, 10], help=f"Catalog sizes as multiples of {BASE_ENTRIES} entries")
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), default=None, help="Benchmark only these scripts")
+    parser.add_argument("--repeat", type=int, default=1, help="Fresh runs per measurement (best time is kept)")
+    parser.add_argument("--save", default=None, help="Write results as a JSON baseline")
+    parser.add_argument("--baseline", default=None, help="Compare against a saved baseline and report regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown/growth before a regression is reported (0.25 = 25%%)")
+    parser.add_argument("--keep", action="store_true", help="Keep the synthetic work directories")
+    args = parser.parse_args()
+
+    baseline = load_baseline(args.baseline) if args.baseline else {}
+    results: List[Dict] = []
+    regressions = 0
+    print(f"{'script':<18} {'scale':>6} {'entries':>8} {'seconds':>9} {'peak MB':>8}")
+    for name in args.only or list(BENCHMARKS):
+        for scale in args.scales:
+            r = run_benchmark(name, scale, args.repeat, args.keep)
+            results.append(r)
+            peak = f"{r['peak_rss_mb']:.1f}" if r["peak_rss_mb"] is not None else "n/a"
+            print(f"{name:<18} {scale:>6g} {r['entries']:>8} {r['seconds']:>9.3f} {peak:>8}")
+            if r["error"]:
+                print(f"  ERROR: {r['error']}")
+            for problem in compare(r, baseline.get((name, float(scale))), args.tolerance):
+                print(f"  REGRESSION: {problem}")
+                regressions += 1
+
+    if args.save:
+        data = {
+            "version": BASELINE_VERSION,
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "results": results,
+        }
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+        print(f"\n  Wrote: {args.save} ({len(results)} results)")
+    if args.baseline:
+        print(f"\nSummary: {regressions} regression(s) against {args.baseline}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
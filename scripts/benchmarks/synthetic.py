@@ -0,0 +1,138 @@
+"""Synthetic fixtures shaped like the real catalog, at any size.
+
+  make_medicine_tree()  <root>/<Category>/<medicine folder>/<images>, as produced by merge_medicines.py
+  make_flat_tree()      uncategorized medicine folders, as categorize_medicines.py expects
+  make_catalog()        a medicines.json-style array (details rows, mojibake in some strings)
+
+Names mix real keywords from categorize_medicines.CATEGORY_KEYWORDS with brand-like
+stems, dosages ("20mg", "2.5 mg", "10 ml"), form words and _vN suffixes, so the name
+parser, categorizer and matchers do the same work they do on real data. Images are
+dummy bytes (the scripts only list, hash and copy them). Output is deterministic for
+a given seed.
+"""
+from __future__ import annotations
+import os
+import json
+import random
+from typing import Dict, List, Optional
+
+from categorize_medicines import CATEGORY_KEYWORDS, UNCLEAR_CATEGORY
+
+# Current size of the real catalog; scales in run_benchmarks.py are multiples of it
+BASE_ENTRIES = 517
+IMAGES_PER_MEDICINE = 2
+
+BRAND_STEMS = ["vida", "tada", "cen", "fil", "ivo", "hydro", "zo", "max", "pro", "neo", "ari", "lu", "cor", "derm", "gastro"]
+BRAND_SUFFIXES = ["lista", "force", "rise", "mectin", "vir", "cort", "pril", "zole", "fen", "tab", "ex", "ra"]
+FORM_WORDS = ["Tablets", "tablet", "Capsules", "injection", "Oral Jelly", "gel", "cream", "syrup", ""]
+DOSAGES = ["{n}mg", "{n} mg", "{n}.5mg", "{n} ml", "{n}g", ""]
+MOJIBAKE = ["â€™", "â€“", "ΓÇô", "┬░", "Ã©"]
+
+
+def _name(rng: random.Random, i: int) -> str:
+    parts = []
+    if rng.random() < 0.75:
+        _, keywords = rng.choice(CATEGORY_KEYWORDS)
+        parts.append(rng.choice(keywords))
+    parts.insert(0, rng.choice(BRAND_STEMS) + rng.choice(BRAND_SUFFIXES) + str(i))
+    dose = rng.choice(DOSAGES).format(n=rng.choice([1, 2, 5, 10, 20, 40, 60, 100, 200, 500]))
+    form = rng.choice(FORM_WORDS)
+    if rng.random() < 0.5:
+        parts = [dose] + parts + [form]
+    else:
+        parts = parts + [form, dose]
+    name = "-".join(p.replace(" ", "-") for p in parts if p)
+    if rng.random() < 0.05:
+        name += f"_v{rng.randint(1, 3)}"
+    return name
+
+
+def medicine_names(count: int, seed: int = 0) -> List[str]:
+    rng = random.Random(seed)
+    return [_name(rng, i) for i in range(count)]
+
+
+def _write_images(folder: str, rng: random.Random, images: int, image_bytes: int) -> None:
+    os.makedirs(folder, exist_ok=True)
+    for j in range(images):
+        ext = rng.choice([".jpg", ".jpg", ".png", ".webp"])
+        with open(os.path.join(folder, f"{j + 1}{ext}"), "wb") as f:
+            f.write(rng.randbytes(image_bytes))
+
+
+def make_medicine_tree(
+    root: str,
+    count: int,
+    seed: int = 0,
+    images: int = IMAGES_PER_MEDICINE,
+    image_bytes: int = 4096,
+    names: Optional[List[str]] = None,
+) -> int:
+    """Categorized tree: <root>/<Category>/<medicine>/<images>. Returns the number of folders."""
+    rng = random.Random(seed)
+    categories = [c for c, _ in CATEGORY_KEYWORDS] + [UNCLEAR_CATEGORY]
+    names = names or medicine_names(count, seed)
+    for name in names:
+        _write_images(os.path.join(root, rng.choice(categories), name), rng, images, image_bytes)
+    return len(names)
+
+
+def make_flat_tree(root: str, count: int, seed: int = 0, images: int = 1, image_bytes: int = 1024) -> int:
+    """Uncategorized folders directly under root. Returns the number of folders."""
+    rng = random.Random(seed)
+    names = medicine_names(count, seed)
+    for name in names:
+        _write_images(os.path.join(root, name), rng, images, image_bytes)
+    return len(names)
+
+
+def _details(rng: random.Random, name: str, filled: bool) -> List[Dict[str, str]]:
+    def value(text: str) -> str:
+        if not filled:
+            return ""
+        return text + (rng.choice(MOJIBAKE) if rng.random() < 0.2 else "")
+
+    return [
+        {"label": "Brand Name", "value": name},
+        {"label": "Manufacturer", "value": "Generic"},
+        {"label": "Strength", "value": value("20 mg")},
+        {"label": "Composition", "value": value("Tadalafil (20mg)")},
+        {"label": "Form", "value": "Tablet"},
+        {"label": "Pack Size", "value": value("1 x 10 Tablets")},
+        {"label": "Packaging Type", "value": value("Strip")},
+        {"label": "Tablets in a Strip", "value": value("10")},
+        {"label": "Shelf Life", "value": value("24 Months")},
+        {"label": "Category", "value": "Erectile Dysfunction"},
+        {"label": "Medicine Type", "value": value("Allopathic")},
+        {"label": "Storage", "value": value("Store below 30┬░C")},
+    ]
+
+
+def make_catalog(path: str, count: int, seed: int = 0, filled: bool = False) -> int:
+    """Write a medicines.json-style catalog. filled=True gives a 'previous snapshot' with details."""
+    from name_parser import parse_name
+
+    rng = random.Random(seed)
+    entries = []
+    for name in medicine_names(count, seed):
+        parsed = parse_name(name)
+        slug = name.lower().replace("_", "-")
+        entries.append({
+            "id": slug,
+            "name": parsed.display_name,
+            "category": rng.choice(CATEGORY_KEYWORDS)[0].replace("_", " "),
+            "price": rng.choice([10, 12, 18, 25, 45]),
+            "form": parsed.form,
+            "strength": parsed.dosage or "",
+            "image": f"/medicines/{slug}/1.jpg",
+            "images": [f"/medicines/{slug}/1.jpg", f"/medicines/{slug}/2.jpg"],
+            "inStock": True,
+            "description": f"{parsed.display_name} - {parsed.form}" + (rng.choice(MOJIBAKE) if rng.random() < 0.1 else ""),
+            "manufacturer": "Generic",
+            "requiresPrescription": True,
+            "details": _details(rng, parsed.display_name, filled),
+            "slug": slug,
+        })
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(entries, f, indent=2, ensure_ascii=False)
+    return len(entries)
@@ -0,0 +1,235 @@
+"""Streaming reader/writer for catalog JSON files (a top-level array of entries).
+
+iter_entries() decodes one array element at a time from a buffered file, so peak
+memory is one entry plus a read chunk regardless of catalog size. load_json() parses
+a whole file with a single decode (memory-mapping large files instead of reading
+them into a bytes copy first).
+
+The encoding of every file is sniffed once from its first bytes (sniff_encoding):
+a UTF-8/16/32 BOM, or for BOM-less files the NUL-byte pattern of the first four
+bytes. JSON text starts with an ASCII character, so UTF-16 and UTF-32 files saved
+without a BOM (e.g. by PowerShell redirection) are recognized without trial decoding.
+CatalogWriter writes entries as they are produced, in the same layout as
+json.dump(data, f, indent=2), to a temporary file that replaces the target on
+close. Reading and rewriting the same path in one pass is therefore safe, and a
+failed run leaves the original file untouched.
+
+Usage:
+    from catalog_io import CatalogWriter, iter_entries
+
+    with CatalogWriter(path) as out:
+        for entry in iter_entries(path):
+            entry["name"] = entry["name"].strip()
+            out.write(entry)
+"""
+from __future__ import annotations
+import os
+import json
+import mmap
+import codecs
+import shutil
+import tempfile
+from typing import Any, Iterable, Iterator, Optional, Tuple
+
+CHUNK_SIZE = 1 << 16
+# load_json() memory-maps files at least this large
+MMAP_THRESHOLD = 8 << 20
+
+# UTF-32 LE must be tested before UTF-16 LE: its BOM starts with the UTF-16 LE one
+_BOMS = (
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+_WHITESPACE = " \t\n\r"
+
+
+def detect_encoding(head: bytes) -> str:
+    """Encoding of JSON text from its first (up to) four bytes."""
+    for bom, enc in _BOMS:
+        if head.startswith(bom):
+            return enc
+    # No BOM: the first character is ASCII, so its NUL bytes give the width and byte order
+    if len(head) >= 4:
+        if head[:3] == b"\0\0\0":
+            return "utf-32-be"
+        if head[1:4] == b"\0\0\0":
+            return "utf-32-le"
+    if len(head) >= 2:
+        if head[0] == 0:
+            return "utf-16-be"
+        if head[1] == 0:
+            return "utf-16-le"
+    return "utf-8"
+
+
+def sniff_encoding(path: str) -> str:
+    """Pick the text encoding of a JSON file from its first bytes (UTF-8 when nothing else fits)."""
+    with open(path, "rb") as f:
+        head = f.read(4)
+    return detect_encoding(head)
+
+
+def load_json(path: str, use_mmap: Optional[bool] = None) -> Tuple[Any, str]:
+    """Parse a whole JSON file: one decode, one parse. Returns (data, encoding).
+
+    use_mmap=None maps files of MMAP_THRESHOLD bytes or more; the decoder then reads
+    straight from the page cache instead of from a bytes copy of the file."""
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        encoding = detect_encoding(f.read(4))
+        f.seek(0)
+        if use_mmap is None:
+            use_mmap = size >= MMAP_THRESHOLD
+        if use_mmap and size:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                text = codecs.decode(mm, encoding)
+        else:
+            text = codecs.decode(f.read(), encoding)
+    return json.loads(text), encoding
+
+
+def iter_entries(path: str, encoding: Optional[str] = None) -> Iterator[Any]:
+    """Yield the elements of the top-level JSON array in path one at a time."""
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding=encoding or sniff_encoding(path)) as f:
+        buf = ""
+        pos = 0
+        eof = False
+
+        def fill() -> bool:
+            nonlocal buf, pos, eof
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                eof = True
+                return False
+            buf = buf[pos:] + chunk
+            pos = 0
+            return True
+
+        def skip_ws() -> None:
+            nonlocal pos
+            while True:
+                while pos < len(buf) and buf[pos] in _WHITESPACE:
+                    pos += 1
+                if pos < len(buf) or not fill():
+                    return
+
+        skip_ws()
+        if pos >= len(buf) or buf[pos] != "[":
+            raise ValueError(f"{path}: expected a JSON array")
+        pos += 1
+        expect_value = True
+        first = True
+        while True:
+            skip_ws()
+            if pos >= len(buf):
+                raise ValueError(f"{path}: unexpected end of file")
+            ch = buf[pos]
+            if ch == "]":
+                if expect_value and not first:
+                    raise ValueError(f"{path}: trailing ',' at offset {pos}")
+                return
+            if ch == ",":
+                if expect_value:
+                    raise ValueError(f"{path}: unexpected ',' at offset {pos}")
+                pos += 1
+                expect_value = True
+                continue
+            if not expect_value:
+                raise ValueError(f"{path}: expected ',' or ']' at offset {pos}")
+            while True:
+                try:
+                    value, end = decoder.raw_decode(buf, pos)
+                except json.JSONDecodeError:
+                    # Element spans the chunk boundary: read more and retry
+                    if eof or not fill():
+                        raise
+                    continue
+                # A number may have been cut off at the chunk boundary ("12" of "12.5")
+                if (
+                    isinstance(value, (int, float))
+                    and not eof
+                    and (end == len(buf) or buf[end] not in _WHITESPACE + ",]")
+                    and fill()
+                ):
+                    continue
+                break
+            yield value
+            pos = end
+            expect_value = False
+            first = False
+
+
+def _copy_mode(target: str, tmp_path: str) -> None:
+    # mkstemp creates 0600 files; keep the target's mode (or the umask default for new files)
+    if os.path.exists(target):
+        shutil.copymode(target, tmp_path)
+    else:
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(tmp_path, 0o666 & ~umask)
+
+
+class CatalogWriter:
+    """Write catalog entries one at a time; the target is replaced atomically on success."""
+
+    def __init__(self, path: str, indent: Optional[int] = 2, ensure_ascii: bool = False) -> None:
+        self.path = path
+        self.indent = indent
+        self.ensure_ascii = ensure_ascii
+        self.count = 0
+        self._file = None
+        self._tmp_path: Optional[str] = None
+
+    def __enter__(self) -> "CatalogWriter":
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, self._tmp_path = tempfile.mkstemp(prefix=".catalog-", suffix=".json.tmp", dir=directory)
+        self._file = os.fdopen(fd, "w", encoding="utf-8")
+        self._file.write("[")
+        return self
+
+    def write(self, entry: Any) -> None:
+        text = json.dumps(entry, indent=self.indent, ensure_ascii=self.ensure_ascii)
+        if self.indent is None:
+            self._file.write(("," if self.count else "") + text)
+        else:
+            pad = " " * self.indent
+            self._file.write(("," if self.count else "") + "\n" + pad + text.replace("\n", "\n" + pad))
+        self.count += 1
+
+    def write_all(self, entries: Iterable[Any]) -> int:
+        for entry in entries:
+            self.write(entry)
+        return self.count
+
+    def discard(self) -> None:
+        """Abandon the output and leave the target file as it was."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._tmp_path and os.path.exists(self._tmp_path):
+            os.unlink(self._tmp_path)
+        self._tmp_path = None
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if self._file is None:
+            return
+        if exc_type is not None:
+            self.discard()
+            return
+        self._file.write("\n]" if self.count and self.indent is not None else "]")
+        self._file.close()
+        self._file = None
+        _copy_mode(self.path, self._tmp_path)
+        os.replace(self._tmp_path, self.path)
+        self._tmp_path = None
+
+
+def write_entries(path: str, entries: Iterable[Any], indent: Optional[int] = 2, ensure_ascii: bool = False) -> int:
+    """Stream entries into path (atomically). Returns the number written."""
+    with CatalogWriter(path, indent, ensure_ascii) as out:
+        return out.write_all(entries)
@@ -0,0 +1,150 @@
+"""Run the catalog post-processing steps over medicines.json in one pass.
+
+The publish flow used to run auto_fill_details.py, merge_old_details.py and
+fix_encoding_artifacts.py one after another, each re-reading and re-writing the
+whole catalog. Here each step is a stage that works on one entry in place, and
+every entry passes through all stages between a single streamed read and a
+single write:
+
+  auto-fill  - fill missing details from the name/keywords (auto_fill_details.py)
+  restore    - restore fields and details from previous snapshots (merge_old_details.py)
+  encoding   - repair mojibake and normalize ranges (fix_encoding_artifacts.py)
+
+Stages run in that order (--stages selects a subset, order is kept). Time spent in
+each stage and the number of entries it changed are reported. The individual
+scripts still work on their own and run the same stage code.
+
+Stages record every field they change (see change_log.py); --audit writes that log
+as a reviewable report, and with --dry-run nothing else is written. The catalog is
+only rewritten if some stage changed something.
+
+restore reads the snapshot store (--store, else <json>.snapshots.sqlite); snapshot
+JSON files (--previous) are only a fallback for catalogs without a store. The
+written catalog is recorded in the same store, so restored and auto-filled values
+become history for later restores.
+
+generate_unified_medicines_json.py --pipeline runs the same stages in memory
+before the output is first written, so generate + post-processing is one write.
+
+Usage (PowerShell):
+  py .\\scripts\\catalog_pipeline.py --json "s:\\MedCare\\src\\data\\medicines.json" --store "s:\\MedCare\\src\\data\\medicines.snapshots.sqlite"
+  py .\\scripts\\catalog_pipeline.py --json "s:\\MedCare\\src\\data\\medicines.json" --previous "s:\\MedCare\\src\\data\\medicines.previous.json"
+  py .\\scripts\\catalog_pipeline.py --json "s:\\MedCare\\src\\data\\medicines.json" --stages auto-fill encoding
+  py .\\scripts\\catalog_pipeline.py --json "s:\\MedCare\\src\\data\\medicines.json" --store "s:\\MedCare\\src\\data\\medicines.snapshots.sqlite" --dry-run --audit audit.json
+"""
+from __future__ import annotations
+import os
+import time
+import argparse
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+from catalog_io import CatalogWriter, iter_entries
+from change_log import ChangeLog, print_change_report
+from merge_old_details import add_source_arguments, restorer_from_args
+from snapshot_store import record_catalog
+
+
+class Stage(NamedTuple):
+    name: str
+    # Transforms one entry in place and records changed fields in the log (if any);
+    # returns True if it changed the entry
+    apply: Callable[[Dict, Optional[ChangeLog]], bool]
+
+
+STAGE_NAMES = ("auto-fill", "restore", "encoding")
+
+
+def build_stages(names: Iterable[str] = STAGE_NAMES, restorer=None) -> List[Stage]:
+    """Stages in pipeline order. restore needs a merge_old_details.DetailRestorer."""
+    selected = set(names)
+    stages: List[Stage] = []
+    # Imported here: auto-fill loads the classification engine at import time
+    if "auto-fill" in selected:
+        from auto_fill_details import fill_entry
+        stages.append(Stage("auto-fill", fill_entry))
+    if "restore" in selected and restorer is not None:
+        stages.append(Stage("restore", restorer.restore))
+    if "encoding" in selected:
+        from fix_encoding_artifacts import fix_entry
+        stages.append(Stage("encoding", fix_entry))
+    return stages
+
+
+def run_stages(
+    entries: Iterable,
+    stages: List[Stage],
+    stats: Optional[Dict[str, Dict[str, float]]] = None,
+    log: Optional[ChangeLog] = None,
+) -> Iterator:
+    """Yield entries after passing each one through every stage.
+    stats collects {stage: {"changed": n, "seconds": s}}; log collects changed fields."""
+    stats = stats if stats is not None else {}
+    for stage in stages:
+        stats.setdefault(stage.name, {"changed": 0, "seconds": 0.0})
+    clock = time.perf_counter
+    for entry in entries:
+        if isinstance(entry, dict):
+            for stage in stages:
+                start = clock()
+                changed = stage.apply(entry, log)
+                record = stats[stage.name]
+                record["seconds"] += clock() - start
+                if changed:
+                    record["changed"] += 1
+        yield entry
+
+
+def print_stage_report(stats: Dict[str, Dict[str, float]]) -> None:
+    for name, record in stats.items():
+        print(f"  Stage {name}: {int(record['changed'])} changed ({record['seconds'] * 1000:.0f} ms)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run auto-fill, detail restore and encoding fix over medicines.json in one pass.")
+    parser.add_argument("--json", default=os.path.join(os.getcwd(), "src", "data", "medicines.json"), help="Path to medicines.json")
+    parser.add_argument("--stages", nargs="+", choices=STAGE_NAMES, default=list(STAGE_NAMES), help="Stages to run (always in pipeline order)")
+    add_source_arguments(parser)
+    parser.add_argument("--audit", default=None, help="Write every changed field (id, stage, field, before, after) to this JSON file")
+    parser.add_argument("--dry-run", action="store_true", help="Run the stages and report changes without writing the catalog")
+    args = parser.parse_args()
+
+    if not os.path.isfile(args.json):
+        print(f"ERROR: Catalog not found: {args.json}")
+        return
+    start = time.perf_counter()
+    restorer = None
+    if "restore" in args.stages:
+        restorer = restorer_from_args(args, args.json)
+        if restorer is None:
+            return
+    stages = build_stages(args.stages, restorer)
+    setup = time.perf_counter() - start
+    stats: Dict[str, Dict[str, float]] = {}
+    start = time.perf_counter()
+    with ChangeLog(args.audit) as log, CatalogWriter(args.json) as out:
+        out.write_all(run_stages(iter_entries(args.json), stages, stats, log))
+        # Nothing changed (or a dry run): keep the file as it is
+        if args.dry_run or not len(log):
+            out.discard()
+    elapsed = time.perf_counter() - start
+    if restorer is not None and restorer.store:
+        restorer.store.close()
+
+    print("\nSummary:")
+    print(f"  Entries: {out.count}")
+    print(f"  Setup: {setup * 1000:.0f} ms")
+    print_stage_report(stats)
+    io_seconds = elapsed - sum(r["seconds"] for r in stats.values())
+    print(f"  Read/write: {io_seconds * 1000:.0f} ms (one pass)")
+    print_change_report(log)
+    if args.dry_run:
+        print("  NOTE: This was a dry run. The catalog was not written.")
+    elif not len(log):
+        print(f"  Up to date: {args.json}")
+    else:
+        print(f"  Wrote: {args.json} ({out.count} entries)")
+        record_catalog(args.json, args.store)
+
+
+if __name__ == "__main__":
+    main()
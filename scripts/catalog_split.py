@@ -0,0 +1,215 @@
+"""Split medicines.json into a slim list index plus one detail file per medicine.
+
+Output layout (default: <dir of medicines.json>/catalog):
+  catalog/current.json                          - pointer to the published build
+  catalog/<build>/medicines.index.json          - array of list-page fields only (INDEX_FIELDS)
+  catalog/<build>/medicines/<slug>.json         - the full entry, loaded lazily by product pages
+
+Every write goes to a new build directory, and the build is published by replacing
+current.json ({"build", "index", "details"}, paths relative to catalog/) in one
+os.replace once all its files are in place. Readers resolve current.json first and
+always see one complete build; after a crash the pointer still names the last
+complete build. The previously published build is kept for readers that resolved
+the old pointer; older and unpublished builds are removed on the next publish.
+
+update_split_catalog() writes a new build too, but hardlinks (or copies) the detail
+files of unchanged entries from the published build and only rewrites the index and
+the detail files of changed entries, for edits such as recategorize_catalog.py.
+
+Slugs must be unique: an entry whose slug was already written is skipped with a
+warning, so the index never lists a product without its own detail file.
+Index and detail files are written compactly.
+
+Usage (PowerShell):
+  py .\\scripts\\catalog_split.py --json "s:\\MedCare\\src\\data\\medicines.json"
+
+Also available as a stage of generate_unified_medicines_json.py via --split.
+"""
+from __future__ import annotations
+import os
+import json
+import time
+import shutil
+import argparse
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from catalog_io import load_json
+
+INDEX_FILE = "medicines.index.json"
+DETAILS_DIR = "medicines"
+POINTER_FILE = "current.json"
+BUILD_PREFIX = "build-"
+
+# Fields kept in the list index; everything else only lives in the detail file
+INDEX_FIELDS = (
+    "id",
+    "slug",
+    "name",
+    "category",
+    "price",
+    "form",
+    "strength",
+    "inStock",
+    "thumbnail",
+    "width",
+    "height",
+)
+
+
+def default_split_dir(output_path: str) -> str:
+    return os.path.join(os.path.dirname(output_path) or ".", "catalog")
+
+
+def index_entry(entry: Dict) -> Dict:
+    item = {k: entry[k] for k in INDEX_FIELDS if entry.get(k) is not None}
+    item.setdefault("slug", entry.get("id"))
+    # Entries without derivatives fall back to the primary image for list cards
+    if "thumbnail" not in item and entry.get("image"):
+        item["thumbnail"] = entry["image"]
+    return item
+
+
+def _dump(path: str, data) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+
+
+def _replace(path: str, data) -> None:
+    tmp = f"{path}.tmp"
+    _dump(tmp, data)
+    os.replace(tmp, path)
+
+
+def current_split_build(split_dir: str) -> Optional[str]:
+    """Directory of the build current.json points at (None if nothing is published)."""
+    try:
+        with open(os.path.join(split_dir, POINTER_FILE), encoding="utf-8") as f:
+            build = json.load(f)["build"]
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    path = os.path.join(split_dir, str(build))
+    return path if os.path.isdir(path) else None
+
+
+def _new_build_dir(split_dir: str) -> str:
+    name = f"{BUILD_PREFIX}{time.strftime('%Y%m%d-%H%M%S')}"
+    path, n = os.path.join(split_dir, name), 1
+    while os.path.exists(path):
+        n += 1
+        path = os.path.join(split_dir, f"{name}-{n}")
+    os.makedirs(os.path.join(path, DETAILS_DIR))
+    return path
+
+
+def _publish(split_dir: str, build_dir: str) -> None:
+    """Point current.json at build_dir, then drop every build except it and the one
+    published before it (plus the files of the old unversioned layout)."""
+    previous = current_split_build(split_dir)
+    name = os.path.basename(build_dir)
+    _replace(os.path.join(split_dir, POINTER_FILE), {"build": name, "index": f"{name}/{INDEX_FILE}", "details": f"{name}/{DETAILS_DIR}"})
+    keep = {name, os.path.basename(previous) if previous else None}
+    for child in os.listdir(split_dir):
+        path = os.path.join(split_dir, child)
+        if child.startswith(BUILD_PREFIX) and child not in keep and os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+    legacy_details = os.path.join(split_dir, DETAILS_DIR)
+    if os.path.isdir(legacy_details):
+        shutil.rmtree(legacy_details, ignore_errors=True)
+    legacy_index = os.path.join(split_dir, INDEX_FILE)
+    if os.path.isfile(legacy_index):
+        os.remove(legacy_index)
+
+
+def _unique_slugs(entries: Iterable[Dict]) -> Iterator[Tuple[str, Dict]]:
+    """(slug, entry) for entries with a usable slug; later entries repeating a slug are skipped."""
+    seen: Set[str] = set()
+    duplicates: List[str] = []
+    for entry in entries:
+        slug = str(entry.get("slug") or entry.get("id") or "")
+        if not slug or slug != os.path.basename(slug):
+            continue
+        if slug in seen:
+            duplicates.append(slug)
+            continue
+        seen.add(slug)
+        yield slug, entry
+    if duplicates:
+        print(f"WARNING: Skipped {len(duplicates)} entries with a duplicate slug: {', '.join(duplicates[:5])}")
+
+
+def _link_or_copy(src: str, dst: str) -> None:
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def write_split_catalog(entries: List[Dict], split_dir: str) -> Tuple[int, int]:
+    """Write index + detail files for entries as a new build in split_dir and publish it.
+    Returns (index bytes, number of detail files)."""
+    os.makedirs(split_dir, exist_ok=True)
+    build_dir = _new_build_dir(split_dir)
+    details_dir = os.path.join(build_dir, DETAILS_DIR)
+    index: List[Dict] = []
+    written = 0
+    for slug, entry in _unique_slugs(entries):
+        index.append(index_entry(entry))
+        _dump(os.path.join(details_dir, f"{slug}.json"), entry)
+        written += 1
+    index_path = os.path.join(build_dir, INDEX_FILE)
+    _dump(index_path, index)
+    index_bytes = os.path.getsize(index_path)
+    _publish(split_dir, build_dir)
+    return index_bytes, written
+
+
+def update_split_catalog(entries: List[Dict], changed_ids: Set[str], split_dir: str) -> Tuple[int, int]:
+    """Publish a new build that reuses the published detail files of unchanged entries
+    and rewrites the index and the detail files of changed_ids (a full write if nothing
+    is published yet). Returns (index bytes, number of detail files rewritten)."""
+    current = current_split_build(split_dir)
+    if current is None:
+        return write_split_catalog(entries, split_dir)
+    current_details = os.path.join(current, DETAILS_DIR)
+    build_dir = _new_build_dir(split_dir)
+    details_dir = os.path.join(build_dir, DETAILS_DIR)
+    index: List[Dict] = []
+    written = 0
+    for slug, entry in _unique_slugs(entries):
+        index.append(index_entry(entry))
+        name = f"{slug}.json"
+        old = os.path.join(current_details, name)
+        if str(entry.get("id")) in changed_ids or not os.path.isfile(old):
+            _dump(os.path.join(details_dir, name), entry)
+            written += 1
+        else:
+            _link_or_copy(old, os.path.join(details_dir, name))
+    index_path = os.path.join(build_dir, INDEX_FILE)
+    _dump(index_path, index)
+    index_bytes = os.path.getsize(index_path)
+    _publish(split_dir, build_dir)
+    return index_bytes, written
+
+
+def print_split_report(split_dir: str, index_bytes: int, detail_files: int, source_bytes: Optional[int] = None) -> None:
+    ratio = f" ({source_bytes / index_bytes:.1f}x smaller than the full catalog)" if source_bytes and index_bytes else ""
+    build_dir = current_split_build(split_dir) or split_dir
+    print(f"  Wrote: {os.path.join(build_dir, INDEX_FILE)} ({index_bytes:,} bytes){ratio}")
+    print(f"  Wrote: {detail_files} detail files in {os.path.join(build_dir, DETAILS_DIR)}")
+    print(f"  Published: {os.path.join(split_dir, POINTER_FILE)} -> {os.path.basename(build_dir)}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Split medicines.json into a list index and per-medicine detail files.")
+    parser.add_argument("--json", default=os.path.join(os.getcwd(), "src", "data", "medicines.json"), help="Path to medicines.json")
+    parser.add_argument("--split-dir", default=None, help="Output directory (default: <dir of --json>/catalog)")
+    args = parser.parse_args()
+
+    data, _ = load_json(args.json)
+    split_dir = args.split_dir or default_split_dir(args.json)
+    index_bytes, detail_files = write_split_catalog([e for e in data if isinstance(e, dict)], split_dir)
+    print_split_report(split_dir, index_bytes, detail_files, os.path.getsize(args.json))
+
+
+if __name__ == "__main__":
+    main()
@@ -8,8 +8,14 @@ Features:
 - Skips moving if already in the correct category
 - Skips known category folders themselves
 - Handles conflicts safely (skip if destination exists)
+- Plans every move first from a single scan of the tree (conflicts are set lookups),
+  then applies the plan with plain renames (metadata-only on one filesystem)
+- Records each move in a journal before making it (<base-dir>/.categorize-journal.jsonl)
 - Prints a clear summary at the end
-- Optional: --dry-run to preview actions without moving
+- Optional: --dry-run to preview the exact plan without touching the filesystem
+- Optional: --rollback to undo the moves recorded by the last run
+- Optional: --workers N to list category folders and apply moves with N threads
+  (moves into the same category keep their planned order; useful on network shares)
 - Optional: --base-dir to change the base directory (default: ./final_web)
 
 Usage (PowerShell on Windows):
@@ -19,171 +25,57 @@ Usage (PowerShell on Windows):
   # Real run (will move folders)
   python .\scripts\categorize_medicines.py --base-dir "S:\\final_web"
 
+  # Undo the last real run
+  python .\scripts\categorize_medicines.py --base-dir "S:\\final_web" --rollback
+
 If you run from the project root and your final_web lives alongside the repo, adjust the --base-dir accordingly.
 """
 from __future__ import annotations
 import os
+import json
+import errno
 import shutil
 import argparse
-from typing import Dict, List, Tuple
-
-# Ordered category list and keyword mapping
-# Note: matching is substring-based (case-insensitive). Add common variants/hyphenations.
-CATEGORY_KEYWORDS: List[Tuple[str, List[str]]] = [
-    (
-        "Erectile_Dysfunction",
-        [
-            "sildenafil",
-            "tadalafil",
-            "vardenafil",
-            "avanafil",
-            "dapoxetine",
-            "cenforce",
-            "fildena",
-            "malegra",
-            "p-force",
-            "super tadarise",
-            "tadarise",
-            "megalis",
-            "vilitra",
-            "suhagra",
-            "cialis",
-            "tadacip",
-            "tadaup",
-        ],
-    ),
-    (
-        "Anti_Biotic",
-        [
-            "amoxicillin",
-            "amoxyclav",
-            "azithro",
-            "azithromycin",
-            "cef",
-            "cefix",
-            "cefpodox",
-            "ceftriax",
-            "doxycycline",
-            "levofloxacin",
-            "moxifloxacin",
-            "roxithromycin",
-            "tetracycline",
-            "linezolid",
-            "nitazoxanide",
-            "piperacillin",
-            "tazobactam",
-            "clindamycin",
-            "ciplox",
-        ],
-    ),
-    (
-        "Anti_Malarial",
-        [
-            "artesunate",
-            "artemether",
-            "artemisinin",
-            "lumefantrine",
-            "hydroxychloroquine",
-            "hcqs",
-            "norsunate",
-        ],
-    ),
-    (
-        "Anti_Viral",
-        [
-            "oseltamivir",
-            "valacyclovir",
-            "ganciclovir",
-            "molnupiravir",
-            "sofosbuvir",
-            "velpatasvir",
-            "ledipasvir",
-        ],
-    ),
-    (
-        "Hormones_And_Steroids",
-        [
-            "testosterone",
-            "nandrolone",
-            "mesterolone",
-            "clomiphene",
-            "estradiol",
-            "progesterone",
-            "medroxyprogesterone",
-            "dienogest",
-        ],
-    ),
-    (
-        "Injections",
-        [
-            " injection",
-            " inj ",
-            "ampoule",
-        ],
-    ),
-    (
-        "Skin_Allergy_Asthma",
-        [
-            "hydroquinone",
-            "retino",
-            "tretin",
-            "tacrolimus",
-            "eukroma",
-            "panderm",
-            "travatan",
-            "tropicamide",
-            "eye drop",
-            "nasal spray",
-        ],
-    ),
-    (
-        "Supplements_Vitamins_Hair",
-        [
-            "vitamin",
-            "biotin",
-            "minoxidil",
-            "hair",
-            "keraboost",
-            "curlzvit",
-            "redenser",
-        ],
-    ),
-    (
-        "Anti_Cancer",
-        [
-            "tamoxifen",
-            "thalidomide",
-            "sorafenib",
-            "lenv",
-            "rolimus",
-            "iressa",
-            "abirat",
-        ],
-    ),
-    (
-        "Chronic_Cardiac",
-        [
-            "rosuvastatin",
-            "metoprolol",
-            "warfarin",
-        ],
-    ),
-]
-UNCLEAR_CATEGORY = "Unclear"
-
-ALL_CATEGORY_NAMES = [name for name, _ in CATEGORY_KEYWORDS] + [UNCLEAR_CATEGORY]
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+from catalog_walk import list_dirs
+from classification import DEFAULT_CACHE_PATH, ClassificationCache, load_engine
+
+# Ordered category list and keyword mapping, shared with the other scripts (classification_keywords.json)
+# Note: matching is substring-based (case-insensitive). Add common variants/hyphenations there.
+ENGINE = load_engine()
+CATEGORY_KEYWORDS: List[Tuple[str, List[str]]] = ENGINE.categories
+UNCLEAR_CATEGORY = ENGINE.unclear
+
+ALL_CATEGORY_NAMES = ENGINE.category_names
+
+JOURNAL_FILE = ".categorize-journal.jsonl"
+JOURNAL_VERSION = 1
+# Compiled once (and cached between runs): one pass over a name finds every keyword
+CATEGORY_MATCHER = ENGINE.category_matcher
+# ENGINE itself, or a persistent ClassificationCache in front of it once main() opens one
+CLASSIFIER = ENGINE
 
 
 def detect_category(folder_name: str) -> str:
     """Return best category name for a given folder by keyword matching.
     First match wins (priority based on CATEGORY_KEYWORDS order).
     """
-    low = folder_name.lower()
-    for cat, keywords in CATEGORY_KEYWORDS:
-        for kw in keywords:
-            if kw in low:
-                return cat
-    return UNCLEAR_CATEGORY
+    return CLASSIFIER.detect_category(folder_name)
+
+
+def category_matches(folder_name: str) -> List[Tuple[str, List[str]]]:
+    """Every category whose keywords occur in the name, in priority order (for diagnostics)."""
+    return CLASSIFIER.category_matches(folder_name)
+
+
+def describe_other_matches(folder_name: str) -> str:
+    others = category_matches(folder_name)[1:]
+    if not others:
+        return ""
+    return " (also matches: " + ", ".join(f"{cat} [{', '.join(kws)}]" for cat, kws in others) + ")"
 
 
 def ensure_category_dirs(base_dir: str) -> None:
@@ -200,140 +92,288 @@ def is_already_categorized(path: str, base_dir: str, category: str) -> bool:
     return parent == category
 
 
-def main() -> None:
-    parser = argparse.ArgumentParser(description="Categorize medicine folders inside final_web.")
-    parser.add_argument("--base-dir", default=os.path.join(os.getcwd(), "final_web"), help="Path to final_web base directory")
-    parser.add_argument("--dry-run", action="store_true", help="Preview actions without moving folders")
-    parser.add_argument(
-        "--reclassify",
-        action="store_true",
-        help="Also scan inside existing category folders (including 'Unclear') and move items to a better-matched category.",
-    )
-    args = parser.parse_args()
+class Move(NamedTuple):
+    name: str
+    src: str
+    dest_dir: str
+    from_category: Optional[str]  # None for a top-level (uncategorized) folder
+    to_category: str
 
-    base_dir = args.base_dir
-    dry_run = args.dry_run
-    do_reclassify = args.reclassify
+    @property
+    def dest(self) -> str:
+        return os.path.join(self.dest_dir, self.name)
 
-    if not os.path.isdir(base_dir):
-        print(f"ERROR: Base directory not found: {base_dir}")
-        return
 
-    print(f"Scanning base directory: {base_dir}")
+def default_journal_path(base_dir: str) -> str:
+    return os.path.join(base_dir, JOURNAL_FILE)
 
-    ensure_category_dirs(base_dir)
 
-    categorized = 0
-    moved = 0
-    skipped = 0
-    conflicts = 0
-    unclear = 0
+def scan_tree(base_dir: str, on_error, workers: int = 1) -> Tuple[List[os.DirEntry], Dict[str, List[os.DirEntry]]]:
+    """One directory read per level: top-level folders plus the contents of each category folder.
+    Category folders are listed concurrently when workers > 1."""
+    top = list_dirs(base_dir, on_error)
+    present = [cat for cat in ALL_CATEGORY_NAMES if cat in {e.name for e in top}]
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        listed = dict(zip(present, pool.map(lambda cat: list_dirs(os.path.join(base_dir, cat), on_error), present)))
+    contents = {cat: listed.get(cat, []) for cat in ALL_CATEGORY_NAMES}
+    return top, contents
 
-    try:
-        entries = sorted(os.listdir(base_dir))
-    except Exception as e:
-        print(f"ERROR: Unable to list directory '{base_dir}': {e}")
-        return
 
-    # Process only immediate subdirectories that are not category names
-    for name in entries:
-        src_path = os.path.join(base_dir, name)
-        if not os.path.isdir(src_path):
-            continue  # ignore files
+def plan_moves(base_dir: str, top: List[os.DirEntry], contents: Dict[str, List[os.DirEntry]], reclassify: bool, stats: Dict[str, int]) -> List[Move]:
+    """Decide every move up front. Destination conflicts are checked against an in-memory
+    occupancy map that the plan itself updates, so the result is what a sequential run would do."""
+    occupied: Dict[str, Set[str]] = {cat: {e.name for e in entries} for cat, entries in contents.items()}
+    plan: List[Move] = []
+
+    # Process only immediate subdirectories (files are ignored) that are not category names
+    for entry in top:
+        name = entry.name
         if name in ALL_CATEGORY_NAMES:
             # Skip category folders themselves
             continue
 
         category = detect_category(name)
+        stats["categorized"] += 1
         if category == UNCLEAR_CATEGORY:
-            unclear += 1
-            categorized += 1
             # Still create a destination within Unclear
-            dest_dir = os.path.join(base_dir, UNCLEAR_CATEGORY)
-        else:
-            dest_dir = os.path.join(base_dir, category)
-            categorized += 1
+            stats["unclear"] += 1
+        dest_dir = os.path.join(base_dir, category)
 
         # If already located inside dest_dir (if user points base_dir above categories), skip
-        if is_already_categorized(src_path, base_dir, os.path.basename(dest_dir)):
-            print(f"SKIP: '{name}' already in '{os.path.basename(dest_dir)}'")
-            skipped += 1
+        if is_already_categorized(entry.path, base_dir, category):
+            print(f"SKIP: '{name}' already in '{category}'")
+            stats["skipped"] += 1
             continue
 
-        dest_path = os.path.join(dest_dir, name)
-        if os.path.exists(dest_path):
-            print(f"CONFLICT: Destination already exists: {dest_path} — skipping")
-            conflicts += 1
+        if name in occupied[category]:
+            print(f"CONFLICT: Destination already exists: {os.path.join(dest_dir, name)} — skipping")
+            stats["conflicts"] += 1
             continue
+        occupied[category].add(name)
+        plan.append(Move(name, entry.path, dest_dir, None, category))
 
-        if dry_run:
-            print(f"DRY-RUN MOVE: '{src_path}' -> '{dest_path}'")
-        else:
-            try:
-                shutil.move(src_path, dest_dir)
-                print(f"MOVED: '{name}' -> {os.path.basename(dest_dir)}")
-                moved += 1
-            except Exception as e:
-                print(f"ERROR moving '{name}': {e}")
-                conflicts += 1
-
-    # Optional reclassification pass: scan existing category folders and move items if they match a different category
-    reclassified = 0
-    if do_reclassify:
+    # Optional reclassification pass: items in existing category folders that match a different category
+    if reclassify:
         for current_category in ALL_CATEGORY_NAMES:
-            current_dir = os.path.join(base_dir, current_category)
-            if not os.path.isdir(current_dir):
-                continue
-            try:
-                sub_entries = sorted(os.listdir(current_dir))
-            except Exception as e:
-                print(f"ERROR: Unable to list '{current_dir}': {e}")
-                conflicts += 1
-                continue
-
-            for name in sub_entries:
-                src_path = os.path.join(current_dir, name)
-                if not os.path.isdir(src_path):
-                    continue
-
+            for entry in contents[current_category]:
+                name = entry.name
                 new_category = detect_category(name)
                 if new_category == current_category:
                     continue  # already in best category
 
                 dest_dir = os.path.join(base_dir, new_category)
-                if not os.path.isdir(dest_dir):
-                    os.makedirs(dest_dir, exist_ok=True)
-
-                dest_path = os.path.join(dest_dir, name)
-                if os.path.exists(dest_path):
-                    print(f"RECLASS CONFLICT: Destination exists: {dest_path} — skipping")
-                    conflicts += 1
+                if name in occupied[new_category]:
+                    print(f"RECLASS CONFLICT: Destination exists: {os.path.join(dest_dir, name)} — skipping")
+                    stats["conflicts"] += 1
                     continue
+                occupied[current_category].discard(name)
+                occupied[new_category].add(name)
+                plan.append(Move(name, entry.path, dest_dir, current_category, new_category))
+    return plan
+
+
+def _rename(src: str, dest: str) -> None:
+    # os.rename would silently replace an empty directory on POSIX
+    if os.path.exists(dest):
+        raise FileExistsError(errno.EEXIST, "Destination already exists", dest)
+    try:
+        os.rename(src, dest)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        # Category folder on another filesystem: the only case that needs a copy
+        shutil.move(src, dest)
+
 
-                if dry_run:
-                    print(f"RECLASS DRY-RUN MOVE: '{src_path}' -> '{dest_path}'")
+class Journal:
+    """Write-ahead move log: each move is recorded (and flushed) before it happens."""
+
+    def __init__(self, path: str, base_dir: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, "w", encoding="utf-8")
+        self._append({"version": JOURNAL_VERSION, "base_dir": os.path.abspath(base_dir)})
+
+    def _append(self, record: Dict) -> None:
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def record(self, move: Move) -> None:
+        with self._lock:
+            self._append({"src": move.src, "dest": move.dest})
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def schedule(plan: List[Move]) -> List[List[List[Move]]]:
+    """Split the plan into waves of per-destination groups.
+
+    A move whose destination path is the source of an earlier move (a name freed in the
+    same run) goes into a later wave than that move. Within a wave, each destination's
+    moves stay in plan order in one group; groups are independent and can run in parallel.
+    """
+    wave_of_src: Dict[str, int] = {}
+    waves: List[Dict[str, List[Move]]] = []
+    for move in plan:
+        wave = wave_of_src.get(move.dest, -1) + 1
+        wave_of_src[move.src] = wave
+        while len(waves) <= wave:
+            waves.append({})
+        waves[wave].setdefault(move.to_category, []).append(move)
+    return [list(groups.values()) for groups in waves]
+
+
+def apply_moves(plan: List[Move], journal: Optional[Journal], stats: Dict[str, int], workers: int = 1) -> None:
+    lock = threading.Lock()
+
+    def run_group(moves: List[Move]) -> None:
+        for move in moves:
+            try:
+                if journal:
+                    journal.record(move)
+                _rename(move.src, move.dest)
+            except Exception as e:
+                with lock:
+                    if move.from_category is None:
+                        print(f"ERROR moving '{move.name}': {e}")
+                    else:
+                        print(f"ERROR reclassifying '{move.name}': {e}")
+                    stats["conflicts"] += 1
+                continue
+            with lock:
+                stats["moved"] += 1
+                if move.from_category is None:
+                    print(f"MOVED: '{move.name}' -> {move.to_category}")
                 else:
-                    try:
-                        shutil.move(src_path, dest_dir)
-                        print(
-                            f"RECLASS MOVED: '{name}' from {current_category} -> {new_category}"
-                        )
-                        moved += 1
-                        reclassified += 1
-                    except Exception as e:
-                        print(f"ERROR reclassifying '{name}': {e}")
-                        conflicts += 1
+                    print(f"RECLASS MOVED: '{move.name}' from {move.from_category} -> {move.to_category}")
+                    stats["reclassified"] += 1
+
+    if workers <= 1:
+        run_group(plan)
+        return
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for groups in schedule(plan):
+            # Each wave finishes before the next one starts
+            for future in [pool.submit(run_group, g) for g in groups]:
+                future.result()
+
+
+def rollback(journal_path: str) -> Dict[str, int]:
+    """Undo the moves of a journaled run, newest first."""
+    moves = []
+    with open(journal_path, "r", encoding="utf-8") as f:
+        header = json.loads(f.readline() or "{}")
+        if header.get("version") != JOURNAL_VERSION:
+            raise ValueError(f"{journal_path}: not a categorize journal")
+        for line in f:
+            line = line.strip()
+            if line:
+                moves.append(json.loads(line))
+    stats = {"restored": 0, "missing": 0, "conflicts": 0}
+    for rec in reversed(moves):
+        src, dest = rec["src"], rec["dest"]
+        if not os.path.exists(dest):
+            # Recorded but never performed (or already undone)
+            stats["missing"] += 1
+            continue
+        if os.path.exists(src):
+            print(f"ROLLBACK CONFLICT: '{src}' exists again — leaving '{dest}'")
+            stats["conflicts"] += 1
+            continue
+        _rename(dest, src)
+        print(f"RESTORED: '{dest}' -> '{src}'")
+        stats["restored"] += 1
+    return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Categorize medicine folders inside final_web.")
+    parser.add_argument("--base-dir", default=os.path.join(os.getcwd(), "final_web"), help="Path to final_web base directory")
+    parser.add_argument("--dry-run", action="store_true", help="Preview actions without moving folders")
+    parser.add_argument(
+        "--reclassify",
+        action="store_true",
+        help="Also scan inside existing category folders (including 'Unclear') and move items to a better-matched category.",
+    )
+    parser.add_argument("--cache", default=DEFAULT_CACHE_PATH, help="Classification cache (SQLite) reused across runs")
+    parser.add_argument("--no-cache", action="store_true", help="Classify every name from scratch")
+    parser.add_argument("--workers", type=int, default=1, help="Threads for listing category folders and moving (helps on network shares)")
+    parser.add_argument("--journal", default=None, help=f"Move journal path (default: <base-dir>/{JOURNAL_FILE})")
+    parser.add_argument("--rollback", action="store_true", help="Undo the moves recorded in the journal of the last run")
+    args = parser.parse_args()
+
+    base_dir = args.base_dir
+    dry_run = args.dry_run
+    do_reclassify = args.reclassify
+    journal_path = args.journal or default_journal_path(base_dir)
+
+    if args.rollback:
+        if not os.path.isfile(journal_path):
+            print(f"ERROR: Journal not found: {journal_path}")
+            return
+        stats = rollback(journal_path)
+        print("\nSummary:")
+        print(f"  Restored: {stats['restored']}")
+        print(f"  Not moved / already restored: {stats['missing']}")
+        print(f"  Conflicts: {stats['conflicts']}")
+        return
+
+    if not os.path.isdir(base_dir):
+        print(f"ERROR: Base directory not found: {base_dir}")
+        return
+
+    print(f"Scanning base directory: {base_dir}")
+
+    global CLASSIFIER
+    cache = None if args.no_cache else ClassificationCache(ENGINE, args.cache)
+    if cache is not None:
+        CLASSIFIER = cache
+
+    stats: Dict[str, int] = {"categorized": 0, "moved": 0, "skipped": 0, "conflicts": 0, "unclear": 0, "reclassified": 0}
+
+    list_lock = threading.Lock()
+
+    def on_list_error(path: str, e: OSError) -> None:
+        with list_lock:
+            print(f"ERROR: Unable to list '{path}': {e}")
+            stats["conflicts"] += 1
+
+    # Phase 1: plan every move from one scan of the tree (no filesystem changes)
+    top, contents = scan_tree(base_dir, on_list_error, args.workers)
+    plan = plan_moves(base_dir, top, contents, do_reclassify, stats)
+
+    # Phase 2: apply with renames, journaled for --rollback
+    if dry_run:
+        for move in plan:
+            prefix = "DRY-RUN MOVE" if move.from_category is None else "RECLASS DRY-RUN MOVE"
+            print(f"{prefix}: '{move.src}' -> '{move.dest}'{describe_other_matches(move.name)}")
+    else:
+        ensure_category_dirs(base_dir)
+        journal = Journal(journal_path, base_dir) if plan else None
+        try:
+            apply_moves(plan, journal, stats, args.workers)
+        finally:
+            if journal:
+                journal.close()
 
     print("\nSummary:")
-    print(f"  Total categorized: {categorized}")
-    print(f"  Moved: {moved}")
-    print(f"  Skipped (already correct): {skipped}")
-    print(f"  Conflicts/Errors: {conflicts}")
-    print(f"  Unclear (placed into '{UNCLEAR_CATEGORY}'): {unclear}")
+    print(f"  Total categorized: {stats['categorized']}")
+    print(f"  Moved: {stats['moved']}")
+    print(f"  Skipped (already correct): {stats['skipped']}")
+    print(f"  Conflicts/Errors: {stats['conflicts']}")
+    print(f"  Unclear (placed into '{UNCLEAR_CATEGORY}'): {stats['unclear']}")
     if do_reclassify:
-        print(f"  Reclassified (moved between categories): {reclassified}")
+        print(f"  Reclassified (moved between categories): {stats['reclassified']}")
+    if cache is not None:
+        cache.save()
+        print(f"  Classification cache: {cache.report()}")
     if dry_run:
+        print(f"  Planned moves: {len(plan)}")
         print("\nNote: This was a dry run. Re-run without --dry-run to apply changes.")
+    elif plan:
+        print(f"  Journal: {journal_path} (undo with --rollback)")
 
 
 if __name__ == "__main__":
@@ -25,152 +25,39 @@ import shutil
 import argparse
 from typing import Dict, List, Tuple
 
-# Updated category keywords based on final_web_2 contents
-CATEGORY_KEYWORDS: List[Tuple[str, List[str]]] = [
-    (
-        "Erectile_Dysfunction",
-        [
-            "kamagra",
-            "malegra", 
-            "tadalafil",
-            "tadalista",
-            "tadarise",
-            "tadapox",
-            "vidalista",
-            "vilitra",
-            "valif",
-            "lovegra",
-            "super-kamagra",
-            "p-force",
-            "super-vilitra",
-            "super vidalista",
-            "sildenafil",
-            "dapoxetine",
-            "poxet",
-        ],
-    ),
-    (
-        "Pain_Killer", 
-        [
-            "painosoma",
-            "prosoma", 
-            "soma dol",
-            "carisoprodol",
-            "naproxen",
-        ]
-    ),
-    (
-        "Anti_Biotic", 
-        [
-            "ivermectin",
-            "ivecop",
-            "ivejuv", 
-            "iverheal",
-            "ivrea",
-            "mebendazole",
-            "mebentel",
-            "mebemole",
-            "vermox",
-            "egaten",
-            "triclabendazole",
-        ]
-    ),
-    (
-        "Hormones_And_Steroids",
-        [
-            "vbolnor",
-            "methandienone",
-            "minoxidil",
-        ],
-    ),
-    (
-        "Anti_Cancer", 
-        [
-            "ocrevus",
-            "ocrelizumab",
-        ]
-    ),
-    (
-        "Anti_Viral", 
-        [
-            "paxista",
-            "nirmatrelvir",
-            "ritonavir",
-        ]
-    ),
-    (
-        "Anti_Malarial", 
-        [
-            "hcqs",
-            "hydroxychloroquine",
-        ]
-    ),
-    (
-        "Injections", 
-        [
-            "injection", 
-            "ampoule"
-        ]
-    ),
-    (
-        "Skin_Allergy_Asthma", 
-        [
-            "minosign",
-            "minocycline",
-        ]
-    ),
-    (
-        "Supplements_Vitamins_Hair", 
-        [
-            "minoxidil",
-        ]
-    ),
-    (
-        "Chronic_Cardiac", 
-        [
-            "metaformin",
-            "metformin",
-            "silodosin",
-        ]
-    ),
-    (
-        "Antidepressant_Anti_Anxiety",
-        [
-            "antidepressant",
-            "anti-anxiety",
-            "lexaheal",
-            "escitalopram",
-        ]
-    ),
-    (
-        "Sleep_Disorders",
-        [
-            "zopiclone",
-            "meloset",
-        ]
-    ),
-    (
-        "Gastrointestinal",
-        [
-            "vominorm",
-        ]
-    ),
-]
-UNCLEAR_CATEGORY = "Unclear"
-
-ALL_CATEGORY_NAMES = [name for name, _ in CATEGORY_KEYWORDS] + [UNCLEAR_CATEGORY]
+from catalog_walk import list_dirs
+from classification import DEFAULT_CACHE_PATH, ClassificationCache, load_engine
+
+# Ordered category list and keyword mapping, shared with the other scripts (classification_keywords.json)
+# Note: matching is substring-based (case-insensitive). Add common variants/hyphenations there.
+ENGINE = load_engine()
+CATEGORY_KEYWORDS: List[Tuple[str, List[str]]] = ENGINE.categories
+UNCLEAR_CATEGORY = ENGINE.unclear
+
+ALL_CATEGORY_NAMES = ENGINE.category_names
+# Compiled once (and cached between runs): one pass over a name finds every keyword
+CATEGORY_MATCHER = ENGINE.category_matcher
+# ENGINE itself, or a persistent ClassificationCache in front of it once main() opens one
+CLASSIFIER = ENGINE
 
 
 def detect_category(folder_name: str) -> str:
     """Return best category name for a given folder by keyword matching.
     First match wins (priority based on CATEGORY_KEYWORDS order).
     """
-    low = folder_name.lower()
-    for cat, keywords in CATEGORY_KEYWORDS:
-        for kw in keywords:
-            if kw in low:
-                return cat
-    return UNCLEAR_CATEGORY
+    return CLASSIFIER.detect_category(folder_name)
+
+
+def category_matches(folder_name: str) -> List[Tuple[str, List[str]]]:
+    """Every category whose keywords occur in the name, in priority order (for diagnostics)."""
+    return CLASSIFIER.category_matches(folder_name)
+
+
+def describe_other_matches(folder_name: str) -> str:
+    others = category_matches(folder_name)[1:]
+    if not others:
+        return ""
+    return " (also matches: " + ", ".join(f"{cat} [{', '.join(kws)}]" for cat, kws in others) + ")"
 
 
 def ensure_category_dirs(base_dir: str) -> None:
@@ -196,6 +83,8 @@ def main() -> None:
         action="store_true",
         help="Also scan inside existing category folders (including 'Unclear') and move items to a better-matched category.",
     )
+    parser.add_argument("--cache", default=DEFAULT_CACHE_PATH, help="Classification cache (SQLite) reused across runs")
+    parser.add_argument("--no-cache", action="store_true", help="Classify every name from scratch")
     args = parser.parse_args()
 
     base_dir = args.base_dir
@@ -208,6 +97,11 @@ def main() -> None:
 
     print(f"Scanning base directory: {base_dir}")
 
+    global CLASSIFIER
+    cache = None if args.no_cache else ClassificationCache(ENGINE, args.cache)
+    if cache is not None:
+        CLASSIFIER = cache
+
     ensure_category_dirs(base_dir)
 
     categorized = 0
@@ -216,17 +110,15 @@ def main() -> None:
     conflicts = 0
     unclear = 0
 
-    try:
-        entries = sorted(os.listdir(base_dir))
-    except Exception as e:
-        print(f"ERROR: Unable to list directory '{base_dir}': {e}")
-        return
+    def on_list_error(path: str, e: OSError) -> None:
+        nonlocal conflicts
+        print(f"ERROR: Unable to list '{path}': {e}")
+        conflicts += 1
 
-    # Process only immediate subdirectories that are not category names
-    for name in entries:
-        src_path = os.path.join(base_dir, name)
-        if not os.path.isdir(src_path):
-            continue  # ignore files
+    # Process only immediate subdirectories (files are ignored) that are not category names
+    for entry in list_dirs(base_dir, on_list_error):
+        name = entry.name
+        src_path = entry.path
         if name in ALL_CATEGORY_NAMES:
             # Skip category folders themselves
             continue
@@ -254,7 +146,7 @@ def main() -> None:
             continue
 
         if dry_run:
-            print(f"DRY-RUN MOVE: '{src_path}' -> '{dest_path}'")
+            print(f"DRY-RUN MOVE: '{src_path}' -> '{dest_path}'{describe_other_matches(name)}")
         else:
             try:
                 shutil.move(src_path, dest_dir)
@@ -271,17 +163,9 @@ def main() -> None:
             current_dir = os.path.join(base_dir, current_category)
             if not os.path.isdir(current_dir):
                 continue
-            try:
-                sub_entries = sorted(os.listdir(current_dir))
-            except Exception as e:
-                print(f"ERROR: Unable to list '{current_dir}': {e}")
-                conflicts += 1
-                continue
-
-            for name in sub_entries:
-                src_path = os.path.join(current_dir, name)
-                if not os.path.isdir(src_path):
-                    continue
+            for entry in list_dirs(current_dir, on_list_error):
+                name = entry.name
+                src_path = entry.path
 
                 new_category = detect_category(name)
                 if new_category == current_category:
@@ -298,7 +182,7 @@ def main() -> None:
                     continue
 
                 if dry_run:
-                    print(f"RECLASS DRY-RUN MOVE: '{src_path}' -> '{dest_path}'")
+                    print(f"RECLASS DRY-RUN MOVE: '{src_path}' -> '{dest_path}'{describe_other_matches(name)}")
                 else:
                     try:
                         shutil.move(src_path, dest_dir)
@@ -319,6 +203,9 @@ def main() -> None:
     print(f"  Unclear (placed into '{UNCLEAR_CATEGORY}'): {unclear}")
     if do_reclassify:
         print(f"  Reclassified (moved between categories): {reclassified}")
+    if cache is not None:
+        cache.save()
+        print(f"  Classification cache: {cache.report()}")
     if dry_run:
         print("\nNote: This was a dry run. Re-run without --dry-run to apply changes.")
 
@@ -0,0 +1,86 @@
+"""Per-field change log for the catalog normalizers, doubling as an audit report.
+
+Normalizers compare each value they touch while they work and record only what
+actually changed, so detecting changes costs no extra serialization of entries:
+
+  with ChangeLog("audit.json") as log:  # or ChangeLog() to only count
+      fill_entry(entry, log)            # auto_fill_details.py
+      fix_entry(entry, log)             # fix_encoding_artifacts.py
+
+The log always keeps per-stage, per-field counters (and len(log), the number of
+changes, decides whether a file needs rewriting). Full records
+{"id", "stage", "field", "before", "after"} are only produced for an audit report,
+and are streamed to it as they happen (catalog_io.CatalogWriter), never held in memory.
+
+Fields are entry keys ("storage"), details rows ("details.Shelf Life") or nested
+paths ("images[2]"). A details list whose values are unchanged but whose rows were
+reordered, added empty or dropped is logged once as field "details" (label lists).
+"""
+from __future__ import annotations
+from typing import Any, Dict, List, Optional
+
+from catalog_io import CatalogWriter
+
+
+class ChangeLog:
+    def __init__(self, audit_path: Optional[str] = None) -> None:
+        self.audit_path = audit_path
+        self.changes = 0
+        self._counts: Dict[str, Dict[str, int]] = {}
+        self._audit: Optional[CatalogWriter] = None
+        if audit_path:
+            self._audit = CatalogWriter(audit_path).__enter__()
+
+    def __len__(self) -> int:
+        return self.changes
+
+    def add(self, entry_id: Any, stage: str, field: str, before: Any, after: Any) -> None:
+        self.changes += 1
+        fields = self._counts.setdefault(stage, {})
+        fields[field] = fields.get(field, 0) + 1
+        if self._audit is not None:
+            self._audit.write({"id": entry_id, "stage": stage, "field": field, "before": before, "after": after})
+
+    def counts(self) -> Dict[str, Dict[str, int]]:
+        """{stage: {field: number of changes}}, fields in first-seen order."""
+        return self._counts
+
+    def close(self, exc_type=None) -> None:
+        """Finish the audit report (discarded if exc_type is set)."""
+        if self._audit is not None:
+            self._audit.__exit__(exc_type, None, None)
+            self._audit = None
+
+    def __enter__(self) -> "ChangeLog":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close(exc_type)
+
+
+def log_details(log: Optional[ChangeLog], entry_id: Any, stage: str, before: List, after: List) -> bool:
+    """Compare two details lists row by row. Logs each label whose value changed and
+    returns True if the lists differ at all (no serialization involved)."""
+    if before == after:
+        return False
+    if log is not None:
+        old = {str(r.get("label")): r.get("value", "") for r in before if isinstance(r, dict) and r.get("label")}
+        logged = False
+        for row in after:
+            label = str(row.get("label"))
+            if old.get(label) != row.get("value"):
+                log.add(entry_id, stage, f"details.{label}", old.get(label), row.get("value"))
+                logged = True
+        if not logged:
+            log.add(entry_id, stage, "details",
+                    [r.get("label") for r in before if isinstance(r, dict)],
+                    [r.get("label") for r in after if isinstance(r, dict)])
+    return True
+
+
+def print_change_report(log: ChangeLog) -> None:
+    for stage, fields in log.counts().items():
+        top = sorted(fields.items(), key=lambda kv: -kv[1])[:5]
+        print(f"  Changes ({stage}): {sum(fields.values())} fields - " + ", ".join(f"{k}={v}" for k, v in top))
+    if log.audit_path:
+        print(f"  Wrote: {log.audit_path} ({len(log)} changes)")
@@ -0,0 +1,214 @@
+"""Shared classification engine: one keyword dataset, compiled once, used by every script.
+
+The dataset (classification_keywords.json next to this file) holds:
+  categories   ordered [{"name", "keywords"}] - earlier categories win when several match
+  unclear      folder name used when nothing matches
+  ingredients  active-ingredient names recognized in medicine names (auto_fill_details.py)
+
+The dataset is versioned by the SHA-256 of its bytes. The compiled matchers are
+pickled to __pycache__/classification-<format>-<version>.pickle (<format> is
+COMPILED_FORMAT, bumped when the pickled structure changes), so later runs (and other
+scripts) load the automaton instead of rebuilding it; editing the dataset changes
+the version and the cache is rebuilt on next use.
+
+ClassificationCache additionally remembers the result for every folder name it has
+classified (SQLite, __pycache__/classification-cache.sqlite3), per dataset version,
+so repeated categorize runs only classify names they have not seen before.
+
+Used by categorize_medicines.py, categorize_medicines_web2.py and auto_fill_details.py.
+
+Usage:
+    from classification import load_engine
+
+    engine = load_engine()
+    engine.detect_category("tadalista-20mg")      # "Erectile_Dysfunction"
+    engine.find_ingredients("Tadalafil + Dapoxetine Tablets", limit=2)
+"""
+from __future__ import annotations
+import os
+import sys
+import json
+import pickle
+import sqlite3
+import hashlib
+import tempfile
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from keyword_matcher import KeywordMatcher
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+DATASET_PATH = os.path.join(SCRIPTS_DIR, "classification_keywords.json")
+CACHE_DIR = os.path.join(SCRIPTS_DIR, "__pycache__")
+DEFAULT_CACHE_PATH = os.path.join(CACHE_DIR, "classification-cache.sqlite3")
+# Bump when the compiled layout (ClassificationEngine/KeywordMatcher) changes
+COMPILED_FORMAT = 1
+
+
+class ClassificationEngine:
+    def __init__(self, version: str, categories: List[Tuple[str, List[str]]], unclear: str, ingredients: List[str]) -> None:
+        self.version = version
+        self.categories = categories
+        self.unclear = unclear
+        self.ingredients = ingredients
+        self.category_matcher = KeywordMatcher(categories)
+        # One label per ingredient, so matches come back in dataset order
+        self.ingredient_matcher = KeywordMatcher([(kw, [kw]) for kw in ingredients])
+
+    @property
+    def category_names(self) -> List[str]:
+        return [name for name, _ in self.categories] + [self.unclear]
+
+    def detect_category(self, name: str) -> str:
+        """First matching category in dataset order, else the unclear category."""
+        return self.category_matcher.first(name, self.unclear)
+
+    def category_matches(self, name: str) -> List[Tuple[str, List[str]]]:
+        """Every matching category with its keywords, in priority order."""
+        return self.category_matcher.matches(name)
+
+    def find_ingredients(self, text: str, limit: Optional[int] = None) -> List[str]:
+        """Ingredients occurring in text, in dataset order."""
+        found = [label for label, _ in self.ingredient_matcher.matches(text)]
+        return found[:limit] if limit is not None else found
+
+
+def dataset_version(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+def _cache_path(version: str) -> str:
+    return os.path.join(CACHE_DIR, f"classification-{COMPILED_FORMAT}-{version}.pickle")
+
+
+def compile_dataset(data: bytes, version: str) -> ClassificationEngine:
+    raw = json.loads(data.decode("utf-8"))
+    categories = [(c["name"], list(c.get("keywords", []))) for c in raw.get("categories", [])]
+    return ClassificationEngine(version, categories, raw.get("unclear", "Unclear"), list(raw.get("ingredients", [])))
+
+
+def _load_cached(path: str, version: str) -> Optional[ClassificationEngine]:
+    try:
+        with open(path, "rb") as f:
+            engine = pickle.load(f)
+    except Exception:
+        return None
+    return engine if isinstance(engine, ClassificationEngine) and engine.version == version else None
+
+
+def _save_cached(path: str, engine: ClassificationEngine) -> None:
+    # The cache is an optimization only; a read-only checkout just compiles every run
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(prefix=".classification-", dir=os.path.dirname(path))
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(engine, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+    except OSError as e:
+        print(f"WARNING: Cannot cache compiled keywords at '{path}': {e}", file=sys.stderr)
+
+
+@lru_cache(maxsize=None)
+def load_engine(path: str = DATASET_PATH) -> ClassificationEngine:
+    """Load (or reuse the compiled cache of) the keyword dataset. Cached per process."""
+    with open(path, "rb") as f:
+        data = f.read()
+    version = dataset_version(data)
+    cache_path = _cache_path(version)
+    engine = _load_cached(cache_path, version)
+    if engine is None:
+        engine = compile_dataset(data, version)
+        _save_cached(cache_path, engine)
+    return engine
+
+Classification = Tuple[str, List[Tuple[str, List[str]]]]
+
+
+def normalize_name(name: str) -> str:
+    # Matching is case-insensitive substring search, so case is the only thing to fold
+    return name.lower()
+
+
+class ClassificationCache:
+    """Persistent memo of name -> (category, all matches) for one dataset version (SQLite).
+
+    Rows for the current version are loaded in one query when opened and new results
+    are written in one transaction by save(); rows from other versions are dropped,
+    so editing the keyword dataset invalidates the whole cache.
+    """
+
+    def __init__(self, engine: ClassificationEngine, path: str = DEFAULT_CACHE_PATH) -> None:
+        self.engine = engine
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._known: Dict[str, Classification] = {}
+        self._new: Dict[str, Classification] = {}
+        self._db: Optional[sqlite3.Connection] = None
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._db = sqlite3.connect(path)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS classifications ("
+                " version TEXT NOT NULL, name TEXT NOT NULL, category TEXT NOT NULL, matches TEXT NOT NULL,"
+                " PRIMARY KEY (version, name))"
+            )
+            with self._db:
+                self._db.execute("DELETE FROM classifications WHERE version != ?", (engine.version,))
+            rows = self._db.execute("SELECT name, category, matches FROM classifications WHERE version = ?", (engine.version,))
+            for name, category, matches in rows:
+                self._known[name] = (category, [(c, kws) for c, kws in json.loads(matches)])
+        except sqlite3.Error as e:
+            print(f"WARNING: Classification cache unavailable at '{path}': {e}", file=sys.stderr)
+            self._db = None
+
+    def __len__(self) -> int:
+        return len(self._known)
+
+    def classify(self, name: str) -> Classification:
+        key = normalize_name(name)
+        known = self._known.get(key)
+        if known is not None:
+            self.hits += 1
+            return known
+        self.misses += 1
+        matches = self.engine.category_matches(name)
+        result = (matches[0][0] if matches else self.engine.unclear, matches)
+        self._known[key] = self._new[key] = result
+        return result
+
+    def detect_category(self, name: str) -> str:
+        return self.classify(name)[0]
+
+    def category_matches(self, name: str) -> List[Tuple[str, List[str]]]:
+        # Diagnostics for a name that was usually just classified: don't count it twice
+        known = self._known.get(normalize_name(name))
+        return (known or self.classify(name))[1]
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def save(self) -> int:
+        """Write names classified this run and close. Returns the number of rows added."""
+        if self._db is None:
+            return 0
+        added = len(self._new)
+        try:
+            with self._db:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO classifications (version, name, category, matches) VALUES (?, ?, ?, ?)",
+                    [(self.engine.version, k, c, json.dumps(m, ensure_ascii=False)) for k, (c, m) in self._new.items()],
+                )
+        except sqlite3.Error as e:
+            print(f"WARNING: Cannot update classification cache '{self.path}': {e}", file=sys.stderr)
+            added = 0
+        finally:
+            self._db.close()
+            self._db = None
+        self._new.clear()
+        return added
+
+    def report(self) -> str:
+        return f"{self.hits} hits, {self.misses} misses ({self.hit_rate:.1%} hit rate, {len(self)} names cached)"
@@ -1,8 +1,11 @@
-import json
 import re
 import argparse
 from pathlib import Path
 
+from catalog_io import CatalogWriter, iter_entries, sniff_encoding
+from change_log import ChangeLog, print_change_report
+from snapshot_store import record_catalog
+
 DATA_PATH = Path(r"S:\MedCare\src\data\medicines.json")
 
 # Patterns for normalization
@@ -66,44 +69,79 @@ def normalize_text(s: str) -> str:
     return t
 
 
-def normalize_entry(obj):
-    # Recursively normalize all strings in dict/list
+STAGE = "encoding"
+
+
+def normalize_entry(obj, field="", changes=None):
+    # Recursively normalize all strings in dict/list, in place.
+    # Each changed string is appended to changes as (field, before, after).
+    changes = changes if changes is not None else []
     if isinstance(obj, dict):
-        return {k: normalize_entry(v) for k, v in obj.items()}
+        for k, v in obj.items():
+            new = normalize_entry(v, f"{field}.{k}" if field else k, changes)
+            if new is not v:
+                obj[k] = new
+        return obj
     if isinstance(obj, list):
-        return [normalize_entry(v) for v in obj]
+        for i, v in enumerate(obj):
+            # details rows are addressed by label: details.Shelf Life
+            if field == "details" and isinstance(v, dict) and v.get("label"):
+                row_field = f"details.{v['label']}"
+                for k in v:
+                    new = normalize_entry(v[k], row_field if k == "value" else f"{row_field}.{k}", changes)
+                    if new is not v[k]:
+                        v[k] = new
+                continue
+            new = normalize_entry(v, f"{field}[{i}]", changes)
+            if new is not v:
+                obj[i] = new
+        return obj
     if isinstance(obj, str):
-        return normalize_text(obj)
+        t = normalize_text(obj)
+        if t != obj:
+            changes.append((field, obj, t))
+            return t
     return obj
 
 
+def fix_value(value, log: ChangeLog = None):
+    """Normalize any top-level array element. Returns (value, changed); dicts and
+    lists are fixed in place, a string element comes back as a new string."""
+    changes = []
+    value = normalize_entry(value, "", changes)
+    if log is not None:
+        entry_id = value.get("id") if isinstance(value, dict) else None
+        for field, before, after in changes:
+            log.add(entry_id, STAGE, field or "value", before, after)
+    return value, bool(changes)
+
+
+def fix_entry(entry, log: ChangeLog = None) -> bool:
+    """Normalize one entry in place. Returns True if anything changed."""
+    return fix_value(entry, log)[1]
+
+
 def main():
     parser = argparse.ArgumentParser(description="Normalize encoding artifacts in a JSON dataset")
     parser.add_argument("--path", type=str, default=str(DATA_PATH), help="Path to JSON file to normalize")
+    parser.add_argument("--audit", type=str, default=None, help="Write every changed field (id, field, before, after) to this JSON file")
     args = parser.parse_args()
 
     target_path = Path(args.path)
-    # Robust load with encoding fallbacks
-    encodings = ["utf-8", "utf-8-sig", "utf-16", "utf-16-le", "utf-16-be"]
-    last_err = None
-    for enc in encodings:
-        try:
-            with target_path.open("r", encoding=enc) as f:
-                data = json.load(f)
-            last_err = None
-            break
-        except Exception as e:
-            last_err = e
-            data = None
-    if data is None:
-        raise RuntimeError(f"Failed to load JSON {target_path} due to encoding: {last_err}")
-    before = json.dumps(data, ensure_ascii=False)
-    data_norm = [normalize_entry(e) for e in data]
-    after = json.dumps(data_norm, ensure_ascii=False)
-    if before != after:
-        with target_path.open("w", encoding="utf-8") as f:
-            json.dump(data_norm, f, indent=2, ensure_ascii=False)
-        print(f"Normalized encoding artifacts in {target_path.name}. Updated {len(data_norm)} entries.")
+    # Stream entry-by-entry into a temp file; it only replaces the target if something changed
+    encoding = sniff_encoding(str(target_path))
+    print(f"Reading {target_path.name} as {encoding}")
+    with ChangeLog(args.audit) as log, CatalogWriter(str(target_path)) as out:
+        for e in iter_entries(str(target_path), encoding):
+            # Every element is normalized, not only entry objects
+            e, _ = fix_value(e, log)
+            out.write(e)
+        if not len(log):
+            out.discard()
+    if len(log):
+        print(f"Normalized encoding artifacts in {target_path.name}. Updated {out.count} entries.")
+        print_change_report(log)
+        record_catalog(str(target_path))
     else:
         print(f"No changes needed for {target_path.name}.")
 
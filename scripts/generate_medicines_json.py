@@ -26,7 +26,7 @@ import shutil
 import argparse
 from typing import List, Dict, Optional
 
-IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".webp"}
+from catalog_walk import list_images, walk_catalog
 
 CATEGORY_DISPLAY_MAP = {
     "Erectile_Dysfunction": "Erectile Dysfunction",
@@ -108,17 +108,7 @@ def slugify(raw: str) -> str:
 
 
 def find_images(folder: str) -> List[str]:
-    files: List[str] = []
-    try:
-        for entry in sorted(os.listdir(folder)):
-            p = os.path.join(folder, entry)
-            if os.path.isfile(p):
-                _, ext = os.path.splitext(entry)
-                if ext.lower() in IMAGE_EXTS:
-                    files.append(entry)
-    except FileNotFoundError:
-        return []
-    return files
+    return [e.name for e in list_images(folder)]
 
 
 def build_entry(cat_folder: str, med_folder: str, display_category: str, base_dir: str, public_dir: str, copy_images: bool) -> Dict:
@@ -181,19 +171,15 @@ def main():
         print(f"ERROR: Base directory not found: {base_dir}")
         return
 
-    categories = [d for d in sorted(os.listdir(base_dir)) if os.path.isdir(os.path.join(base_dir, d))]
     entries: List[Dict] = []
     skipped = 0
 
-    for cat in categories:
+    for cat, med, _ in walk_catalog(base_dir, with_images=False):
         display_category = CATEGORY_DISPLAY_MAP.get(cat, cat.replace("_", " "))
-        cat_path = os.path.join(base_dir, cat)
-        meds = [m for m in sorted(os.listdir(cat_path)) if os.path.isdir(os.path.join(cat_path, m))]
-        for med in meds:
-            entry = build_entry(cat, med, display_category, base_dir, public_dir, copy_images=not args.dry_run and args.copy_images)
-            if entry["image"] is None:
-                skipped += 1
-            entries.append(entry)
+        entry = build_entry(cat, med.name, display_category, base_dir, public_dir, copy_images=not args.dry_run and args.copy_images)
+        if entry["image"] is None:
+            skipped += 1
+        entries.append(entry)
 
     print(f"Processed {len(entries)} medicines. Missing images: {skipped}.")
 
@@ -26,7 +26,8 @@ import shutil
 import argparse
 from typing import List, Dict, Optional
 
-IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".webp"}
+from catalog_walk import list_images, walk_catalog
+from name_parser import parse_name
 
 CATEGORY_DISPLAY_MAP = {
     "Erectile_Dysfunction": "Erectile Dysfunction",
@@ -64,79 +65,14 @@ CATEGORY_BASE_PRICE = {
     "Uncategorized": 10.0,
 }
 
-# Updated dosage pattern to capture dosages at the end of folder names
-DOSAGE_PATTERN = re.compile(r"(\b\d+(?:\.\d+)?\s*mg\b|\b\d+\s*ml\b|\b\d+\s*g\b)", re.IGNORECASE)
-
-FORM_KEYWORDS = {
-    "Tablet": ["tablet", "tabs"],
-    "Capsule": ["capsule", "capsules"],
-    "Injection": ["injection"],
-    "Gel": ["gel"],
-    "Cream": ["cream"],
-    "Liquid": ["syrup", "suspension"],
-    "Jelly": ["jelly"],
-}
-
-
-def infer_form(name: str) -> str:
-    low = name.lower()
-    for form, kws in FORM_KEYWORDS.items():
-        for kw in kws:
-            if kw in low:
-                return form
-    return "Tablet"
-
-
-def extract_dosage(raw: str) -> Optional[str]:
-    """Extract dosage from folder name, prioritizing dosage at the end."""
-    # Look for dosage pattern at the end of the string
-    end_match = re.search(r"(\d+(?:\.\d+)?\s*mg|\d+\s*ml|\d+\s*g)\s*$", raw, re.IGNORECASE)
-    if end_match:
-        token = end_match.group(1).lower()
-        # Normalize spacing: e.g., '250mg' -> '250 mg'
-        token = re.sub(r"(\d+(?:\.\d+)?)\s*(mg|ml|g)", r"\1 \2", token)
-        return token
-    
-    # Fallback to any dosage in the string
-    m = DOSAGE_PATTERN.search(raw)
-    if not m:
-        return None
-    token = m.group(0).lower()
-    # Normalize spacing: e.g., '250mg' -> '250 mg'
-    token = re.sub(r"(\d+(?:\.\d+)?)\s*(mg|ml|g)", r"\1 \2", token)
-    return token
-
-
-def clean_base_name(raw: str) -> str:
-    """Clean and format the medicine name following the pattern: Medicine Name"""
-    name = raw.replace("-", " ").replace("_", " ")
-    name = re.sub(r"\s+", " ", name)
-    
-    # Remove dosage tokens for base name; we'll append later in standardized format
-    name = DOSAGE_PATTERN.sub("", name)
-    
-    # Remove form keywords as they'll be handled separately
-    for form, kws in FORM_KEYWORDS.items():
-        for kw in kws:
-            name = re.sub(rf"\b{re.escape(kw)}\b", "", name, flags=re.IGNORECASE)
-    
-    name = name.strip()
-    
-    # Split into words and capitalize each appropriately
-    words = name.split()
-    cleaned_words = []
-    
-    for word in words:
-        # Keep certain medical terms in specific formats
-        word_lower = word.lower()
-        if word_lower in ['hcl', 'ip', 'bp', 'usp']:
-            cleaned_words.append(word.upper())
-        elif len(word) > 1:
-            cleaned_words.append(word.capitalize())
-        elif word:
-            cleaned_words.append(word.upper())
-    
-    return " ".join(cleaned_words)
+def web2_display_name(med_folder: str) -> str:
+    """Medicine Name Dose, like parse_name().display_name except that this generator
+    has always kept the merge suffix in the name ("Kamagra V1 100 mg")."""
+    parsed = parse_name(med_folder)
+    base_name = parsed.base_name
+    if parsed.version is not None:
+        base_name = f"{base_name} {med_folder[med_folder.rfind('_v') + 1:].capitalize()}".strip()
+    return f"{base_name} {parsed.dosage}".strip() if parsed.dosage else base_name
 
 
 def slugify(raw: str) -> str:
@@ -149,22 +85,13 @@ def slugify(raw: str) -> str:
 
 
 def find_images(folder: str) -> List[str]:
-    files: List[str] = []
-    try:
-        for entry in sorted(os.listdir(folder)):
-            p = os.path.join(folder, entry)
-            if os.path.isfile(p):
-                _, ext = os.path.splitext(entry)
-                if ext.lower() in IMAGE_EXTS:
-                    files.append(entry)
-    except FileNotFoundError:
-        return []
-    return files
+    return [e.name for e in list_images(folder)]
 
 
-def build_entry(cat_folder: str, med_folder: str, display_category: str, base_dir: str, public_dir: str, copy_images: bool) -> Dict:
+def build_entry(cat_folder: str, med_folder: str, display_category: str, base_dir: str, public_dir: str, copy_images: bool, image_files: Optional[List[str]] = None) -> Dict:
     full_path = os.path.join(base_dir, cat_folder, med_folder)
-    image_files = find_images(full_path)
+    if image_files is None:
+        image_files = find_images(full_path)
     slug = slugify(med_folder)
     image_rel = None
     images_rel: List[str] = []
@@ -183,14 +110,10 @@ def build_entry(cat_folder: str, med_folder: str, display_category: str, base_di
                     shutil.copy2(src, dst)
         image_rel = images_rel[0] if images_rel else None
     
-    dosage = extract_dosage(med_folder)
-    display_name = clean_base_name(med_folder)
-    
+    parsed = parse_name(med_folder)
     # Format: Medicine Name Dose (e.g., "Kamagra 100 mg", "Tadalafil 20 mg")
-    if dosage:
-        display_name = f"{display_name} {dosage}".strip()
-    
-    form = infer_form(med_folder)
+    display_name = web2_display_name(med_folder)
+    form = parsed.form
     base_price = CATEGORY_BASE_PRICE.get(display_category, 10.0)
     
     return {
@@ -235,43 +158,19 @@ def main() -> None:
     print(f"Scanning: {base_dir}")
     print(f"Copy images: {copy_images}")
     print(f"Output: {output_path}")
-    
-    try:
-        category_dirs = sorted(os.listdir(base_dir))
-    except Exception as e:
-        print(f"ERROR: Cannot list base directory: {e}")
-        return
-
-    for cat_folder in category_dirs:
-        cat_path = os.path.join(base_dir, cat_folder)
-        if not os.path.isdir(cat_path):
-            continue
 
+    for cat_folder, med_entry, image_entries in walk_catalog(base_dir, with_images=not dry_run):
+        med_folder = med_entry.name
         display_category = CATEGORY_DISPLAY_MAP.get(cat_folder, cat_folder.replace("_", " ").title())
         categories_found.add(display_category)
 
-        try:
-            med_folders = sorted(os.listdir(cat_path))
-        except Exception as e:
-            print(f"ERROR: Cannot list category '{cat_folder}': {e}")
-            continue
-
-        for med_folder in med_folders:
-            med_path = os.path.join(cat_path, med_folder)
-            if not os.path.isdir(med_path):
-                continue
-
-            total_found += 1
-            if not dry_run:
-                entry = build_entry(cat_folder, med_folder, display_category, base_dir, public_dir, copy_images)
-                medicines.append(entry)
-                print(f"✓ {entry['name']} ({display_category})")
-            else:
-                dosage = extract_dosage(med_folder)
-                display_name = clean_base_name(med_folder)
-                if dosage:
-                    display_name = f"{display_name} {dosage}"
-                print(f"DRY-RUN: {display_name} ({display_category})")
+        total_found += 1
+        if not dry_run:
+            entry = build_entry(cat_folder, med_folder, display_category, base_dir, public_dir, copy_images, [e.name for e in image_entries])
+            medicines.append(entry)
+            print(f"✓ {entry['name']} ({display_category})")
+        else:
+            print(f"DRY-RUN: {web2_display_name(med_folder)} ({display_category})")
 
     print(f"\nSummary:")
     print(f"  Total medicines found: {total_found}")
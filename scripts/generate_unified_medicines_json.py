@@ -13,16 +13,111 @@ Usage (PowerShell):
 
 Dry run (no file writes, only summary):
   py .\scripts\generate_unified_medicines_json.py --medicines-dir "s:\MedCare\medicines" --dry-run
+
+Image materialization (--copy-images): --materialize selects copy (default), hardlink,
+reflink (copy-on-write clone, Linux btrfs/xfs) or symlink. Unsupported strategies fall
+back to a plain copy. A destination is skipped when it already has the form the strategy
+(or its fallback) produces: a symlink or hardlink to the source, or a separate copy whose
+size+mtime match it (--compare hash also accepts identical content with a different
+mtime). Switching strategies therefore relinks or re-copies on the next run.
+  py .\scripts\generate_unified_medicines_json.py --medicines-dir "s:\MedCare\medicines" --public-dir "s:\MedCare\public" --copy-images --materialize hardlink
+
+Content-addressed images (--content-addressed): every image is hashed and stored once as
+public/img/<hash>.<ext>; image/images in medicines.json point at /img/<hash>.<ext>, so
+identical packshots shared by several medicines (variants, _v1 duplicates) are shipped once
+and the URLs are immutable (safe to cache forever). A bytes-saved report is printed.
+  py .\scripts\generate_unified_medicines_json.py --medicines-dir "s:\MedCare\medicines" --public-dir "s:\MedCare\public" --copy-images --content-addressed
+
+Responsive derivatives (--derivatives, needs pillow): after images are in place, thumbnails
+and WebP/AVIF variants are generated in a process pool (see image_derivatives.py) and each
+entry gets thumbnail, srcset, width and height for its primary image, plus imageVariants
+(the same per image in "images").
+  py .\scripts\generate_unified_medicines_json.py --medicines-dir "s:\MedCare\medicines" --public-dir "s:\MedCare\public" --copy-images --derivatives
+
+Split output (--split): also publishes a list index (list fields only) and per-medicine
+detail files under catalog/ next to the output, as one build named by catalog/current.json
+(see catalog_split.py).
+  py .\scripts\generate_unified_medicines_json.py --medicines-dir "s:\MedCare\medicines" --output "s:\MedCare\src\data\medicines.json" --split
+
+Search index (--search-index): also writes a typo-tolerant token/trigram index next to the
+output, e.g. src/data/medicines.search.json (see search_index.py).
+  py .\scripts\generate_unified_medicines_json.py --medicines-dir "s:\MedCare\medicines" --output "s:\MedCare\src\data\medicines.json" --search-index
+
+Virtual categories (--recategorize): after the scan, categories are reassigned in memory
+from the classification rules and <output>.overrides.json (see recategorize_catalog.py),
+so a folder-based rebuild keeps categories that were changed without moving folders.
+  py .\scripts\generate_unified_medicines_json.py --medicines-dir "s:\MedCare\medicines" --output "s:\MedCare\src\data\medicines.json" --recategorize
+
+Post-processing (--pipeline): auto-fill, detail restore (from the snapshot store below)
+and the encoding fix run in memory on every entry before the output is written, instead
+of as separate scripts that each re-read and re-write it (see catalog_pipeline.py).
+  py .\scripts\generate_unified_medicines_json.py --medicines-dir "s:\MedCare\medicines" --output "s:\MedCare\src\data\medicines.json" --pipeline
+
+Snapshot history: every build that writes the output is also recorded in an append-only
+SQLite store next to it, e.g. src/data/medicines.snapshots.sqlite (one row per changed
+entry version; see snapshot_store.py). merge_old_details.py --store restores details from
+it. --snapshot-store picks another path, --no-snapshot skips recording.
+
+Incremental rebuild (only folders added/changed/removed since the last run are rebuilt;
+state is kept in a manifest next to the output, e.g. src/data/medicines.manifest.json).
+When nothing changed, the output is kept, but requested post-steps still run: --split and
+--search-index when their outputs are missing or older than the output, --derivatives
+when some entry lacks (or has outdated) derivative fields.
+  py .\scripts\generate_unified_medicines_json.py --medicines-dir "s:\MedCare\medicines" --public-dir "s:\MedCare\public" --output "s:\MedCare\src\data\medicines.json" --copy-images --incremental
 """
 from __future__ import annotations
 import os
 import re
+import sys
 import json
+import errno
 import shutil
+import hashlib
 import argparse
-from typing import List, Dict, Optional
+from typing import Iterable, Iterator, List, Dict, Optional, Set
+
+from catalog_io import iter_entries, load_json, write_entries
+from catalog_pipeline import build_stages, print_stage_report, run_stages
+from catalog_split import POINTER_FILE, current_split_build, default_split_dir, print_split_report, write_split_catalog
+from catalog_walk import list_images, walk_catalog
+from image_derivatives import add_derivatives, print_derivative_report
+from merge_old_details import DetailRestorer
+from name_parser import parse_name
+from search_index import build_search_index, default_index_path, print_search_index_report, write_search_index
+from snapshot_store import SnapshotStore, default_store_path, print_snapshot_report
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+MANIFEST_VERSION = 1
+
+# Content-addressed store: public/<CONTENT_STORE_DIR>/<first CONTENT_HASH_LENGTH hex chars of sha256><ext>
+CONTENT_STORE_DIR = "img"
+CONTENT_HASH_LENGTH = 16
+
+MATERIALIZE_STRATEGIES = ("copy", "hardlink", "reflink", "symlink")
+
+# FICLONE ioctl request number (linux/fs.h)
+FICLONE = 0x40049409
+
+# errno values meaning "this strategy does not work here" rather than a real failure
+_UNSUPPORTED_ERRNOS = {
+    errno.EXDEV,
+    errno.EPERM,
+    errno.EINVAL,
+    errno.ENOTTY,
+    errno.EOPNOTSUPP,
+    getattr(errno, "ENOTSUP", errno.EOPNOTSUPP),
+    getattr(errno, "ENOSYS", errno.EOPNOTSUPP),
+}
+
+# Strategies that already failed as unsupported in this run (skip straight to copy)
+_UNSUPPORTED_STRATEGIES: Set[str] = set()
 
-IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".webp"}
+# Content-addressed objects referenced in this run: store name -> size in bytes
+_STORED_OBJECTS: Dict[str, int] = {}
 
 CATEGORY_DISPLAY_MAP = {
     "Erectile_Dysfunction": "Erectile Dysfunction",
@@ -60,84 +155,6 @@ CATEGORY_BASE_PRICE = {
     "Uncategorized": 10.0,
 }
 
-# Updated dosage pattern to capture dosages at the end of folder names
-DOSAGE_PATTERN = re.compile(r"(\b\d+(?:\.\d+)?\s*mg\b|\b\d+\s*ml\b|\b\d+\s*g\b)", re.IGNORECASE)
-
-FORM_KEYWORDS = {
-    "Tablet": ["tablet", "tabs"],
-    "Capsule": ["capsule", "capsules"],
-    "Injection": ["injection"],
-    "Gel": ["gel"],
-    "Cream": ["cream"],
-    "Liquid": ["syrup", "suspension"],
-    "Jelly": ["jelly"],
-}
-
-
-def infer_form(name: str) -> str:
-    low = name.lower()
-    for form, kws in FORM_KEYWORDS.items():
-        for kw in kws:
-            if kw in low:
-                return form
-    return "Tablet"
-
-
-def extract_dosage(raw: str) -> Optional[str]:
-    """Extract dosage from folder name, prioritizing dosage at the end."""
-    # Look for dosage pattern at the end of the string
-    end_match = re.search(r"(\d+(?:\.\d+)?\s*mg|\d+\s*ml|\d+\s*g)\s*$", raw, re.IGNORECASE)
-    if end_match:
-        token = end_match.group(1).lower()
-        # Normalize spacing: e.g., '250mg' -> '250 mg'
-        token = re.sub(r"(\d+(?:\.\d+)?)\s*(mg|ml|g)", r"\1 \2", token)
-        return token
-    
-    # Fallback to any dosage in the string
-    m = DOSAGE_PATTERN.search(raw)
-    if not m:
-        return None
-    token = m.group(0).lower()
-    # Normalize spacing: e.g., '250mg' -> '250 mg'
-    token = re.sub(r"(\d+(?:\.\d+)?)\s*(mg|ml|g)", r"\1 \2", token)
-    return token
-
-
-def clean_base_name(raw: str) -> str:
-    """Clean and format the medicine name following the pattern: Medicine Name"""
-    # Remove version suffixes added during merge (e.g., "_v1", "_v2")
-    name = re.sub(r"_v\d+$", "", raw)
-    
-    name = name.replace("-", " ").replace("_", " ")
-    name = re.sub(r"\s+", " ", name)
-    
-    # Remove dosage tokens for base name; we'll append later in standardized format
-    name = DOSAGE_PATTERN.sub("", name)
-    
-    # Remove form keywords as they'll be handled separately
-    for form, kws in FORM_KEYWORDS.items():
-        for kw in kws:
-            name = re.sub(rf"\b{re.escape(kw)}\b", "", name, flags=re.IGNORECASE)
-    
-    name = name.strip()
-    
-    # Split into words and capitalize each appropriately
-    words = name.split()
-    cleaned_words = []
-    
-    for word in words:
-        # Keep certain medical terms in specific formats
-        word_lower = word.lower()
-        if word_lower in ['hcl', 'ip', 'bp', 'usp']:
-            cleaned_words.append(word.upper())
-        elif len(word) > 1:
-            cleaned_words.append(word.capitalize())
-        elif word:
-            cleaned_words.append(word.upper())
-    
-    return " ".join(cleaned_words)
-
-
 def slugify(raw: str) -> str:
     slug = raw.lower().strip()
     slug = slug.replace(" ", "-")
@@ -148,27 +165,282 @@ def slugify(raw: str) -> str:
 
 
 def find_images(folder: str) -> List[str]:
-    files: List[str] = []
+    return [e.name for e in list_images(folder)]
+
+
+def file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def effective_strategy(materialize: str) -> str:
+    """The strategy actually applied: copy once materialize proved unsupported."""
+    return "copy" if materialize in _UNSUPPORTED_STRATEGIES else materialize
+
+
+def is_stale(path: str, reference: str) -> bool:
+    """True if the derived file path is missing or older than reference."""
+    try:
+        return os.path.getmtime(path) < os.path.getmtime(reference)
+    except OSError:
+        return True
+
+
+def is_up_to_date(src: str, dst: str, materialize: str, compare: str) -> bool:
+    """Return True when dst already mirrors src in the form materialize produces,
+    normally at the cost of one stat each."""
     try:
-        for entry in sorted(os.listdir(folder)):
-            p = os.path.join(folder, entry)
-            if os.path.isfile(p):
-                _, ext = os.path.splitext(entry)
-                if ext.lower() in IMAGE_EXTS:
-                    files.append(entry)
-    except FileNotFoundError:
-        return []
-    return files
-
-
-def build_entry(cat_folder: str, med_folder: str, display_category: str, medicines_dir: str, public_dir: str, copy_images: bool) -> Dict:
+        dst_st = os.lstat(dst)
+    except OSError:
+        return False
+    if os.path.islink(dst):
+        # A symlink is only current if we are still symlinking and it points at src
+        return materialize == "symlink" and os.path.realpath(dst) == os.path.realpath(src)
+    if materialize == "symlink":
+        return False
+    src_st = os.stat(src)
+    same_file = (src_st.st_dev, src_st.st_ino) == (dst_st.st_dev, dst_st.st_ino)
+    if materialize == "hardlink" or same_file:
+        # Hardlinking wants the same inode; copy/reflink want a separate file
+        return materialize == "hardlink" and same_file
+    if src_st.st_size != dst_st.st_size:
+        return False
+    if int(src_st.st_mtime) == int(dst_st.st_mtime):
+        return True
+    return compare == "hash" and file_digest(src) == file_digest(dst)
+
+
+def _reflink(src: str, dst: str) -> None:
+    if fcntl is None:
+        raise OSError(errno.EOPNOTSUPP, "reflink is not supported on this platform")
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        try:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+        except OSError:
+            fdst.close()
+            os.unlink(dst)
+            raise
+    shutil.copystat(src, dst)
+
+
+def _materialize_with(strategy: str, src: str, dst: str) -> None:
+    if strategy == "hardlink":
+        os.link(src, dst)
+    elif strategy == "reflink":
+        _reflink(src, dst)
+    elif strategy == "symlink":
+        os.symlink(os.path.abspath(src), dst)
+    else:
+        shutil.copy2(src, dst)
+
+
+def materialize_image(src: str, dst: str, materialize: str = "copy", compare: str = "stat", stats: Optional[Dict[str, int]] = None) -> str:
+    """Place src at dst using the requested strategy, falling back to a copy when the
+    strategy is not supported (cross-device link, no reflink support, no symlink privilege).
+    Returns the action taken: 'skipped' or the strategy actually used."""
+    strategy = effective_strategy(materialize)
+    action = "skipped"
+    if not is_up_to_date(src, dst, strategy, compare):
+        # Build next to dst and swap it in: never write through an existing destination,
+        # it may be a hardlink to a source file
+        tmp = f"{dst}.tmp"
+        if os.path.lexists(tmp):
+            os.unlink(tmp)
+        action = strategy
+        try:
+            _materialize_with(strategy, src, tmp)
+        except OSError as e:
+            if strategy == "copy" or e.errno not in _UNSUPPORTED_ERRNOS:
+                raise
+            print(f"WARNING: {strategy} not supported ({e}); falling back to copy", file=sys.stderr)
+            _UNSUPPORTED_STRATEGIES.add(strategy)
+            # From here on dst is judged as a copy, so a current copy is left alone
+            action = "skipped" if is_up_to_date(src, dst, "copy", compare) else "copy"
+            if action == "copy":
+                shutil.copy2(src, tmp)
+        if action != "skipped":
+            os.replace(tmp, dst)
+    if stats is not None:
+        stats[action] = stats.get(action, 0) + 1
+    return action
+
+
+def store_image(src: str, store_dir: str, copy_images: bool, materialize: str = "copy", compare: str = "stat", stats: Optional[Dict[str, int]] = None) -> str:
+    """Add src to the content-addressed store and return its store name (<hash><ext>).
+    Identical files map to the same name and are materialized only once."""
+    name = file_digest(src)[:CONTENT_HASH_LENGTH] + os.path.splitext(src)[1].lower()
+    size = os.path.getsize(src)
+    if stats is not None:
+        stats["store_refs"] = stats.get("store_refs", 0) + 1
+        stats["store_ref_bytes"] = stats.get("store_ref_bytes", 0) + size
+    if name in _STORED_OBJECTS:
+        return name
+    _STORED_OBJECTS[name] = size
+    if copy_images:
+        dst = os.path.join(store_dir, name)
+        # Store names are derived from content, so an existing copy of the right size is
+        # current; links are checked against the source like any other destination
+        if effective_strategy(materialize) in ("copy", "reflink") and os.path.isfile(dst) and not os.path.islink(dst) and os.path.getsize(dst) == size:
+            if stats is not None:
+                stats["skipped"] = stats.get("skipped", 0) + 1
+        else:
+            materialize_image(src, dst, materialize, compare, stats)
+    return name
+
+
+def print_store_report(stats: Dict[str, int]) -> None:
+    refs = stats.get("store_refs", 0)
+    if not refs:
+        return
+    ref_bytes = stats.get("store_ref_bytes", 0)
+    unique_bytes = sum(_STORED_OBJECTS.values())
+    saved = ref_bytes - unique_bytes
+    pct = (saved / ref_bytes * 100.0) if ref_bytes else 0.0
+    print(f"  Content store: {refs} image refs -> {len(_STORED_OBJECTS)} unique objects")
+    print(f"  Content store: {ref_bytes:,} bytes referenced, {unique_bytes:,} bytes stored, {saved:,} bytes saved ({pct:.1f}%)")
+
+
+def folder_signature(folder: os.DirEntry, images: List[os.DirEntry]) -> Dict:
+    """Describe a medicine folder cheaply: folder mtime, total image size and a
+    fingerprint over (name, size, mtime) of every image. Any add/remove/replace
+    of an image changes the fingerprint. Uses the cached DirEntry stats."""
+    try:
+        folder_mtime = folder.stat().st_mtime_ns
+    except OSError:
+        folder_mtime = 0
+    total_size = 0
+    digest = hashlib.sha1()
+    for img in images:
+        try:
+            st = img.stat()
+        except OSError:
+            continue
+        total_size += st.st_size
+        digest.update(f"{img.name}\0{st.st_size}\0{st.st_mtime_ns}\n".encode("utf-8"))
+    return {"mtime": folder_mtime, "size": total_size, "images": digest.hexdigest()}
+
+
+def default_manifest_path(output_path: str) -> str:
+    base, _ = os.path.splitext(output_path)
+    return f"{base}.manifest.json"
+
+
+def load_manifest(path: str, layout: str) -> Dict[str, Dict]:
+    """Load the folder manifest written by a previous --incremental run.
+    A manifest written for a different image layout is ignored (all URLs would change)."""
+    if not os.path.isfile(path):
+        return {}
+    try:
+        data, _ = load_json(path)
+    except Exception:
+        return {}
+    if not isinstance(data, dict) or data.get("version") != MANIFEST_VERSION:
+        return {}
+    if data.get("layout", "slug") != layout:
+        return {}
+    folders = data.get("folders")
+    return folders if isinstance(folders, dict) else {}
+
+
+def save_manifest(path: str, folders: Dict[str, Dict], layout: str) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"version": MANIFEST_VERSION, "layout": layout, "folders": folders}, f, indent=2, ensure_ascii=False, sort_keys=True)
+
+
+def load_previous_entries(path: str) -> Dict[str, Dict]:
+    """Index a previously generated medicines.json by id."""
+    if not os.path.isfile(path):
+        return {}
+    try:
+        existing, _ = load_json(path)
+    except Exception:
+        return {}
+    if not isinstance(existing, list):
+        return {}
+    return {str(e.get("id")): e for e in existing if isinstance(e, dict) and e.get("id")}
+
+
+def merge_with_existing(existing_path: str, medicines: List[Dict]) -> Iterator[Dict]:
+    """Stream entries of an existing output, appending newly found images to entries that
+    were rebuilt, followed by brand-new entries. Existing fields (details, price,
+    description, ...) are never overridden.
+
+    Two passes over the existing file keep memory flat: the first only collects ids
+    (plus the last copy of any duplicated id, which wins as it always has), the second
+    emits entries in their original order."""
+    new_by_id: Dict[str, Dict] = {str(e.get("id")): e for e in medicines if isinstance(e, dict) and e.get("id")}
+    seen: Set[str] = set()
+    duplicates: Dict[str, Dict] = {}
+    try:
+        for e in iter_entries(existing_path):
+            if isinstance(e, dict) and e.get("id"):
+                eid = str(e.get("id"))
+                if eid in seen:
+                    duplicates[eid] = e
+                seen.add(eid)
+    except (OSError, ValueError):
+        # Unreadable existing output: behave as if there was none
+        yield from new_by_id.values()
+        return
+
+    emitted: Set[str] = set()
+    for e in iter_entries(existing_path):
+        if not isinstance(e, dict) or not e.get("id") or str(e.get("id")) in emitted:
+            continue
+        eid = str(e.get("id"))
+        emitted.add(eid)
+        updated = dict(duplicates.get(eid, e))
+        if eid in new_by_id:
+            new_e = new_by_id[eid]
+            # Merge images: keep existing order, append any new ones
+            existing_imgs = list(updated.get("images") or [])
+            new_imgs = [u for u in (new_e.get("images") or []) if u not in existing_imgs]
+            updated["images"] = existing_imgs + new_imgs
+            # Set primary image if missing
+            if not updated.get("image") and updated["images"]:
+                updated["image"] = updated["images"][0]
+            # Do not override other fields (preserve details, price, description, etc.)
+        yield updated
+
+    # Add any brand-new entries not present in existing
+    for eid, e in new_by_id.items():
+        if eid not in seen:
+            yield e
+
+
+def build_entry(
+    cat_folder: str,
+    med_folder: str,
+    display_category: str,
+    medicines_dir: str,
+    public_dir: str,
+    copy_images: bool,
+    image_files: Optional[List[str]] = None,
+    materialize: str = "copy",
+    compare: str = "stat",
+    stats: Optional[Dict[str, int]] = None,
+    content_addressed: bool = False,
+) -> Dict:
     full_path = os.path.join(medicines_dir, cat_folder, med_folder)
-    image_files = find_images(full_path)
+    if image_files is None:
+        image_files = find_images(full_path)
     slug = slugify(med_folder)
     image_rel = None
     images_rel: List[str] = []
     
-    if image_files:
+    if image_files and content_addressed:
+        store_dir = os.path.join(public_dir, CONTENT_STORE_DIR)
+        if copy_images:
+            os.makedirs(store_dir, exist_ok=True)
+        for fname in image_files:
+            name = store_image(os.path.join(full_path, fname), store_dir, copy_images, materialize, compare, stats)
+            images_rel.append(f"/{CONTENT_STORE_DIR}/{name}")
+        image_rel = images_rel[0] if images_rel else None
+    elif image_files:
         target_dir = os.path.join(public_dir, "medicines", slug)
         if copy_images:
             os.makedirs(target_dir, exist_ok=True)
@@ -178,18 +450,14 @@ def build_entry(cat_folder: str, med_folder: str, display_category: str, medicin
             if copy_images:
                 src = os.path.join(full_path, fname)
                 dst = os.path.join(target_dir, fname)
-                if not os.path.exists(dst):
-                    shutil.copy2(src, dst)
+                materialize_image(src, dst, materialize, compare, stats)
         image_rel = images_rel[0] if images_rel else None
     
-    dosage = extract_dosage(med_folder)
-    display_name = clean_base_name(med_folder)
-    
+    parsed = parse_name(med_folder)
+    dosage = parsed.dosage
     # Format: Medicine Name Dose (e.g., "Kamagra 100 mg", "Tadalafil 20 mg")
-    if dosage:
-        display_name = f"{display_name} {dosage}".strip()
-    
-    form = infer_form(med_folder)
+    display_name = parsed.display_name
+    form = parsed.form
     base_price = CATEGORY_BASE_PRICE.get(display_category, 10.0)
     
     return {
@@ -215,8 +483,23 @@ def main() -> None:
     parser.add_argument("--public-dir", default=os.path.join(os.getcwd(), "public"), help="Path to public directory")
     parser.add_argument("--output", default=os.path.join(os.getcwd(), "src", "data", "medicines.json"), help="Output JSON file path")
     parser.add_argument("--copy-images", action="store_true", help="Copy images to public directory")
+    parser.add_argument("--materialize", choices=MATERIALIZE_STRATEGIES, default="copy", help="How --copy-images places images in the public directory (falls back to copy when unsupported)")
+    parser.add_argument("--compare", choices=("stat", "hash"), default="stat", help="How to decide an existing public image is current: size+mtime, or content hash when mtimes differ")
+    parser.add_argument("--content-addressed", action="store_true", help="Store each unique image once as /img/<hash>.<ext> and reference those URLs")
+    parser.add_argument("--derivatives", action="store_true", help="Generate thumbnails/WebP/AVIF derivatives for every image and add thumbnail/srcset/width/height/imageVariants (requires pillow)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes for --derivatives (default: CPU count)")
+    parser.add_argument("--split", action="store_true", help="Also write a slim list index plus per-medicine detail files")
+    parser.add_argument("--split-dir", default=None, help="Directory for --split output (default: <output dir>/catalog)")
+    parser.add_argument("--search-index", action="store_true", help="Also write a prebuilt typo-tolerant search index")
+    parser.add_argument("--search-index-path", default=None, help="Path for --search-index output (default: <output>.search.json)")
+    parser.add_argument("--recategorize", action="store_true", help="Apply classification rules and <output>.overrides.json to categories (see recategorize_catalog.py)")
+    parser.add_argument("--pipeline", action="store_true", help="Run auto-fill, detail restore and encoding fix before writing (see catalog_pipeline.py)")
+    parser.add_argument("--snapshot-store", default=None, help="Snapshot history to record the build in (default: <output>.snapshots.sqlite)")
+    parser.add_argument("--no-snapshot", action="store_true", help="Do not record the build in the snapshot history")
     parser.add_argument("--preserve-existing", action="store_true", help="Merge with existing output JSON, preserving existing entries and details")
     parser.add_argument("--dry-run", action="store_true", help="Show what would be done without writing files")
+    parser.add_argument("--incremental", action="store_true", help="Rebuild only folders added/changed since the last run; carry other entries over from the previous output")
+    parser.add_argument("--manifest", default=None, help="Folder manifest used by --incremental (default: <output>.manifest.json)")
     
     args = parser.parse_args()
 
@@ -224,8 +507,18 @@ def main() -> None:
     public_dir = args.public_dir
     output_path = args.output
     copy_images = args.copy_images
+    materialize = args.materialize
+    compare = args.compare
+    content_addressed = args.content_addressed
+    layout = "cas" if content_addressed else "slug"
+    image_stats: Dict[str, int] = {}
     preserve_existing = args.preserve_existing
     dry_run = args.dry_run
+    incremental = args.incremental
+    manifest_path = args.manifest or default_manifest_path(output_path)
+    split_dir = args.split_dir or default_split_dir(output_path)
+    search_index_path = args.search_index_path or default_index_path(output_path)
+    snapshot_path = args.snapshot_store or default_store_path(output_path)
 
     if not os.path.isdir(medicines_dir):
         print(f"ERROR: Medicines directory not found: {medicines_dir}")
@@ -235,94 +528,140 @@ def main() -> None:
     total_found = 0
     categories_found = set()
 
+    # Incremental state: previous manifest + previous output, and the manifest for this run
+    old_manifest: Dict[str, Dict] = {}
+    previous_by_id: Dict[str, Dict] = {}
+    shared_ids: Set[str] = set()
+    new_manifest: Dict[str, Dict] = {}
+    reused = 0
+    rebuilt = 0
+
     print(f"Scanning: {medicines_dir}")
-    print(f"Copy images: {copy_images}")
+    print(f"Copy images: {copy_images}" + (f" (materialize: {materialize}, compare: {compare})" if copy_images else ""))
     print(f"Output: {output_path}")
-    
-    try:
-        category_dirs = sorted(os.listdir(medicines_dir))
-    except Exception as e:
-        print(f"ERROR: Cannot list medicines directory: {e}")
-        return
-
-    for cat_folder in category_dirs:
-        cat_path = os.path.join(medicines_dir, cat_folder)
-        if not os.path.isdir(cat_path):
-            continue
-
+    if incremental:
+        old_manifest = load_manifest(manifest_path, layout)
+        previous_by_id = load_previous_entries(output_path)
+        # Folders that share a slug share one id in the previous output, so their entries
+        # cannot be told apart there: such folders are always rebuilt
+        id_counts: Dict[str, int] = {}
+        for folder in old_manifest.values():
+            id_counts[folder.get("id")] = id_counts.get(folder.get("id"), 0) + 1
+        shared_ids = {i for i, n in id_counts.items() if n > 1}
+        print(f"Incremental: {len(old_manifest)} folders in manifest {manifest_path}")
+
+    # Dry runs outside incremental mode only need folder names, so skip reading medicine folders
+    for cat_folder, med_entry, image_entries in walk_catalog(medicines_dir, with_images=incremental or not dry_run):
+        med_folder = med_entry.name
         display_category = CATEGORY_DISPLAY_MAP.get(cat_folder, cat_folder.replace("_", " ").title())
         categories_found.add(display_category)
-
-        try:
-            med_folders = sorted(os.listdir(cat_path))
-        except Exception as e:
-            print(f"ERROR: Cannot list category '{cat_folder}': {e}")
-            continue
-
-        for med_folder in med_folders:
-            med_path = os.path.join(cat_path, med_folder)
-            if not os.path.isdir(med_path):
+        image_files = [e.name for e in image_entries]
+
+        total_found += 1
+        if incremental:
+            key = f"{cat_folder}/{med_folder}"
+            signature = folder_signature(med_entry, image_entries)
+            entry_id = slugify(med_folder)
+            previous = old_manifest.get(key)
+            unchanged = (
+                previous is not None
+                and previous.get("signature") == signature
+                and previous.get("id") in previous_by_id
+                and entry_id not in shared_ids
+            )
+            new_manifest[key] = {"id": entry_id, "signature": signature}
+            if unchanged:
+                reused += 1
+                if not dry_run:
+                    medicines.append(previous_by_id[entry_id])
                 continue
-
-            total_found += 1
+            rebuilt += 1
+            reason = "shared id" if previous and entry_id in shared_ids else ("changed" if previous else "new")
             if not dry_run:
-                entry = build_entry(cat_folder, med_folder, display_category, medicines_dir, public_dir, copy_images)
+                entry = build_entry(cat_folder, med_folder, display_category, medicines_dir, public_dir, copy_images, image_files, materialize, compare, image_stats, content_addressed)
                 medicines.append(entry)
-                print(f"✓ {entry['name']} ({display_category})")
+                print(f"✓ {entry['name']} ({display_category}) [{reason}]")
             else:
-                dosage = extract_dosage(med_folder)
-                display_name = clean_base_name(med_folder)
-                if dosage:
-                    display_name = f"{display_name} {dosage}"
-                print(f"DRY-RUN: {display_name} ({display_category})")
+                print(f"DRY-RUN: rebuild {key} [{reason}]")
+        elif not dry_run:
+            entry = build_entry(cat_folder, med_folder, display_category, medicines_dir, public_dir, copy_images, image_files, materialize, compare, image_stats, content_addressed)
+            medicines.append(entry)
+            print(f"✓ {entry['name']} ({display_category})")
+        else:
+            print(f"DRY-RUN: {parse_name(med_folder).display_name} ({display_category})")
+
+    recategorized: Set[str] = set()
+    if args.recategorize and medicines:
+        # Imported here: recategorize_catalog imports the category tables from this module
+        from recategorize_catalog import default_overrides_path, load_overrides, recategorize
+        recategorized = recategorize(medicines, load_overrides(default_overrides_path(output_path)))
+        categories_found = {m["category"] for m in medicines}
 
     print(f"\nSummary:")
     print(f"  Total medicines found: {total_found}")
     print(f"  Categories: {len(categories_found)} - {', '.join(sorted(categories_found))}")
-
-    if not dry_run and medicines:
-        # If preserving existing, merge instead of replacing
-        merged: List[Dict] = []
+    actions = {k: v for k, v in image_stats.items() if not k.startswith("store_")}
+    if actions:
+        print("  Images: " + ", ".join(f"{k}={v}" for k, v in sorted(actions.items())))
+    print_store_report(image_stats)
+    removed = len(set(old_manifest) - set(new_manifest))
+    if incremental:
+        print(f"  Incremental: {rebuilt} rebuilt, {reused} unchanged, {removed} removed")
+    if args.recategorize and medicines:
+        print(f"  Recategorized: {len(recategorized)}")
+
+    up_to_date = bool(incremental and not dry_run and rebuilt == 0 and removed == 0 and not recategorized and medicines)
+    if up_to_date and args.derivatives:
+        # Derivative fields live in the output itself: re-apply them (cached images cost a
+        # stat) and rewrite the output below if any entry gains or changes them
+        before = [dict(m) for m in medicines]
+        add_derivatives(medicines, public_dir, args.workers)
+        up_to_date = medicines == before
+    if up_to_date:
+        print(f"  Up to date: {output_path} ({len(medicines)} entries)")
+        # Other post-steps only read the output: redo them if missing or older than it
+        if args.split and (current_split_build(split_dir) is None or is_stale(os.path.join(split_dir, POINTER_FILE), output_path)):
+            print_split_report(split_dir, *write_split_catalog(medicines, split_dir))
+        if args.search_index and is_stale(search_index_path, output_path):
+            index = build_search_index(medicines)
+            print_search_index_report(search_index_path, index, write_search_index(index, search_index_path))
+    elif not dry_run and medicines:
+        # If preserving existing, merge instead of replacing (streamed from the existing file)
         if preserve_existing and os.path.isfile(output_path):
-            try:
-                with open(output_path, "r", encoding="utf-8") as f:
-                    existing = json.load(f)
-                    if not isinstance(existing, list):
-                        existing = []
-            except Exception:
-                existing = []
-
-            by_id: Dict[str, Dict] = {str(e.get("id")): e for e in existing if isinstance(e, dict) and e.get("id")}
-            new_by_id: Dict[str, Dict] = {str(e.get("id")): e for e in medicines if isinstance(e, dict) and e.get("id")}
-
-            # Start with existing entries, optionally augment images
-            for eid, e in by_id.items():
-                updated = dict(e)
-                if eid in new_by_id:
-                    new_e = new_by_id[eid]
-                    # Merge images: keep existing order, append any new ones
-                    existing_imgs = list(updated.get("images") or [])
-                    new_imgs = [u for u in (new_e.get("images") or []) if u not in existing_imgs]
-                    updated["images"] = existing_imgs + new_imgs
-                    # Set primary image if missing
-                    if not updated.get("image") and updated["images"]:
-                        updated["image"] = updated["images"][0]
-                    # Do not override other fields (preserve details, price, description, etc.)
-                merged.append(updated)
-
-            # Add any brand-new entries not present in existing
-            for eid, e in new_by_id.items():
-                if eid not in by_id:
-                    merged.append(e)
-
-            out_arr = merged
+            out_entries: Iterable[Dict] = merge_with_existing(output_path, medicines)
         else:
-            out_arr = medicines
-
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        with open(output_path, "w", encoding="utf-8") as f:
-            json.dump(out_arr, f, indent=2, ensure_ascii=False)
-        print(f"  Wrote: {output_path} ({len(out_arr)} entries)")
+            out_entries = medicines
+        stage_stats: Dict[str, Dict[str, float]] = {}
+        restore_store: Optional[SnapshotStore] = None
+        if args.pipeline:
+            # Restore from the history of earlier builds (this build is recorded after writing)
+            if not args.no_snapshot and os.path.isfile(snapshot_path):
+                restore_store = SnapshotStore(snapshot_path)
+            out_entries = run_stages(out_entries, build_stages(restorer=DetailRestorer(store=restore_store)), stage_stats)
+        # Later stages need the whole list; otherwise entries stream straight to disk
+        if args.derivatives or args.split or args.search_index:
+            out_entries = list(out_entries)
+
+        if args.derivatives:
+            print_derivative_report(add_derivatives(out_entries, public_dir, args.workers))
+
+        written = write_entries(output_path, out_entries)
+        if restore_store:
+            restore_store.close()
+        print_stage_report(stage_stats)
+        print(f"  Wrote: {output_path} ({written} entries)")
+        if args.split:
+            print_split_report(split_dir, *write_split_catalog(out_entries, split_dir), os.path.getsize(output_path))
+        if args.search_index:
+            index = build_search_index(out_entries)
+            print_search_index_report(search_index_path, index, write_search_index(index, search_index_path))
+        if not args.no_snapshot:
+            # Re-read the written file so streamed output does not have to be held in memory
+            with SnapshotStore(snapshot_path) as store:
+                print_snapshot_report(snapshot_path, *store.record(iter_entries(output_path), source=os.path.basename(output_path)))
+        if incremental:
+            save_manifest(manifest_path, new_manifest, layout)
+            print(f"  Wrote: {manifest_path} ({len(new_manifest)} folders)")
     elif dry_run:
         print("  NOTE: This was a dry run. Use --copy-images to actually process files.")
 
@@ -0,0 +1,262 @@
+"""Generate responsive image derivatives (thumbnails, WebP/AVIF) for medicines.json entries.
+
+For every image of an entry ("image" and each path in "images"):
+  - Resizes to fixed widths (DERIVATIVE_WIDTHS) and encodes WebP (and AVIF when Pillow supports it)
+  - Writes them to public/derived/<source-hash>-<width>.<format>
+The entry gets "thumbnail", "srcset" (WebP), "srcsetAvif" (when available), "width" and
+"height" for its primary image, plus "imageVariants": one {"src", "thumbnail", "srcset",
+"srcsetAvif", "width", "height"} object per path in "images", in the same order (only
+"src" for an image without a local file), for galleries.
+
+Work runs in a process pool. Results are cached by source content hash in
+public/derived/derivatives.cache.json, so unchanged images are never re-encoded
+and unchanged files (same path/size/mtime) are not even re-hashed.
+
+Requirements:
+  - Python package: pillow (AVIF needs Pillow >= 11.3 or pillow-avif-plugin)
+
+Usage (PowerShell):
+  py .\\scripts\\image_derivatives.py --json "s:\\MedCare\\src\\data\\medicines.json" --public-dir "s:\\MedCare\\public"
+
+Also available as a stage of generate_unified_medicines_json.py via --derivatives.
+"""
+from __future__ import annotations
+import os
+import json
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Optional, Tuple
+
+from catalog_io import CatalogWriter, load_json
+
+try:
+    from PIL import Image, features
+except Exception:  # pragma: no cover - optional dependency notification
+    Image = None
+    features = None
+
+DERIVED_DIR = "derived"
+CACHE_FILE = "derivatives.cache.json"
+CACHE_VERSION = 1
+
+DERIVATIVE_WIDTHS = (160, 320, 640, 960)
+THUMBNAIL_WIDTH = 320
+QUALITY = {"webp": 80, "avif": 60}
+
+
+def available_formats() -> List[str]:
+    if Image is None:
+        raise RuntimeError("pillow is required for image derivatives: pip install pillow")
+    formats = ["webp"]
+    try:
+        if features.check("avif"):
+            formats.append("avif")
+    except Exception:
+        pass
+    return formats
+
+
+def source_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
+def target_widths(width: int) -> List[int]:
+    """Widths to emit for an image of the given width (never upscale)."""
+    widths = [w for w in DERIVATIVE_WIDTHS if w < width]
+    if not widths or widths[-1] < min(width, DERIVATIVE_WIDTHS[-1]):
+        widths.append(min(width, DERIVATIVE_WIDTHS[-1]))
+    return widths
+
+
+def derive_image(job: Tuple[str, str, str, Tuple[str, ...]]) -> Dict:
+    """Worker: encode every derivative of one source image. Runs in a child process."""
+    src, digest, out_dir, formats = job
+    try:
+        return _derive(src, digest, out_dir, formats)
+    except Exception as e:
+        return {"error": f"{type(e).__name__}: {e}"}
+
+
+def _derive(src: str, digest: str, out_dir: str, formats: Tuple[str, ...]) -> Dict:
+    with Image.open(src) as img:
+        img.load()
+        width, height = img.size
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA" if "transparency" in img.info else "RGB")
+        variants = []
+        for w in target_widths(width):
+            h = max(1, round(height * w / width))
+            resized = img if w == width else img.resize((w, h), Image.LANCZOS)
+            for fmt in formats:
+                name = f"{digest}-{w}.{fmt}"
+                path = os.path.join(out_dir, name)
+                if not os.path.isfile(path):
+                    tmp = f"{path}.tmp"
+                    resized.save(tmp, format=fmt.upper(), quality=QUALITY.get(fmt, 80))
+                    os.replace(tmp, path)
+                variants.append({"width": w, "height": h, "format": fmt, "file": name})
+    return {"width": width, "height": height, "variants": variants}
+
+
+def load_cache(path: str) -> Dict:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except Exception:
+        return {"version": CACHE_VERSION, "sources": {}, "derived": {}}
+    if not isinstance(data, dict) or data.get("version") != CACHE_VERSION:
+        return {"version": CACHE_VERSION, "sources": {}, "derived": {}}
+    data.setdefault("sources", {})
+    data.setdefault("derived", {})
+    return data
+
+
+def save_cache(path: str, cache: Dict) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(cache, f, indent=2, ensure_ascii=False, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def cached_digest(cache: Dict, src: str) -> str:
+    """Content hash of src, reusing the cached value when path/size/mtime are unchanged."""
+    st = os.stat(src)
+    key = os.path.abspath(src)
+    known = cache["sources"].get(key)
+    if known and known.get("size") == st.st_size and known.get("mtime") == st.st_mtime_ns:
+        return known["digest"]
+    digest = source_digest(src)
+    cache["sources"][key] = {"size": st.st_size, "mtime": st.st_mtime_ns, "digest": digest}
+    return digest
+
+
+def is_complete(meta: Optional[Dict], out_dir: str, formats: List[str]) -> bool:
+    if not meta:
+        return False
+    have = {v["format"] for v in meta.get("variants", [])}
+    if not set(formats) <= have:
+        return False
+    return all(os.path.isfile(os.path.join(out_dir, v["file"])) for v in meta["variants"])
+
+
+def resolve_public_path(public_dir: str, url: str) -> Optional[str]:
+    if not url or "://" in url:
+        return None
+    path = os.path.join(public_dir, url.lstrip("/").replace("/", os.sep))
+    return path if os.path.isfile(path) else None
+
+
+def derivative_fields(meta: Dict, url_prefix: str) -> Dict:
+    """thumbnail/srcset/srcsetAvif/width/height from a derive_image() result ({} without WebP)."""
+    by_format: Dict[str, List[Dict]] = {}
+    for v in meta["variants"]:
+        by_format.setdefault(v["format"], []).append(v)
+    webp = sorted(by_format.get("webp", []), key=lambda v: v["width"])
+    if not webp:
+        return {}
+    thumb = next((v for v in webp if v["width"] >= THUMBNAIL_WIDTH), webp[-1])
+    fields = {
+        "thumbnail": f"{url_prefix}/{thumb['file']}",
+        "srcset": ", ".join(f"{url_prefix}/{v['file']} {v['width']}w" for v in webp),
+    }
+    avif = sorted(by_format.get("avif", []), key=lambda v: v["width"])
+    if avif:
+        fields["srcsetAvif"] = ", ".join(f"{url_prefix}/{v['file']} {v['width']}w" for v in avif)
+    fields["width"] = meta["width"]
+    fields["height"] = meta["height"]
+    return fields
+
+
+def apply_derivatives(entry: Dict, meta: Dict, url_prefix: str) -> None:
+    """Set thumbnail/srcset/width/height on an entry from a derive_image() result."""
+    entry.update(derivative_fields(meta, url_prefix))
+
+
+def add_derivatives(entries: List[Dict], public_dir: str, workers: Optional[int] = None) -> Dict[str, int]:
+    """Generate derivatives for every image of every entry and annotate the entries in place."""
+    formats = available_formats()
+    out_dir = os.path.join(public_dir, DERIVED_DIR)
+    os.makedirs(out_dir, exist_ok=True)
+    cache_path = os.path.join(out_dir, CACHE_FILE)
+    cache = load_cache(cache_path)
+    url_prefix = f"/{DERIVED_DIR}"
+    stats = {"entries": 0, "images": 0, "cached": 0, "encoded": 0, "missing": 0, "errors": 0}
+
+    # Resolve sources and split into cache hits and work to do (one job per unique source hash)
+    pending: Dict[str, str] = {}
+    digests: Dict[str, Optional[str]] = {}
+    for entry in entries:
+        urls = [entry.get("image") or ""] + [u for u in entry.get("images") or [] if isinstance(u, str)]
+        for url in urls:
+            if url in digests:
+                continue
+            src = resolve_public_path(public_dir, url)
+            if not src:
+                digests[url] = None
+                if url:
+                    stats["missing"] += 1
+                continue
+            digest = digests[url] = cached_digest(cache, src)
+            if digest not in pending and not is_complete(cache["derived"].get(digest), out_dir, formats):
+                pending[digest] = src
+
+    if pending:
+        jobs = [(src, digest, out_dir, tuple(formats)) for digest, src in pending.items()]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for (src, digest, _, _), result in zip(jobs, pool.map(derive_image, jobs, chunksize=4)):
+                if "error" in result:
+                    print(f"ERROR deriving '{src}': {result['error']}")
+                    stats["errors"] += 1
+                    continue
+                cache["derived"][digest] = result
+                stats["encoded"] += 1
+
+    def fields_for(url: str) -> Dict:
+        meta = cache["derived"].get(digests.get(url) or "")
+        return derivative_fields(meta, url_prefix) if meta else {}
+
+    for entry in entries:
+        primary = fields_for(entry.get("image") or "")
+        if primary:
+            entry.update(primary)
+            stats["entries"] += 1
+        images = [u for u in entry.get("images") or [] if isinstance(u, str)]
+        if images:
+            entry["imageVariants"] = [dict(src=url, **fields_for(url)) for url in images]
+    stats["images"] = sum(1 for d in set(digests.values()) if d and d in cache["derived"])
+    stats["cached"] = len({d for d in digests.values() if d}) - len(pending)
+
+    save_cache(cache_path, cache)
+    return stats
+
+
+def print_derivative_report(stats: Dict[str, int]) -> None:
+    print(
+        f"  Derivatives: {stats['entries']} entries annotated, {stats['images']} unique images derived, "
+        f"{stats['encoded']} encoded, {stats['cached']} cached, {stats['missing']} image paths without a local file, "
+        f"{stats['errors']} errors"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate responsive image derivatives for medicines.json.")
+    parser.add_argument("--json", default=os.path.join(os.getcwd(), "src", "data", "medicines.json"), help="Path to medicines.json")
+    parser.add_argument("--public-dir", default=os.path.join(os.getcwd(), "public"), help="Path to public directory holding the images")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    args = parser.parse_args()
+
+    data, _ = load_json(args.json)
+    stats = add_derivatives([e for e in data if isinstance(e, dict)], args.public_dir, args.workers)
+    with CatalogWriter(args.json) as out:
+        out.write_all(data)
+    print_derivative_report(stats)
+    print(f"  Wrote: {args.json} ({out.count} entries)")
+
+
+if __name__ == "__main__":
+    main()
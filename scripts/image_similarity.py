@@ -0,0 +1,328 @@
+"""Find medicine folders holding the same packshots (re-encoded or resized) via perceptual hashes.
+
+Byte hashes (merge_medicines.py) only catch identical files. Here every image gets
+a 64-bit perceptual hash:
+  phash  sign of the low-frequency 8x8 DCT block of a 32x32 grayscale thumbnail (default)
+  dhash  gradient hash of a 9x8 grayscale thumbnail (cheaper, but packshots on plain
+         white backgrounds collide more often)
+Images are hashed in a process pool. All hashes go into a BK-tree (a metric tree
+over Hamming distance), so finding every image within --max-distance bits of a
+given one is a small subtree search instead of a comparison against every image;
+the whole tree is checked without quadratic pairwise work.
+
+Two folders are near-duplicates when at least --min-overlap of the images of each
+of them have a near match in the other. Folders are taken in keeper order (most
+images, un-suffixed name preferred over _vN); each folder not yet grouped is kept
+and groups every ungrouped folder that is a near-duplicate of it. Every member is
+therefore checked against the kept folder itself, never chained in through another
+member.
+By default the groups are only reported. With --apply, images of the other folders
+that the kept folder lacks are moved into it, and the remaining folders are moved
+to --archive-dir (nothing is deleted).
+
+Requirements:
+  - Python packages: pillow, numpy
+
+Usage (PowerShell):
+  py .\\scripts\\image_similarity.py --medicines-dir "s:\\MedCare\\medicines"
+  py .\\scripts\\image_similarity.py --medicines-dir "s:\\MedCare\\medicines" --hash dhash --max-distance 2
+  py .\\scripts\\image_similarity.py --medicines-dir "s:\\MedCare\\medicines" --apply --archive-dir "s:\\MedCare\\medicines_duplicates"
+
+Also available after a merge via merge_medicines.py --near-duplicates (report only).
+"""
+from __future__ import annotations
+import os
+import re
+import shutil
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+try:
+    from PIL import Image
+except Exception:  # pragma: no cover - optional dependency notification
+    Image = None
+
+try:
+    import numpy as np
+except Exception:  # pragma: no cover - optional dependency notification
+    np = None
+
+from catalog_walk import walk_catalog
+
+HASH_BITS = 64
+_VERSION_SUFFIX = re.compile(r"_v\d+$")
+
+# (category, folder name)
+FolderKey = Tuple[str, str]
+
+
+def require_dependencies() -> None:
+    if Image is None or np is None:
+        raise RuntimeError("pillow and numpy are required for perceptual hashing: pip install pillow numpy")
+
+
+def _gray(path: str, size: Tuple[int, int]):
+    with Image.open(path) as img:
+        # Let the JPEG decoder downscale (DCT scaling) instead of decoding full-size packshots
+        img.draft("L", (size[0] * 8, size[1] * 8))
+        img = img.convert("L").resize(size, Image.LANCZOS)
+        return np.asarray(img, dtype=np.float32)
+
+
+def _pack(bits) -> int:
+    value = 0
+    for bit in bits.ravel():
+        value = (value << 1) | int(bit)
+    return value
+
+
+def dhash(path: str) -> int:
+    pixels = _gray(path, (9, 8))
+    return _pack(pixels[:, 1:] > pixels[:, :-1])
+
+
+_DCT_CACHE: Dict[int, object] = {}
+
+
+def _dct_matrix(n: int):
+    m = _DCT_CACHE.get(n)
+    if m is None:
+        k = np.arange(n)
+        m = np.cos(np.pi * (2 * k[None, :] + 1) * k[:, None] / (2 * n))
+        m[0] *= 1 / np.sqrt(2)
+        m = _DCT_CACHE[n] = m * np.sqrt(2 / n)
+    return m
+
+
+def phash(path: str) -> int:
+    pixels = _gray(path, (32, 32))
+    d = _dct_matrix(32)
+    low = (d @ pixels @ d.T)[:8, :8].ravel()
+    # The DC term only carries overall brightness; compare the rest against their median
+    return _pack(low > np.median(low[1:]))
+
+
+HASHERS = {"dhash": dhash, "phash": phash}
+
+
+def hash_image(job: Tuple[str, str]) -> Optional[int]:
+    """Worker: perceptual hash of one image, None if it cannot be decoded. Runs in a child process."""
+    path, algorithm = job
+    try:
+        return HASHERS[algorithm](path)
+    except Exception:
+        return None
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class BKTree:
+    """Burkhard-Keller tree over Hamming distance. Items with equal hashes share a node."""
+
+    def __init__(self) -> None:
+        self._root: Optional[list] = None  # [hash, items, {distance: child}]
+        self.size = 0
+
+    def add(self, value: int, item) -> None:
+        self.size += 1
+        if self._root is None:
+            self._root = [value, [item], {}]
+            return
+        node = self._root
+        while True:
+            d = hamming(value, node[0])
+            if d == 0:
+                node[1].append(item)
+                return
+            child = node[2].get(d)
+            if child is None:
+                node[2][d] = [value, [item], {}]
+                return
+            node = child
+
+    def search(self, value: int, radius: int) -> Iterator[Tuple[int, object]]:
+        """Yield (distance, item) for every item within radius of value."""
+        if self._root is None:
+            return
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            d = hamming(value, node[0])
+            if d <= radius:
+                for item in node[1]:
+                    yield d, item
+            # Triangle inequality: only children at distance d-radius..d+radius can hold matches
+            for dist, child in node[2].items():
+                if d - radius <= dist <= d + radius:
+                    stack.append(child)
+
+
+def hash_tree(medicines_dir: str, algorithm: str = "phash", workers: Optional[int] = None, stats: Optional[Dict[str, int]] = None) -> Dict[FolderKey, List[Tuple[str, int]]]:
+    """(category, folder) -> [(image path, hash)] for every decodable image in the tree."""
+    require_dependencies()
+    stats = stats if stats is not None else {}
+    jobs: List[Tuple[FolderKey, str]] = []
+    for category, folder, images in walk_catalog(medicines_dir):
+        jobs.extend(((category, folder.name), img.path) for img in images)
+    hashes: Dict[FolderKey, List[Tuple[str, int]]] = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(hash_image, [(path, algorithm) for _, path in jobs], chunksize=16)
+        for (key, path), value in zip(jobs, results):
+            if value is None:
+                print(f"WARNING: Cannot decode image '{path}' - skipped")
+                stats["undecodable"] = stats.get("undecodable", 0) + 1
+                continue
+            hashes.setdefault(key, []).append((path, value))
+    stats["images"] = sum(len(v) for v in hashes.values())
+    stats["folders"] = len(hashes)
+    return hashes
+
+
+def _keeper_rank(key: FolderKey, hashes: Dict[FolderKey, List[Tuple[str, int]]]):
+    return (-len(hashes[key]), bool(_VERSION_SUFFIX.search(key[1])), len(key[1]), key)
+
+
+def find_near_duplicates(
+    hashes: Dict[FolderKey, List[Tuple[str, int]]],
+    max_distance: int = 4,
+    min_overlap: float = 1.0,
+) -> List[List[FolderKey]]:
+    """Groups of near-duplicate folders, kept folder first. Groups are sorted by kept folder."""
+    tree = BKTree()
+    for key, images in hashes.items():
+        for idx, (_, value) in enumerate(images):
+            tree.add(value, (key, idx))
+
+    # matched[(a, b)] = images of a with a near match in b
+    matched: Dict[Tuple[FolderKey, FolderKey], int] = {}
+    for key, images in hashes.items():
+        for _, value in images:
+            for other in {k for _, (k, _) in tree.search(value, max_distance) if k != key}:
+                matched[(key, other)] = matched.get((key, other), 0) + 1
+
+    # Symmetric: enough of a's images match in b, and enough of b's in a
+    similar: Dict[FolderKey, List[FolderKey]] = {}
+    for (a, b), count in matched.items():
+        if count >= min_overlap * len(hashes[a]) and matched.get((b, a), 0) >= min_overlap * len(hashes[b]):
+            similar.setdefault(a, []).append(b)
+
+    # Better-ranked folders claim first, so each group's kept folder outranks its members
+    grouped = set()
+    result: List[List[FolderKey]] = []
+    for key in sorted(similar, key=lambda k: _keeper_rank(k, hashes)):
+        if key in grouped:
+            continue
+        members = [k for k in similar[key] if k not in grouped]
+        if not members:
+            continue
+        grouped.add(key)
+        grouped.update(members)
+        result.append([key] + sorted(members, key=lambda k: _keeper_rank(k, hashes)))
+    return sorted(result, key=lambda g: g[0])
+
+
+def merge_group(
+    group: List[FolderKey],
+    hashes: Dict[FolderKey, List[Tuple[str, int]]],
+    medicines_dir: str,
+    archive_dir: str,
+    max_distance: int,
+) -> Tuple[int, int]:
+    """Move images the kept folder lacks into it and archive the other folders.
+    Every precondition is checked before anything moves, so a group that cannot be
+    merged is left untouched. Returns (images moved, folders archived)."""
+    keep_category, keep_name = group[0]
+    keep_dir = os.path.join(medicines_dir, keep_category, keep_name)
+    if not os.path.isdir(keep_dir):
+        raise FileNotFoundError(f"Kept folder not found: {keep_dir}")
+    for category, name in group[1:]:
+        source = os.path.join(medicines_dir, category, name)
+        if not os.path.isdir(source):
+            raise FileNotFoundError(f"Folder not found: {source}")
+        dest = os.path.join(archive_dir, category, name)
+        if os.path.exists(dest):
+            raise FileExistsError(f"Archive destination already exists: {dest}")
+    kept = BKTree()
+    for _, value in hashes[group[0]]:
+        kept.add(value, None)
+    names = set(os.listdir(keep_dir))
+    moved = archived = 0
+    for category, name in group[1:]:
+        for path, value in hashes[(category, name)]:
+            if next(kept.search(value, max_distance), None) is not None:
+                continue
+            stem, ext = os.path.splitext(os.path.basename(path))
+            target, counter = stem + ext, 1
+            while target in names:
+                target = f"{stem}_v{counter}{ext}"
+                counter += 1
+            shutil.move(path, os.path.join(keep_dir, target))
+            names.add(target)
+            kept.add(value, None)
+            moved += 1
+        dest = os.path.join(archive_dir, category, name)
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        shutil.move(os.path.join(medicines_dir, category, name), dest)
+        archived += 1
+    return moved, archived
+
+
+def print_groups(groups: List[List[FolderKey]], hashes: Dict[FolderKey, List[Tuple[str, int]]]) -> None:
+    for group in groups:
+        keep = group[0]
+        print(f"NEAR-DUPLICATE: keep {keep[0]}/{keep[1]} ({len(hashes[keep])} images)")
+        for category, name in group[1:]:
+            print(f"    merge {category}/{name} ({len(hashes[(category, name)])} images)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Find (and optionally merge) medicine folders with near-identical images.")
+    parser.add_argument("--medicines-dir", default=os.path.join(os.getcwd(), "medicines"), help="Path to the categorized medicines directory")
+    parser.add_argument("--hash", choices=sorted(HASHERS), default="phash", help="Perceptual hash algorithm")
+    parser.add_argument("--max-distance", type=int, default=4, help=f"Max Hamming distance (of {HASH_BITS} bits) for two images to count as the same")
+    parser.add_argument("--min-overlap", type=float, default=1.0, help="Share of each folder's images that must match in the other folder (0-1)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes for hashing (default: CPU count)")
+    parser.add_argument("--apply", action="store_true", help="Merge each group into its kept folder and archive the others")
+    parser.add_argument("--archive-dir", default=None, help="Where --apply moves merged folders (default: <medicines-dir>_duplicates)")
+    args = parser.parse_args()
+
+    if Image is None or np is None:
+        print("ERROR: pillow and numpy are required for perceptual hashing: pip install pillow numpy")
+        return
+    if not os.path.isdir(args.medicines_dir):
+        print(f"ERROR: Medicines directory not found: {args.medicines_dir}")
+        return
+
+    stats: Dict[str, int] = {}
+    hashes = hash_tree(args.medicines_dir, args.hash, args.workers, stats)
+    groups = find_near_duplicates(hashes, args.max_distance, args.min_overlap)
+    print_groups(groups, hashes)
+
+    moved = archived = errors = 0
+    if args.apply:
+        archive_dir = args.archive_dir or os.path.abspath(args.medicines_dir).rstrip(os.sep) + "_duplicates"
+        for group in groups:
+            try:
+                m, a = merge_group(group, hashes, args.medicines_dir, archive_dir, args.max_distance)
+                moved += m
+                archived += a
+            except Exception as e:
+                print(f"ERROR merging into '{group[0][0]}/{group[0][1]}': {e}")
+                errors += 1
+
+    print("\nSummary:")
+    print(f"  Hashed: {stats['images']} images in {stats['folders']} folders ({args.hash}, {stats.get('undecodable', 0)} undecodable)")
+    print(f"  Near-duplicate groups: {len(groups)} ({sum(len(g) - 1 for g in groups)} redundant folders)")
+    if args.apply:
+        print(f"  Images moved into kept folders: {moved}")
+        print(f"  Folders archived: {archived}")
+        print(f"  Errors: {errors}")
+    else:
+        print("  NOTE: Nothing was changed. Re-run with --apply to merge the groups.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Aho-Corasick matcher over an ordered (label, keywords) table.
+
+The table is compiled once into an automaton; every keyword occurrence in a name is
+then found in a single pass over the name, so classification cost is linear in the
+name length no matter how many keywords the table holds. Matching is plain
+substring matching, like `kw in name.lower()`.
+
+Labels keep the priority of their position in the table: first() returns the
+earliest label with any hit (first-category-wins, as the categorize scripts always
+did) and matches() returns every label hit, in priority order, for diagnostics.
+
+Usage:
+    from keyword_matcher import KeywordMatcher
+
+    matcher = KeywordMatcher(CATEGORY_KEYWORDS)
+    matcher.first("tadalafil-dapoxetine", default="Unclear")
+    matcher.matches("tadalafil-dapoxetine")   # [("Erectile_Dysfunction", ["tadalafil", ...]), ...]
+"""
+from __future__ import annotations
+from collections import deque
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+
+class KeywordMatcher:
+    def __init__(self, table: Sequence[Tuple[str, Sequence[str]]], lowercase: bool = True) -> None:
+        self.labels: List[str] = [label for label, _ in table]
+        self.lowercase = lowercase
+        self.keywords: List[str] = []
+        # keyword id -> label indices that list it (ascending = priority order)
+        self._owners: List[List[int]] = []
+        ids: Dict[str, int] = {}
+        for idx, (_, keywords) in enumerate(table):
+            for kw in keywords:
+                if not kw:
+                    continue
+                kid = ids.get(kw)
+                if kid is None:
+                    kid = ids[kw] = len(self.keywords)
+                    self.keywords.append(kw)
+                    self._owners.append([])
+                if idx not in self._owners[kid]:
+                    self._owners[kid].append(idx)
+        self._build()
+
+    def _build(self) -> None:
+        goto: List[Dict[str, int]] = [{}]
+        out: List[List[int]] = [[]]
+        for kid, kw in enumerate(self.keywords):
+            node = 0
+            for ch in kw:
+                nxt = goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[node][ch] = nxt
+                    goto.append({})
+                    out.append([])
+                node = nxt
+            out[node].append(kid)
+
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in goto[node].items():
+                queue.append(nxt)
+                f = fail[node]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0) if node else 0
+                # Outputs of the longest proper suffix are also outputs here
+                out[nxt] = out[nxt] + out[fail[nxt]]
+        self._goto = goto
+        self._fail = fail
+        self._out = out
+        # Best (lowest) label index reachable from each node's outputs
+        self._best = [min((self._owners[k][0] for k in o), default=None) for o in out]
+
+    def _scan(self, text: str) -> Iterator[Tuple[int, int]]:
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for i, ch in enumerate(text.lower() if self.lowercase else text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for kid in out[node]:
+                yield i, kid
+
+    def iter_hits(self, text: str) -> Iterator[Tuple[int, str]]:
+        """Yield (start offset, keyword) for every keyword occurrence, overlapping ones included."""
+        for end, kid in self._scan(text):
+            kw = self.keywords[kid]
+            yield end - len(kw) + 1, kw
+
+    def first(self, text: str, default: Optional[str] = None) -> Optional[str]:
+        """Highest-priority label with any keyword in text (first-category-wins)."""
+        goto, fail, best_at = self._goto, self._fail, self._best
+        best: Optional[int] = None
+        node = 0
+        for ch in text.lower() if self.lowercase else text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            b = best_at[node]
+            if b is not None and (best is None or b < best):
+                best = b
+                if best == 0:
+                    break
+        return self.labels[best] if best is not None else default
+
+    def matches(self, text: str) -> List[Tuple[str, List[str]]]:
+        """Every label hit in text, in priority order, with the keywords that matched it."""
+        hits: Dict[int, List[str]] = {}
+        for _, kid in self._scan(text):
+            kw = self.keywords[kid]
+            for idx in self._owners[kid]:
+                kws = hits.setdefault(idx, [])
+                if kw not in kws:
+                    kws.append(kw)
+        return [(self.labels[idx], hits[idx]) for idx in sorted(hits)]
@@ -1,12 +1,36 @@
 """
-Merge medicines from both final_web and final_web_2 folders into a single medicines directory.
+Merge medicines from any number of source folders (final_web, final_web_2, vendor drops)
+into a single medicines directory.
 
 This script:
 1. Creates a unified 'medicines' directory
-2. Merges medicines from both source directories
+2. Merges medicines from every --source-dir, in order
 3. Handles duplicate categories by combining them
 4. Handles duplicate medicine names by adding suffixes
 5. Maintains proper categorization
+6. Skips duplicates whose images are identical to (or already contained in) an
+   existing folder of the same name instead of creating another _v copy
+
+Destination category folders are listed once into an in-memory name index, so
+picking a free _vN name costs no filesystem probes. Folder contents are only
+fingerprinted (SHA-256 of each image) when a name collides; fingerprints of
+destination folders are cached for the whole run.
+
+With --merge-overlapping, a duplicate that shares at least one image with an
+existing folder has its new images moved into that folder instead of becoming a
+_vN copy. Skipped and merged source folders are left in place.
+
+With --near-duplicates, the merged tree is then checked for folders holding the
+same packshots re-encoded or resized (perceptual hashes, see image_similarity.py;
+needs pillow and numpy). Groups are only reported; merge them with
+image_similarity.py --apply.
+
+Moves run in a bounded thread pool (--workers) after all decisions are made, with
+progress and copy throughput reported. Cross-device moves (copy + delete) are
+recorded in a write-ahead journal (<medicines-dir>/.merge-journal.jsonl) before they
+start and copy to a hidden .merge-partial folder that is renamed into place only
+when complete; same-device moves are atomic renames. If a merge dies halfway, the next run settles the unfinished moves from
+the journal and continues with what is left in the sources.
 
 Usage (PowerShell):
   # Dry run to see what will be merged
@@ -14,26 +38,40 @@ Usage (PowerShell):
 
   # Actual merge
   python .\scripts\merge_medicines.py
+
+  # Several vendor drops, 8 parallel moves
+  python .\scripts\merge_medicines.py --source-dir .\final_web --source-dir .\final_web_2\final_web_2 --source-dir .\vendor_2024 --workers 8
+
+  # Fold partial duplicates into the existing folder
+  python .\scripts\merge_medicines.py --merge-overlapping
 """
 from __future__ import annotations
 import os
+import json
+import time
+import errno
 import shutil
+import hashlib
 import argparse
-from typing import Dict, List, Set
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+from catalog_walk import list_dirs, list_images, walk_catalog
+
+JOURNAL_FILE = ".merge-journal.jsonl"
+JOURNAL_VERSION = 1
+# Cross-device copies are built under .<name>.merge-partial and renamed into place when complete
+PARTIAL_SUFFIX = ".merge-partial"
+# Seconds between progress lines while moving
+PROGRESS_INTERVAL = 2.0
 
 def get_all_categories(base_dirs: List[str]) -> Set[str]:
     """Get all unique categories from both source directories."""
     categories = set()
     for base_dir in base_dirs:
         if os.path.isdir(base_dir):
-            try:
-                entries = os.listdir(base_dir)
-                for entry in entries:
-                    entry_path = os.path.join(base_dir, entry)
-                    if os.path.isdir(entry_path):
-                        categories.add(entry)
-            except Exception as e:
-                print(f"ERROR: Cannot list directory '{base_dir}': {e}")
+            categories.update(entry.name for entry in list_dirs(base_dir))
     return categories
 
 def ensure_category_dirs(medicines_dir: str, categories: Set[str]) -> None:
@@ -43,28 +81,296 @@ def ensure_category_dirs(medicines_dir: str, categories: Set[str]) -> None:
         if not os.path.isdir(cat_path):
             os.makedirs(cat_path, exist_ok=True)
 
-def get_unique_name(dest_dir: str, medicine_name: str) -> str:
-    """Get a unique name for the medicine folder if it already exists."""
-    original_name = medicine_name
-    counter = 1
-    dest_path = os.path.join(dest_dir, medicine_name)
-    
-    while os.path.exists(dest_path):
-        medicine_name = f"{original_name}_v{counter}"
-        dest_path = os.path.join(dest_dir, medicine_name)
-        counter += 1
-    
-    return medicine_name
+def file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def folder_fingerprint(path: str) -> Dict[str, str]:
+    """Content digest -> image file name for every image directly inside path."""
+    return {file_digest(img.path): img.name for img in reversed(list_images(path))}
+
+class DestinationIndex:
+    """In-memory view of the destination tree: names per category (listed once) and
+    image fingerprints of existing folders (computed once, on first collision)."""
+
+    def __init__(self, medicines_dir: str) -> None:
+        self.medicines_dir = medicines_dir
+        self._names: Dict[str, Set[str]] = {}
+        self._fingerprints: Dict[Tuple[str, str], Dict[str, str]] = {}
+        # Folders planned to move here but still at their source path
+        self._planned: Dict[Tuple[str, str], str] = {}
+        # (category, base name) -> next _vN suffix to try
+        self._next_suffix: Dict[Tuple[str, str], int] = {}
+
+    def names(self, category: str) -> Set[str]:
+        names = self._names.get(category)
+        if names is None:
+            cat_path = os.path.join(self.medicines_dir, category)
+            names = {e.name for e in list_dirs(cat_path)} if os.path.isdir(cat_path) else set()
+            self._names[category] = names
+        return names
+
+    def fingerprint(self, category: str, name: str) -> Dict[str, str]:
+        key = (category, name)
+        fp = self._fingerprints.get(key)
+        if fp is None:
+            path = self._planned.get(key) or os.path.join(self.medicines_dir, category, name)
+            fp = self._fingerprints[key] = folder_fingerprint(path)
+        return fp
+
+    def variants(self, category: str, name: str) -> List[str]:
+        """Existing folders named name, name_v1, name_v2, ... (set lookups only)."""
+        names = self.names(category)
+        found = [name] if name in names else []
+        counter = 1
+        while f"{name}_v{counter}" in names:
+            found.append(f"{name}_v{counter}")
+            counter += 1
+        self._next_suffix[(category, name)] = max(counter, self._next_suffix.get((category, name), 1))
+        return found
+
+    def unique_name(self, category: str, name: str) -> str:
+        names = self.names(category)
+        if name not in names:
+            return name
+        counter = self._next_suffix.get((category, name), 1)
+        while f"{name}_v{counter}" in names:
+            counter += 1
+        self._next_suffix[(category, name)] = counter + 1
+        return f"{name}_v{counter}"
+
+    def add(self, category: str, name: str, fingerprint: Optional[Dict[str, str]] = None, source_path: Optional[str] = None) -> None:
+        self.names(category).add(name)
+        if source_path is not None:
+            self._planned[(category, name)] = source_path
+        if fingerprint is not None:
+            self._fingerprints[(category, name)] = fingerprint
+
+def find_duplicate(index: DestinationIndex, category: str, name: str, source: Dict[str, str]) -> Tuple[Optional[str], bool]:
+    """Existing folder that already holds the source images: (name, True) when it has all
+    of them, (name, False) for the folder sharing the most images, (None, False) otherwise."""
+    best, best_shared = None, 0
+    for existing in index.variants(category, name):
+        present = index.fingerprint(category, existing)
+        shared = len(source.keys() & present.keys())
+        if shared == len(source):
+            return existing, True
+        if shared > best_shared:
+            best, best_shared = existing, shared
+    return best, False
+
+def source_labels(source_dirs: List[str]) -> List[str]:
+    """Short name per source for log lines: its folder name, numbered if two sources share one."""
+    labels: List[str] = []
+    for source_dir in source_dirs:
+        base = os.path.basename(os.path.normpath(source_dir)) or source_dir
+        label, n = base, 2
+        while label in labels:
+            label = f"{base}({n})"
+            n += 1
+        labels.append(label)
+    return labels
+
+class Transfer(NamedTuple):
+    src: str
+    dest: str
+    label: str
+
+def _partial_path(dest: str) -> str:
+    return os.path.join(os.path.dirname(dest), f".{os.path.basename(dest)}{PARTIAL_SUFFIX}")
+
+def _remove(path: str) -> None:
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path)
+    elif os.path.lexists(path):
+        os.unlink(path)
+
+def _tree_size(path: str) -> int:
+    if not os.path.isdir(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(path) for f in files)
+
+class MergeJournal:
+    """Write-ahead log of cross-device transfers: begin before the copy starts, copied once
+    the copy is complete under its final name, done once the source is gone. Each record
+    is flushed to disk before the step it announces. Same-device renames are atomic and
+    are not logged."""
+
+    def __init__(self, path: str, medicines_dir: str, source_dirs: List[str]) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, "w", encoding="utf-8")
+        self._append({"version": JOURNAL_VERSION, "medicines_dir": os.path.abspath(medicines_dir), "sources": [os.path.abspath(s) for s in source_dirs]})
+
+    def _append(self, record: Dict) -> None:
+        with self._lock:
+            self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def record(self, op: str, transfer: Transfer) -> None:
+        self._append({"op": op, "src": transfer.src, "dest": transfer.dest})
+
+    def finish(self) -> None:
+        self._append({"op": "end"})
+        self._file.close()
+
+def transfer(t: Transfer, journal: Optional[MergeJournal]) -> int:
+    """Move a folder or file. A rename when possible; across devices the copy is made under
+    a hidden partial name and renamed into place before the source is removed.
+    Returns the bytes copied (0 for a rename)."""
+    if os.path.lexists(t.dest):
+        raise FileExistsError(errno.EEXIST, "Destination already exists", t.dest)
+    try:
+        # Atomic: after a crash it either happened or not, so it needs no journal record
+        os.rename(t.src, t.dest)
+        return 0
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+    if journal:
+        journal.record("begin", t)
+    partial = _partial_path(t.dest)
+    _remove(partial)
+    if os.path.isdir(t.src):
+        shutil.copytree(t.src, partial)
+    else:
+        shutil.copy2(t.src, partial)
+    size = _tree_size(partial)
+    os.rename(partial, t.dest)
+    if journal:
+        journal.record("copied", t)
+    _remove(t.src)
+    if journal:
+        journal.record("done", t)
+    return size
+
+def recover(journal_path: str) -> Dict[str, int]:
+    """Settle the transfers an interrupted run left unfinished.
+
+    A transfer whose destination exists completed its copy (the final name only appears
+    through a rename), so only the source removal is finished. Otherwise the partial copy is
+    dropped and the source, still intact, is merged again by the new run."""
+    stats = {"completed": 0, "restarted": 0}
+    if not os.path.isfile(journal_path):
+        return stats
+    pending: Dict[Tuple[str, str], str] = {}
+    with open(journal_path, "r", encoding="utf-8") as f:
+        header = json.loads(f.readline() or "{}")
+        if header.get("version") != JOURNAL_VERSION:
+            raise ValueError(f"{journal_path}: not a merge journal")
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                rec = json.loads(line)
+            except json.JSONDecodeError:
+                break  # torn last record: the step it announced never started
+            if rec.get("op") == "end":
+                return stats
+            key = (rec["src"], rec["dest"])
+            if rec["op"] == "done":
+                pending.pop(key, None)
+            else:
+                pending[key] = rec["op"]
+    for (src, dest), op in pending.items():
+        _remove(_partial_path(dest))
+        if os.path.lexists(dest):
+            if os.path.lexists(src):
+                _remove(src)
+            print(f"RESUME: finished '{src}' -> '{dest}'")
+            stats["completed"] += 1
+        else:
+            print(f"RESUME: '{src}' will be merged again")
+            stats["restarted"] += 1
+    return stats
+
+def merge_into(src_dir: str, dest_dir: str, source: Dict[str, str], present: Dict[str, str], journal: Optional[MergeJournal] = None) -> Tuple[List[str], int]:
+    """Move images of src_dir that dest_dir lacks into dest_dir.
+    Returns (new file names, bytes copied across devices)."""
+    existing_names = set(os.listdir(dest_dir))
+    added = []
+    copied = 0
+    for digest, fname in source.items():
+        if digest in present:
+            continue
+        target, counter = fname, 1
+        stem, ext = os.path.splitext(fname)
+        while target in existing_names:
+            target = f"{stem}_v{counter}{ext}"
+            counter += 1
+        copied += transfer(Transfer(os.path.join(src_dir, fname), os.path.join(dest_dir, target), fname), journal)
+        existing_names.add(target)
+        present[digest] = target
+        added.append(target)
+    return added, copied
+
+def _format_bytes(n: float) -> str:
+    for unit in ("B", "KB", "MB"):
+        if n < 1024:
+            return f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} GB"
+
+def apply_transfers(transfers: List[Transfer], journal: Optional[MergeJournal], stats: Dict[str, int], workers: int = 4) -> None:
+    """Run folder moves in a bounded thread pool, printing each move and periodic progress."""
+    total = len(transfers)
+    done = 0
+    start = last_report = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {pool.submit(transfer, t, journal): t for t in transfers}
+        for future in as_completed(futures):
+            t = futures[future]
+            done += 1
+            try:
+                copied = future.result()
+            except Exception as e:
+                print(f"  ERROR moving '{t.label}': {e}")
+                stats['errors'] += 1
+                continue
+            stats['total_moved'] += 1
+            if copied:
+                stats['cross_device'] += 1
+                stats['bytes_copied'] += copied
+            print(f"  MOVED: {t.label}")
+            now = time.perf_counter()
+            if now - last_report >= PROGRESS_INTERVAL and done < total:
+                rate = stats['bytes_copied'] / (now - start)
+                print(f"  Progress: {done}/{total} folders, {_format_bytes(stats['bytes_copied'])} copied ({_format_bytes(rate)}/s)")
+                last_report = now
+    stats['move_seconds'] = time.perf_counter() - start
+
+def merge_medicines(
+    source_dirs: List[str],
+    medicines_dir: str,
+    dry_run: bool = False,
+    merge_overlapping: bool = False,
+    workers: int = 4,
+    journal: Optional[MergeJournal] = None,
+) -> Dict[str, int]:
+    """Merge medicines from source directories into the medicines directory.
 
-def merge_medicines(source_dirs: List[str], medicines_dir: str, dry_run: bool = False) -> Dict[str, int]:
-    """Merge medicines from source directories into the medicines directory."""
+    Every decision is made first against the in-memory destination index; the folder
+    moves then run in parallel, followed by image merges into existing folders."""
     stats = {
         'total_processed': 0,
         'total_moved': 0,
         'duplicates_renamed': 0,
+        'duplicates_skipped': 0,
+        'duplicates_merged': 0,
         'skipped': 0,
-        'errors': 0
+        'errors': 0,
+        'cross_device': 0,
+        'bytes_copied': 0,
     }
+    index = DestinationIndex(medicines_dir)
+    transfers: List[Transfer] = []
+    # (label, source folder, existing folder, source fingerprint, existing fingerprint)
+    merges: List[Tuple[str, str, str, Dict[str, str], Dict[str, str]]] = []
     
     # Get all categories first
     all_categories = get_all_categories(source_dirs)
@@ -73,60 +379,78 @@ def merge_medicines(source_dirs: List[str], medicines_dir: str, dry_run: bool =
     if not dry_run:
         ensure_category_dirs(medicines_dir, all_categories)
     
-    for source_idx, source_dir in enumerate(source_dirs):
-        source_name = f"final_web{'_2' if source_idx == 1 else ''}"
+    def on_list_error(path: str, e: OSError) -> None:
+        print(f"ERROR: Cannot list '{path}': {e}")
+        stats['errors'] += 1
+
+    for source_dir, source_name in zip(source_dirs, source_labels(source_dirs)):
+        source_dir = os.path.abspath(source_dir)
         if not os.path.isdir(source_dir):
             print(f"WARNING: Source directory not found: {source_dir}")
             continue
             
         print(f"\nProcessing {source_name}: {source_dir}")
-        
-        try:
-            categories = sorted(os.listdir(source_dir))
-        except Exception as e:
-            print(f"ERROR: Cannot list source directory: {e}")
-            stats['errors'] += 1
-            continue
-            
-        for category in categories:
-            cat_path = os.path.join(source_dir, category)
-            if not os.path.isdir(cat_path):
-                continue
-                
+
+        for category, medicine_entry, _ in walk_catalog(source_dir, with_images=False, on_error=on_list_error):
+            medicine = medicine_entry.name
+            medicine_path = medicine_entry.path
             dest_cat_dir = os.path.join(medicines_dir, category)
+
+            stats['total_processed'] += 1
             
-            try:
-                medicines = sorted(os.listdir(cat_path))
-            except Exception as e:
-                print(f"ERROR: Cannot list category '{category}': {e}")
-                stats['errors'] += 1
-                continue
-                
-            for medicine in medicines:
-                medicine_path = os.path.join(cat_path, medicine)
-                if not os.path.isdir(medicine_path):
+            # Same name already merged: compare contents before creating another _vN copy
+            if medicine in index.names(category):
+                try:
+                    source_fp = folder_fingerprint(medicine_path)
+                    duplicate, contained = find_duplicate(index, category, medicine, source_fp) if source_fp else (None, False)
+                except OSError as e:
+                    print(f"  ERROR fingerprinting '{medicine}': {e}")
+                    stats['errors'] += 1
+                    continue
+                if duplicate and contained:
+                    stats['duplicates_skipped'] += 1
+                    print(f"  DUPLICATE: {source_name}/{category}/{medicine} images already in medicines/{category}/{duplicate} — skipped")
                     continue
-                    
-                stats['total_processed'] += 1
-                
-                # Check if destination already exists and get unique name
-                unique_name = get_unique_name(dest_cat_dir, medicine)
-                dest_path = os.path.join(dest_cat_dir, unique_name)
-                
-                if unique_name != medicine:
-                    stats['duplicates_renamed'] += 1
-                    print(f"  RENAMED: '{medicine}' -> '{unique_name}' (duplicate)")
-                
-                if dry_run:
-                    print(f"  DRY-RUN MOVE: {source_name}/{category}/{medicine} -> medicines/{category}/{unique_name}")
-                else:
-                    try:
-                        shutil.move(medicine_path, dest_path)
-                        print(f"  MOVED: {source_name}/{category}/{medicine} -> medicines/{category}/{unique_name}")
-                        stats['total_moved'] += 1
-                    except Exception as e:
-                        print(f"  ERROR moving '{medicine}': {e}")
-                        stats['errors'] += 1
+                if duplicate and merge_overlapping:
+                    stats['duplicates_merged'] += 1
+                    present = index.fingerprint(category, duplicate)
+                    label = f"{source_name}/{category}/{medicine} -> medicines/{category}/{duplicate}"
+                    if dry_run:
+                        new = [f for d, f in source_fp.items() if d not in present]
+                        print(f"  DRY-RUN MERGE: {len(new)} new image(s) from {label}")
+                    else:
+                        merges.append((label, medicine_path, os.path.join(dest_cat_dir, duplicate), source_fp, present))
+                    continue
+            else:
+                source_fp = None
+
+            unique_name = index.unique_name(category, medicine)
+            dest_path = os.path.join(dest_cat_dir, unique_name)
+            
+            if unique_name != medicine:
+                stats['duplicates_renamed'] += 1
+                print(f"  RENAMED: '{medicine}' -> '{unique_name}' (duplicate)")
+            
+            index.add(category, unique_name, source_fp, medicine_path)
+            label = f"{source_name}/{category}/{medicine} -> medicines/{category}/{unique_name}"
+            if dry_run:
+                print(f"  DRY-RUN MOVE: {label}")
+            else:
+                transfers.append(Transfer(medicine_path, dest_path, label))
+
+    if transfers:
+        print(f"\nMoving {len(transfers)} folders ({workers} workers)")
+        apply_transfers(transfers, journal, stats, workers)
+
+    # Merge targets may be folders moved above, so these run afterwards
+    for label, src_dir, dest_dir, source_fp, present in merges:
+        try:
+            added, copied = merge_into(src_dir, dest_dir, source_fp, present, journal)
+            stats['bytes_copied'] += copied
+            print(f"  MERGED: {len(added)} new image(s) from {label}")
+        except Exception as e:
+            print(f"  ERROR merging '{label}': {e}")
+            stats['errors'] += 1
     
     return stats
 
@@ -134,6 +458,10 @@ def main() -> None:
     parser = argparse.ArgumentParser(description="Merge medicines from source directories into a single medicines directory.")
     parser.add_argument("--medicines-dir", default="medicines", help="Path (relative or absolute) to the unified medicines directory")
     parser.add_argument("--source-dir", action="append", dest="source_dirs", help="Source directory to merge from (can be specified multiple times)")
+    parser.add_argument("--merge-overlapping", action="store_true", help="Move new images of a duplicate that shares images with an existing folder into that folder instead of creating a _vN copy")
+    parser.add_argument("--near-duplicates", action="store_true", help="After merging, report folders with near-identical images (requires pillow and numpy)")
+    parser.add_argument("--workers", type=int, default=4, help="Folder moves running at once (cross-device copies overlap I/O)")
+    parser.add_argument("--journal", default=None, help=f"Write-ahead journal used to resume an interrupted merge (default: <medicines-dir>/{JOURNAL_FILE})")
     parser.add_argument("--dry-run", action="store_true", help="Preview actions without moving folders")
 
     args = parser.parse_args()
@@ -153,18 +481,45 @@ def main() -> None:
         exists = "✓" if os.path.isdir(src) else "✗"
         print(f"  {exists} {src}")
 
+    journal: Optional[MergeJournal] = None
     if not dry_run:
         os.makedirs(medicines_dir, exist_ok=True)
+        journal_path = args.journal or os.path.join(medicines_dir, JOURNAL_FILE)
+        resumed = recover(journal_path)
+        if any(resumed.values()):
+            print(f"Resumed interrupted merge: {resumed['completed']} moves finished, {resumed['restarted']} restarted")
+        journal = MergeJournal(journal_path, medicines_dir, source_dirs)
 
     # Merge medicines from directories
-    stats = merge_medicines(source_dirs, medicines_dir, dry_run)
+    stats = merge_medicines(source_dirs, medicines_dir, dry_run, args.merge_overlapping, args.workers, journal)
+    if journal:
+        journal.finish()
 
     print(f"\nMerge Summary:")
     print(f"  Total medicines processed: {stats['total_processed']}")
     print(f"  Successfully moved: {stats['total_moved']}")
     print(f"  Duplicates renamed: {stats['duplicates_renamed']}")
+    print(f"  Identical duplicates skipped: {stats['duplicates_skipped']}")
+    print(f"  Duplicates merged into existing folders: {stats['duplicates_merged']}")
+    if stats['cross_device']:
+        seconds = stats.get('move_seconds') or 0
+        rate = f" ({_format_bytes(stats['bytes_copied'] / seconds)}/s)" if seconds else ""
+        print(f"  Copied across devices: {stats['cross_device']} folders, {_format_bytes(stats['bytes_copied'])} in {seconds:.1f}s{rate}")
     print(f"  Errors: {stats['errors']}")
 
+    if args.near_duplicates and not dry_run:
+        # Imported on demand: pulls in numpy and pillow
+        from image_similarity import find_near_duplicates, hash_tree, print_groups
+        print("\nNear-duplicate check:")
+        try:
+            hashes = hash_tree(medicines_dir)
+        except RuntimeError as e:
+            print(f"ERROR: {e}")
+        else:
+            groups = find_near_duplicates(hashes)
+            print_groups(groups, hashes)
+            print(f"  Near-duplicate groups: {len(groups)} ({sum(len(g) - 1 for g in groups)} redundant folders)")
+
     if dry_run:
         print("\nNote: This was a dry run. Re-run without --dry-run to apply changes.")
     else:
@@ -1,12 +1,15 @@
-import json
+import os
 import sys
+import math
 from pathlib import Path
 import argparse
 import re
 
+from catalog_io import CatalogWriter, iter_entries, sniff_encoding
+from change_log import ChangeLog, log_details, print_change_report
+from snapshot_store import SnapshotStore, default_store_path, record_catalog
+
 CURRENT_PATH = Path(r"S:\MedCare\src\data\medicines.json")
-PREV_PATH = Path(r"S:\MedCare\src\data\medicines.previous.json")
-PREV2_PATH = Path(r"S:\MedCare\src\data\medicines.previous2.json")
 
 # Labels to prefer restoring when missing
 PREFER_LABELS = {
@@ -38,17 +41,101 @@ DETAIL_LABELS = [
     "Storage",
 ]
 
-def load_json(path: Path):
+STAGE = "restore"
+
+# Fields of a previous snapshot entry that restoration actually reads
+SNAPSHOT_FIELDS = {"id", "name", "details"} | PREFER_LABELS
+
+# Fuzzy matching when id/name differ (e.g., brand vs generic): minimum Jaccard similarity of name tokens
+MIN_JACCARD = 0.5
+STOPWORDS = {"tablet", "tablets", "capsule", "capsules", "mg", "ml", "g", "tab", "tabs"}
+WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokens(s: str):
+    words = [w for w in WORD_RE.findall(str(s or '').lower()) if w and w not in STOPWORDS]
+    return set(words)
+
+
+class TokenIndex:
+    """Inverted index over the token sets of previous entries, for Jaccard >= MIN_JACCARD lookups.
+
+    Prefix filtering: two sets with Jaccard >= t share at least ceil(t * |x|) tokens, so
+    with every set ordered rarest token first, a match shares a token within the first
+    |x| - ceil(t * |x|) + 1 tokens of both sets. Only those prefix tokens are indexed and
+    probed; the few candidates found are scored exactly, and ties go to the earliest row,
+    as with a linear scan over all rows.
+    """
+
+    def __init__(self):
+        self.rows = []
+        self._postings = None
+
+    def add(self, toks, entry):
+        self.rows.append((toks, entry))
+        self._postings = None
+
+    def _prefix(self, toks, df):
+        need = max(1, math.ceil(MIN_JACCARD * len(toks) - 1e-9))
+        return sorted(toks, key=lambda t: (df.get(t, 0), t))[: len(toks) - need + 1]
+
+    def _build(self):
+        self._df = {}
+        for toks, _ in self.rows:
+            for t in toks:
+                self._df[t] = self._df.get(t, 0) + 1
+        self._postings = {}
+        for row, (toks, _) in enumerate(self.rows):
+            for t in self._prefix(toks, self._df):
+                self._postings.setdefault(t, []).append(row)
+
+    def best_match(self, etoks):
+        if not etoks:
+            return None
+        if self._postings is None:
+            self._build()
+        candidates = set()
+        for t in self._prefix(etoks, self._df):
+            candidates.update(self._postings.get(t, ()))
+        # Size filter: Jaccard >= t needs t * |x| <= |y| <= |x| / t
+        lo, hi = MIN_JACCARD * len(etoks), len(etoks) / MIN_JACCARD
+        best = None
+        best_score = 0.0
+        for row in sorted(candidates):
+            ptoks, cand = self.rows[row]
+            if not lo <= len(ptoks) <= hi:
+                continue
+            score = len(etoks & ptoks) / len(etoks | ptoks)
+            # Require reasonable overlap
+            if score > best_score and score >= MIN_JACCARD:
+                best = cand
+                best_score = score
+        return best
+
+
+def iter_snapshot(path: Path):
+    """Stream a previous snapshot, keeping only the fields restoration needs.
+    The encoding (UTF-8/16/32, e.g. files saved from git/PowerShell) is sniffed from the first bytes."""
     if not path.exists():
-        return []
-    # Try multiple encodings to handle files from git or different editors
-    for enc in ("utf-8", "utf-8-sig", "utf-16", "utf-16-le", "utf-16-be"):
-        try:
-            with path.open("r", encoding=enc) as f:
-                return json.load(f)
-        except Exception:
-            continue
-    raise RuntimeError(f"Failed to read JSON file: {path}")
+        return
+    encoding = sniff_encoding(str(path))
+    print(f"Reading {path.name} as {encoding}")
+    for e in iter_entries(str(path), encoding):
+        if isinstance(e, dict):
+            yield {k: v for k, v in e.items() if k in SNAPSHOT_FIELDS}
+
+
+def iter_store_names(store: SnapshotStore):
+    """One slim entry per id in the snapshot store: its latest name and brand name.
+    Only used for matching; the fields to restore are looked up per matched id."""
+    latest = {}
+    for entry_id, field, value in store.names():
+        e = latest.setdefault(entry_id, {"id": entry_id, "_store": True})
+        if field == "name":
+            e["name"] = value
+        else:
+            e["details"] = [{"label": "Brand Name", "value": value}]
+    yield from latest.values()
 
 
 def normalize_details(entry, incoming):
@@ -118,123 +205,159 @@ def merge_details_with_old(entry, current, old):
     return merged
 
 
-def main():
-    parser = argparse.ArgumentParser(description="Merge old details into current medicines.json")
-    parser.add_argument("--extra", dest="extra", nargs="*", default=[], help="Additional previous JSON file(s) to merge from")
-    args = parser.parse_args()
+# Helper to slugify names similar to frontend/backend
+def slug(s: str) -> str:
+    s = str(s or "").strip().lower().replace("&", " and ")
+    out = []
+    prev_dash = False
+    for ch in s:
+        if ch.isalnum():
+            out.append(ch)
+            prev_dash = False
+        else:
+            if not prev_dash:
+                out.append('-')
+                prev_dash = True
+    res = ''.join(out).strip('-')
+    return res
+
+
+class DetailRestorer:
+    """Restores missing fields and details of current entries from previous snapshots.
+
+    Sources are JSON snapshot files (held as slim entries) and/or a snapshot store.
+    restore() works on one entry in place, so it runs as a stage of catalog_pipeline.py
+    as well as from this script."""
 
-    cur = load_json(CURRENT_PATH)
-    prev = load_json(PREV_PATH)
-    prev2 = load_json(PREV2_PATH)
-    combined_prev = []
-    combined_prev.extend([e for e in prev if isinstance(e, dict)])
-    combined_prev.extend([e for e in prev2 if isinstance(e, dict)])
-    # Load any extra previous files supplied
-    for p in args.extra:
-        try:
-            data = load_json(Path(p))
-            combined_prev.extend([e for e in data if isinstance(e, dict)])
-        except Exception:
-            pass
-    prev_by_id = {str(e.get("id")): e for e in combined_prev if e.get("id")}
-
-    # Helper to slugify names similar to frontend/backend
-    def slug(s: str) -> str:
-        s = str(s or "").strip().lower().replace("&", " and ")
-        out = []
-        prev_dash = False
-        for ch in s:
-            if ch.isalnum():
-                out.append(ch)
-                prev_dash = False
-            else:
-                if not prev_dash:
-                    out.append('-')
-                    prev_dash = True
-        res = ''.join(out).strip('-')
-        return res
-
-    prev_by_name = {}
-    for e in combined_prev:
-        if not isinstance(e, dict):
-            continue
-        nm = e.get("name")
-        if nm:
-            prev_by_name.setdefault(slug(nm), e)
-        # Try details Brand Name
-        d = e.get("details")
-        if isinstance(d, list):
-            for row in d:
-                if isinstance(row, dict) and str(row.get("label")).lower() == "brand name":
-                    bn = row.get("value")
-                    if bn:
-                        prev_by_name.setdefault(slug(bn), e)
-                    break
-
-    # Build token index for fuzzy matching when id/name differ (e.g., brand vs generic)
-    STOPWORDS = {"tablet", "tablets", "capsule", "capsules", "mg", "ml", "g", "tab", "tabs"}
-    WORD_RE = re.compile(r"[a-z0-9]+")
-
-    def tokens(s: str):
-        words = [w for w in WORD_RE.findall(str(s or '').lower()) if w and w not in STOPWORDS]
-        return set(words)
-
-    prev_token_index = []
-    for e in combined_prev:
-        nm = str(e.get("name", ""))
-        toks = tokens(nm)
-        # include Brand Name from details
-        d = e.get("details")
-        if isinstance(d, list):
-            for row in d:
-                if str(row.get("label", "")).lower() == "brand name":
-                    toks |= tokens(row.get("value", ""))
-                    break
-        prev_token_index.append((toks, e))
-
-    updated = []
-    restored_count = 0
-
-    for entry in cur:
-        old = prev_by_id.get(entry.get("id"))
+    def __init__(self, previous=(), extra=(), store: SnapshotStore = None):
+        self.store = store
+        self.restored = 0
+        # Previous snapshots are only held as slim entries; the current catalog is streamed
+        combined_prev = []
+        if store:
+            combined_prev.extend(iter_store_names(store))
+        for p in previous:
+            combined_prev.extend(iter_snapshot(Path(p)))
+        # Load any extra previous files supplied
+        for p in extra:
+            try:
+                combined_prev.extend(iter_snapshot(Path(p)))
+            except Exception:
+                pass
+        self.prev_by_id = {str(e.get("id")): e for e in combined_prev if e.get("id")}
+
+        self.prev_by_name = {}
+        for e in combined_prev:
+            if not isinstance(e, dict):
+                continue
+            nm = e.get("name")
+            if nm:
+                self.prev_by_name.setdefault(slug(nm), e)
+            # Try details Brand Name
+            d = e.get("details")
+            if isinstance(d, list):
+                for row in d:
+                    if isinstance(row, dict) and str(row.get("label")).lower() == "brand name":
+                        bn = row.get("value")
+                        if bn:
+                            self.prev_by_name.setdefault(slug(bn), e)
+                        break
+
+        # Build token index for fuzzy matching when id/name differ (e.g., brand vs generic)
+        self.prev_token_index = TokenIndex()
+        for e in combined_prev:
+            nm = str(e.get("name", ""))
+            toks = tokens(nm)
+            # include Brand Name from details
+            d = e.get("details")
+            if isinstance(d, list):
+                for row in d:
+                    if str(row.get("label", "")).lower() == "brand name":
+                        toks |= tokens(row.get("value", ""))
+                        break
+            self.prev_token_index.add(toks, e)
+
+    def find(self, entry):
+        old = self.prev_by_id.get(entry.get("id"))
         if not old:
-            old = prev_by_name.get(slug(entry.get("name")))
+            old = self.prev_by_name.get(slug(entry.get("name")))
         # If still not found, try fuzzy match by tokens overlap
         if not old:
-            etoks = tokens(entry.get("name"))
-            best = None
-            best_score = 0.0
-            for ptoks, cand in prev_token_index:
-                if not ptoks:
-                    continue
-                inter = len(etoks & ptoks)
-                if inter == 0:
-                    continue
-                denom = len(etoks | ptoks)
-                score = inter / denom if denom else 0.0
-                # Require reasonable overlap
-                if score > best_score and score >= 0.5:
-                    best = cand
-                    best_score = score
-            if best is not None:
-                old = best
+            old = self.prev_token_index.best_match(tokens(entry.get("name")))
+        # Entries matched in the store carry names only; look up their fields now
+        if old and old.get("_store"):
+            old = self.store.restore_view(old["id"])
+        return old
+
+    def restore(self, entry, log: ChangeLog = None) -> bool:
+        """Restore one entry in place. Returns True if any field value actually changed;
+        each restored field and changed details row is recorded in log. Entries matched
+        to previous details are counted in self.restored, changed or not."""
+        changed = False
+        before = entry.get("details") or []
+        old = self.find(entry)
         if old:
             # Restore simple fields if missing or empty
             for k in PREFER_LABELS:
                 if not str(entry.get(k, "")).strip() and str(old.get(k, "")).strip():
+                    if entry.get(k) != old[k]:
+                        changed = True
+                        if log is not None:
+                            log.add(entry.get("id"), STAGE, k, entry.get(k), old[k])
                     entry[k] = old[k]
             # Merge details, preferring old values when available
             old_details = old.get("details")
             entry["details"] = merge_details_with_old(entry, entry.get("details"), old_details)
-            restored_count += 1 if isinstance(old_details, list) and len(old_details) > 0 else 0
+            if isinstance(old_details, list) and len(old_details) > 0:
+                self.restored += 1
         # Ensure normalization pass (labels ordering and default fill)
         entry["details"] = normalize_details(entry, entry.get("details"))
-        updated.append(entry)
+        return log_details(log, entry.get("id"), STAGE, before, entry["details"]) or changed
+
+
+def add_source_arguments(parser):
+    parser.add_argument("--previous", nargs="*", default=None, help="Previous snapshot JSON file(s), in priority order (fallback when no snapshot store is kept)")
+    parser.add_argument("--extra", dest="extra", nargs="*", default=[], help="Additional previous JSON file(s) to merge from")
+    parser.add_argument("--store", type=str, default=None, help="Snapshot store (see snapshot_store.py): restore the last non-empty value of each field (default: <catalog>.snapshots.sqlite unless --previous is given)")
+
+
+def restorer_from_args(args, catalog_path: str):
+    """DetailRestorer for the --previous/--extra/--store arguments. Without --store or
+    --previous, the catalog's own snapshot store is used. Returns None (after printing
+    an error) if there is nothing to restore from."""
+    store_path = args.store
+    if store_path is None and args.previous is None:
+        store_path = default_store_path(catalog_path)
+        if not os.path.isfile(store_path):
+            print(f"ERROR: No snapshot store at {store_path}; pass --store, or --previous with snapshot JSON files")
+            return None
+    if store_path and not os.path.isfile(store_path):
+        print(f"ERROR: Snapshot store not found: {store_path}")
+        return None
+    store = SnapshotStore(store_path) if store_path else None
+    return DetailRestorer(args.previous or [], args.extra, store)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge old details into current medicines.json")
+    parser.add_argument("--path", type=str, default=str(CURRENT_PATH), help="Path to the current medicines.json")
+    add_source_arguments(parser)
+    parser.add_argument("--audit", type=str, default=None, help="Write every changed field (id, field, before, after) to this JSON file")
+    args = parser.parse_args()
+    restorer = restorer_from_args(args, args.path)
+    if restorer is None:
+        return
 
-    with CURRENT_PATH.open("w", encoding="utf-8") as f:
-        json.dump(updated, f, indent=2, ensure_ascii=False)
+    with ChangeLog(args.audit) as log, CatalogWriter(args.path) as out:
+        for entry in iter_entries(args.path):
+            restorer.restore(entry, log)
+            out.write(entry)
 
-    print(f"Restored details for {restored_count} medicines. Total entries: {len(updated)}")
+    if restorer.store:
+        restorer.store.close()
+    print(f"Restored details for {restorer.restored} medicines. Total entries: {out.count}")
+    print_change_report(log)
+    record_catalog(args.path, args.store)
 
 
 if __name__ == "__main__":
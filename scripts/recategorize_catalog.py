@@ -0,0 +1,164 @@
+"""Reassign categories directly in medicines.json, without moving any folders.
+
+Changing a category used to mean moving folders with categorize_medicines.py and
+regenerating the whole catalog. This script applies the same classification rules
+(classification_keywords.json) and an overrides file to the catalog in memory and
+rewrites only what changed:
+  - medicines.json (only if any entry changed)
+  - the split catalog, if present: the index plus the detail files of changed entries
+  - the search index, if present (category is a searchable field)
+
+Rules, per entry:
+  - An override for the entry id always wins.
+  - Entries currently Uncategorized get the keyword category of their name.
+  - With --reclassify, every entry gets its keyword category (like categorize
+    --reclassify, this can also move entries back to Uncategorized).
+  - The price follows the new category only if it still is the old category's base price.
+
+Overrides file (default: <json>.overrides.json), id -> category folder or display name:
+  {"3mg-melatonin-tablets": "Sleep_Disorders", "5mg-folic-acid": "Supplements & Hair"}
+
+Folder-based regeneration resets categories to the folder layout; run this again
+afterwards, or pass --recategorize to generate_unified_medicines_json.py.
+
+Usage (PowerShell):
+  py .\\scripts\\recategorize_catalog.py --json "s:\\MedCare\\src\\data\\medicines.json" --dry-run
+  py .\\scripts\\recategorize_catalog.py --json "s:\\MedCare\\src\\data\\medicines.json" --reclassify
+  py .\\scripts\\recategorize_catalog.py --json "s:\\MedCare\\src\\data\\medicines.json" --overrides "s:\\MedCare\\category-overrides.json"
+"""
+from __future__ import annotations
+import os
+import sys
+import time
+import argparse
+from typing import Dict, List, Optional, Set
+
+from catalog_io import load_json, write_entries
+from catalog_split import current_split_build, default_split_dir, print_split_report, update_split_catalog
+from classification import load_engine
+from generate_unified_medicines_json import CATEGORY_BASE_PRICE, CATEGORY_DISPLAY_MAP
+from search_index import build_search_index, default_index_path, print_search_index_report, write_search_index
+
+UNCATEGORIZED = CATEGORY_DISPLAY_MAP["Unclear"]
+# Overrides may name either the category folder or its display name
+_KNOWN_CATEGORIES = {**{v: v for v in CATEGORY_DISPLAY_MAP.values()}, **CATEGORY_DISPLAY_MAP}
+
+
+def default_overrides_path(json_path: str) -> str:
+    base, _ = os.path.splitext(json_path)
+    return f"{base}.overrides.json"
+
+
+def display_category(category: str) -> str:
+    return CATEGORY_DISPLAY_MAP.get(category, category.replace("_", " ").title())
+
+
+def load_overrides(path: str) -> Dict[str, str]:
+    """id -> display category. Unknown category names are reported and ignored."""
+    if not os.path.isfile(path):
+        return {}
+    raw, _ = load_json(path)
+    if not isinstance(raw, dict):
+        raise ValueError(f"{path}: expected an object of id -> category")
+    overrides: Dict[str, str] = {}
+    for entry_id, category in raw.items():
+        display = _KNOWN_CATEGORIES.get(str(category))
+        if display is None:
+            print(f"WARNING: Unknown category '{category}' for '{entry_id}' in {path} - ignored", file=sys.stderr)
+            continue
+        overrides[str(entry_id)] = display
+    return overrides
+
+
+def recategorize(
+    entries: List[Dict],
+    overrides: Optional[Dict[str, str]] = None,
+    reclassify: bool = False,
+    stats: Optional[Dict[str, int]] = None,
+    verbose: bool = False,
+) -> Set[str]:
+    """Assign categories in place. Returns the ids of entries whose category changed."""
+    engine = load_engine()
+    overrides = overrides or {}
+    stats = stats if stats is not None else {}
+    changed: Set[str] = set()
+    for entry in entries:
+        if not isinstance(entry, dict):
+            continue
+        entry_id = str(entry.get("id") or "")
+        current = entry.get("category") or UNCATEGORIZED
+        if entry_id in overrides:
+            target = overrides[entry_id]
+            stats["overridden"] = stats.get("overridden", 0) + 1
+        elif reclassify or current == UNCATEGORIZED:
+            target = display_category(engine.detect_category(str(entry.get("name") or entry_id)))
+        else:
+            target = current
+        if target == current:
+            continue
+
+        entry["category"] = target
+        # A price still at the old category's default follows the category; edited prices stay
+        if entry.get("price") == CATEGORY_BASE_PRICE.get(current):
+            entry["price"] = CATEGORY_BASE_PRICE.get(target, entry["price"])
+        changed.add(entry_id)
+        stats["changed"] = stats.get("changed", 0) + 1
+        if verbose:
+            print(f"RECATEGORIZE: '{entry.get('name')}' {current} -> {target}")
+
+    missing = set(overrides) - {str(e.get("id")) for e in entries if isinstance(e, dict)}
+    for entry_id in sorted(missing):
+        print(f"WARNING: Override for unknown id '{entry_id}' - ignored", file=sys.stderr)
+    stats["unknown_overrides"] = len(missing)
+    return changed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Reassign medicine categories in medicines.json without moving folders.")
+    parser.add_argument("--json", default=os.path.join(os.getcwd(), "src", "data", "medicines.json"), help="Path to medicines.json")
+    parser.add_argument("--overrides", default=None, help="id -> category overrides JSON (default: <json>.overrides.json)")
+    parser.add_argument("--reclassify", action="store_true", help="Reclassify every entry, not only Uncategorized ones")
+    parser.add_argument("--split-dir", default=None, help="Split catalog to patch (default: <dir of --json>/catalog, if present)")
+    parser.add_argument("--search-index-path", default=None, help="Search index to rebuild (default: <json>.search.json, if present)")
+    parser.add_argument("--dry-run", action="store_true", help="Show the category changes without writing files")
+    args = parser.parse_args()
+
+    if not os.path.isfile(args.json):
+        print(f"ERROR: Catalog not found: {args.json}")
+        return
+    overrides_path = args.overrides or default_overrides_path(args.json)
+    if args.overrides and not os.path.isfile(overrides_path):
+        print(f"ERROR: Overrides file not found: {overrides_path}")
+        return
+
+    start = time.perf_counter()
+    entries, encoding = load_json(args.json)
+    overrides = load_overrides(overrides_path)
+    stats: Dict[str, int] = {}
+    changed = recategorize(entries, overrides, args.reclassify, stats, verbose=True)
+    elapsed = time.perf_counter() - start
+
+    print("\nSummary:")
+    print(f"  Entries: {len(entries)} ({encoding})")
+    print(f"  Overrides: {len(overrides)} loaded, {stats.get('overridden', 0)} applied, {stats['unknown_overrides']} unknown ids")
+    print(f"  Recategorized: {len(changed)} ({elapsed * 1000:.0f} ms)")
+    if args.dry_run:
+        print("  NOTE: This was a dry run. No files were written.")
+        return
+    if not changed:
+        print(f"  Up to date: {args.json}")
+        return
+
+    written = write_entries(args.json, entries)
+    print(f"  Wrote: {args.json} ({written} entries)")
+    split_dir = args.split_dir or default_split_dir(args.json)
+    if current_split_build(split_dir):
+        print_split_report(split_dir, *update_split_catalog(entries, changed, split_dir))
+    search_index_path = args.search_index_path or default_index_path(args.json)
+    if os.path.isfile(search_index_path):
+        index = build_search_index(entries)
+        print_search_index_report(search_index_path, index, write_search_index(index, search_index_path))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""Score every category for a batch of medicine names at once, with a confidence per name.
+
+The keyword matcher (classification.py) answers "which category's keyword occurs
+first"; it has no notion of confidence, so short keywords over-match and combo
+products land wherever their first keyword happens to be. This classifier is a
+multinomial naive Bayes model over name features (each word plus its character
+4-grams, so unseen brand/ingredient spellings still share evidence with known
+ones, e.g. "erlotinib" with "gefitinib" via "tini"/"inib"):
+
+  - Training data: every folder already filed under a category in the medicines/
+    tree (Unclear is skipped), plus each dataset keyword as a pseudo-example
+    of its category (--keyword-weight).
+  - Names are tokenized once into a flat sparse token matrix (token ids + row
+    offsets); all categories are scored for all names with one gather and one
+    np.add.reduceat, so throughput is tens of thousands of names per second.
+  - Categories get a uniform prior: the tree is heavily skewed (a third of it is
+    Erectile_Dysfunction), and the prior would otherwise decide every name with
+    no known features.
+  - Confidence is the softmax probability of the best category. Names below
+    --min-confidence are listed for review.
+
+By default it classifies the folders in <medicines-dir>/Unclear and prints a
+suggested category per name. Nothing is moved.
+
+Requirements:
+  - Python package: numpy
+
+Usage (PowerShell):
+  py .\\scripts\\scored_classifier.py --medicines-dir "s:\\MedCare\\medicines"
+  py .\\scripts\\scored_classifier.py --medicines-dir "s:\\MedCare\\medicines" --classify-dir "s:\\MedCare\\final_web" --min-confidence 0.8 --output review.json
+"""
+from __future__ import annotations
+import os
+import re
+import json
+import time
+import argparse
+from typing import Dict, List, Sequence, Tuple
+
+try:
+    import numpy as np
+except Exception:  # pragma: no cover - optional dependency notification
+    np = None
+
+from catalog_walk import list_dirs, walk_catalog
+from classification import load_engine
+
+_TOKEN = re.compile(r"[a-z]+")
+# Dosage units, form and packaging words say nothing about the therapeutic category
+STOPWORDS = {
+    "mg", "mcg", "ml", "gm", "iu", "tab", "tabs", "tablet", "tablets", "capsule", "capsules", "cap", "caps",
+    "injection", "inj", "oral", "jelly", "gel", "cream", "syrup", "suspension", "solution", "powder",
+    "for", "and", "with", "of", "the", "usp", "bp", "ip", "hcl", "er", "sr", "xr", "dispersible",
+}
+
+
+NGRAM = 4
+
+
+def tokenize(name: str) -> List[str]:
+    return [t for t in _TOKEN.findall(name.lower()) if len(t) > 2 and t not in STOPWORDS]
+
+
+def features(name: str) -> List[str]:
+    """Words and their boundary-marked character n-grams."""
+    out: List[str] = []
+    for tok in tokenize(name):
+        out.append(tok)
+        marked = f"^{tok}$"
+        out.extend("#" + marked[i:i + NGRAM] for i in range(len(marked) - NGRAM + 1))
+    return out
+
+
+class ScoredClassifier:
+    def __init__(self, categories: List[str], vocab: Dict[str, int], log_likelihood) -> None:
+        self.categories = categories
+        self.vocab = vocab
+        # One extra all-zero row: every name gets it, so no row of the token matrix is empty
+        self._weights = np.vstack([log_likelihood, np.zeros((1, len(categories)), dtype=log_likelihood.dtype)])
+
+    @classmethod
+    def train(
+        cls,
+        samples: Sequence[Tuple[str, str]],
+        keyword_table: Sequence[Tuple[str, Sequence[str]]] = (),
+        keyword_weight: float = 2.0,
+        alpha: float = 0.5,
+    ) -> "ScoredClassifier":
+        if np is None:
+            raise RuntimeError("numpy is required for the scored classifier: pip install numpy")
+        categories = sorted({c for _, c in samples} | {c for c, _ in keyword_table})
+        cat_index = {c: i for i, c in enumerate(categories)}
+        vocab: Dict[str, int] = {}
+        rows: List[int] = []
+        cols: List[int] = []
+        vals: List[float] = []
+        for name, category in samples:
+            for tok in features(name):
+                rows.append(vocab.setdefault(tok, len(vocab)))
+                cols.append(cat_index[category])
+                vals.append(1.0)
+        for category, keywords in keyword_table:
+            for kw in keywords:
+                for tok in features(kw):
+                    rows.append(vocab.setdefault(tok, len(vocab)))
+                    cols.append(cat_index[category])
+                    vals.append(keyword_weight)
+
+        counts = np.zeros((len(vocab), len(categories)))
+        np.add.at(counts, (np.asarray(rows, dtype=np.intp), np.asarray(cols, dtype=np.intp)), np.asarray(vals))
+        log_likelihood = np.log(counts + alpha) - np.log(counts.sum(axis=0) + alpha * max(len(vocab), 1))
+        return cls(categories, vocab, log_likelihood.astype(np.float32))
+
+    def encode(self, names: Sequence[str]):
+        """Sparse feature matrix as (feature ids, row start offsets). Unknown features are dropped."""
+        pad = len(self.vocab)
+        ids: List[int] = []
+        starts = np.empty(len(names), dtype=np.intp)
+        for i, name in enumerate(names):
+            starts[i] = len(ids)
+            ids.extend(self.vocab[t] for t in features(name) if t in self.vocab)
+            ids.append(pad)
+        return np.asarray(ids, dtype=np.intp), starts
+
+    def scores(self, names: Sequence[str]):
+        """Log-likelihood (up to a per-name constant) of every category: N x C."""
+        if not names:
+            return np.empty((0, len(self.categories)), dtype=np.float32)
+        ids, starts = self.encode(names)
+        return np.add.reduceat(self._weights[ids], starts, axis=0)
+
+    def classify(self, names: Sequence[str]) -> List[Tuple[str, float]]:
+        """(best category, confidence in 0..1) for every name."""
+        s = self.scores(names)
+        if not len(s):
+            return []
+        s = s - s.max(axis=1, keepdims=True)
+        probs = np.exp(s)
+        probs /= probs.sum(axis=1, keepdims=True)
+        best = probs.argmax(axis=1)
+        conf = probs[np.arange(len(best)), best]
+        return [(self.categories[b], float(c)) for b, c in zip(best, conf)]
+
+
+def training_samples(medicines_dir: str, unclear: str) -> List[Tuple[str, str]]:
+    return [(med.name, category) for category, med, _ in walk_catalog(medicines_dir, with_images=False) if category != unclear]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Suggest categories with confidence scores for medicine folder names.")
+    parser.add_argument("--medicines-dir", default=os.path.join(os.getcwd(), "medicines"), help="Categorized tree to learn from")
+    parser.add_argument("--classify-dir", default=None, help="Folder whose subfolders are classified (default: <medicines-dir>/Unclear)")
+    parser.add_argument("--min-confidence", type=float, default=0.6, help="Names scored below this are listed for review")
+    parser.add_argument("--keyword-weight", type=float, default=2.0, help="Weight of each dataset keyword as a training example")
+    parser.add_argument("--output", default=None, help="Write all results as JSON")
+    args = parser.parse_args()
+
+    if np is None:
+        print("ERROR: numpy is required for the scored classifier: pip install numpy")
+        return
+    if not os.path.isdir(args.medicines_dir):
+        print(f"ERROR: Medicines directory not found: {args.medicines_dir}")
+        return
+
+    engine = load_engine()
+    samples = training_samples(args.medicines_dir, engine.unclear)
+    model = ScoredClassifier.train(samples, engine.categories, args.keyword_weight)
+    classify_dir = args.classify_dir or os.path.join(args.medicines_dir, engine.unclear)
+    names = [e.name for e in list_dirs(classify_dir)]
+
+    start = time.perf_counter()
+    results = model.classify(names)
+    elapsed = time.perf_counter() - start
+
+    review: List[Dict] = []
+    records: List[Dict] = []
+    for name, (category, confidence) in zip(names, results):
+        keyword_category = engine.detect_category(name)
+        record = {"name": name, "category": category, "confidence": round(confidence, 4), "keywordCategory": keyword_category}
+        records.append(record)
+        if confidence < args.min_confidence:
+            review.append(record)
+            print(f"REVIEW: '{name}' -> {category}? ({confidence:.2f})")
+        else:
+            note = "" if keyword_category in (category, engine.unclear) else f" [keywords: {keyword_category}]"
+            print(f"SUGGEST: '{name}' -> {category} ({confidence:.2f}){note}")
+
+    rate = len(names) / elapsed if elapsed > 0 else float("inf")
+    print("\nSummary:")
+    print(f"  Trained on: {len(samples)} folders, {len(model.vocab)} features, {len(model.categories)} categories")
+    print(f"  Classified: {len(names)} names in {elapsed * 1000:.1f} ms ({rate:,.0f} names/s)")
+    print(f"  Confident (>= {args.min_confidence:.2f}): {len(names) - len(review)}")
+    print(f"  Low confidence (for review): {len(review)}")
+    print(f"  Keyword matcher found nothing: {sum(1 for r in records if r['keywordCategory'] == engine.unclear)}")
+    print(f"  Disagree with keyword matcher: {sum(1 for r in records if r['keywordCategory'] not in (r['category'], engine.unclear))}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(records, f, indent=2, ensure_ascii=False)
+        print(f"  Wrote: {args.output} ({len(records)} results)")
+
+
+if __name__ == "__main__":
+    main()
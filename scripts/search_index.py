@@ -0,0 +1,211 @@
+"""Build a prebuilt, typo-tolerant search index for medicines.json.
+
+The index maps casefolded tokens from name, composition, brand, category and form to
+entry ordinals (positions in the "ids" array), plus a trigram table over the
+token vocabulary so misspelled queries ("tadalfil", "ivermectn") still resolve.
+Lookups touch only the query's terms and their trigram neighbours, so search cost
+stays flat as the catalog grows instead of scanning every entry's strings.
+
+Output (default: <output base>.search.json, compact JSON):
+  {"version": 1, "ids": [slug, ...],
+   "terms": [sorted vocabulary], "postings": [[ordinal, ...] per term],
+   "trigrams": {"tad": [term index, ...], ...}}
+
+Usage (PowerShell):
+  py .\\scripts\\search_index.py --json "s:\\MedCare\\src\\data\\medicines.json"
+  py .\\scripts\\search_index.py --json "s:\\MedCare\\src\\data\\medicines.json" --query "tadalfil 20"
+
+Also available as a stage of generate_unified_medicines_json.py via --search-index.
+"""
+from __future__ import annotations
+import os
+import re
+import json
+import bisect
+import argparse
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+INDEX_VERSION = 1
+SEARCH_FIELDS = ("name", "composition", "brand", "category", "form")
+# details[] labels that carry the same information when the top-level field is empty
+DETAIL_FIELDS = {"Composition": "composition", "Brand Name": "brand"}
+
+# Numbers and words are separate tokens, so "20mg" and "20 mg" index alike
+_TOKEN = re.compile(r"[0-9]+(?:\.[0-9]+)?|[a-z]+")
+MIN_FUZZY_LENGTH = 4
+
+
+def normalize(text: str) -> str:
+    """Casefold and strip accents ("Ácido" -> "acido")."""
+    text = unicodedata.normalize("NFKD", text.casefold())
+    return "".join(ch for ch in text if not unicodedata.combining(ch))
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall(normalize(text))
+
+
+def trigrams(term: str) -> Set[str]:
+    padded = f"  {term} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def default_index_path(output_path: str) -> str:
+    base, _ = os.path.splitext(output_path)
+    return f"{base}.search.json"
+
+
+def entry_text(entry: Dict) -> Iterable[str]:
+    fields = {f: entry.get(f) for f in SEARCH_FIELDS}
+    details = entry.get("details")
+    if isinstance(details, list):
+        for d in details:
+            if not isinstance(d, dict):
+                continue
+            field = DETAIL_FIELDS.get(d.get("label"))
+            if field and not fields.get(field) and d.get("value"):
+                fields[field] = d["value"]
+    return (str(v) for v in fields.values() if v)
+
+
+def build_search_index(entries: Iterable[Dict]) -> Dict:
+    ids: List[str] = []
+    term_postings: Dict[str, List[int]] = {}
+    for entry in entries:
+        ordinal = len(ids)
+        ids.append(str(entry.get("slug") or entry.get("id") or ""))
+        seen: Set[str] = set()
+        for text in entry_text(entry):
+            for tok in tokenize(text):
+                if tok not in seen:
+                    seen.add(tok)
+                    term_postings.setdefault(tok, []).append(ordinal)
+
+    terms = sorted(term_postings)
+    grams: Dict[str, List[int]] = {}
+    for i, term in enumerate(terms):
+        if len(term) < MIN_FUZZY_LENGTH - 1 or term.isdigit():
+            continue
+        for g in sorted(trigrams(term)):
+            grams.setdefault(g, []).append(i)
+    return {
+        "version": INDEX_VERSION,
+        "ids": ids,
+        "terms": terms,
+        "postings": [term_postings[t] for t in terms],
+        "trigrams": grams,
+    }
+
+
+def write_search_index(index: Dict, path: str) -> int:
+    """Write the index compactly (atomically). Returns the file size in bytes."""
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp, path)
+    return os.path.getsize(path)
+
+
+def load_search_index(path: str) -> Dict:
+    with open(path, "r", encoding="utf-8") as f:
+        index = json.load(f)
+    if index.get("version") != INDEX_VERSION:
+        raise ValueError(f"{path}: unsupported search index version {index.get('version')}")
+    return index
+
+
+def within_distance(a: str, b: str, limit: int) -> bool:
+    """Levenshtein distance (with adjacent transposition) <= limit, banded."""
+    if abs(len(a) - len(b)) > limit:
+        return False
+    prev2: Optional[List[int]] = None
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if prev2 is not None and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                cur[j] = min(cur[j], prev2[j - 2] + 1)
+        if min(cur) > limit:
+            return False
+        prev2, prev = prev, cur
+    return prev[-1] <= limit
+
+
+def match_term(index: Dict, token: str, prefix: bool = False) -> Dict[int, float]:
+    """Term indices matching one query token, with a score (exact 1.0 > prefix 0.8 > typo 0.5)."""
+    terms = index["terms"]
+    hits: Dict[int, float] = {}
+    i = bisect.bisect_left(terms, token)
+    if i < len(terms) and terms[i] == token:
+        hits[i] = 1.0
+    if prefix:
+        j = i
+        while j < len(terms) and terms[j].startswith(token):
+            hits.setdefault(j, 0.8)
+            j += 1
+    if hits or len(token) < MIN_FUZZY_LENGTH or token.isdigit():
+        return hits
+
+    # Typo tolerance: candidates share trigrams with the token, then confirm by edit distance
+    limit = 1 if len(token) < 8 else 2
+    grams = trigrams(token)
+    shared: Dict[int, int] = {}
+    for g in grams:
+        for t in index["trigrams"].get(g, ()):
+            shared[t] = shared.get(t, 0) + 1
+    need = max(1, len(grams) - 3 * limit)
+    for t, n in shared.items():
+        if n >= need and within_distance(token, terms[t], limit):
+            hits[t] = 0.5
+    return hits
+
+
+def search(index: Dict, query: str, limit: int = 20) -> List[Tuple[str, float]]:
+    """Entries matching every query token, best first. The last token also matches as a prefix."""
+    tokens = tokenize(query)
+    if not tokens:
+        return []
+    scores: Optional[Dict[int, float]] = None
+    for n, tok in enumerate(tokens):
+        per_entry: Dict[int, float] = {}
+        for t, score in match_term(index, tok, prefix=n == len(tokens) - 1).items():
+            for ordinal in index["postings"][t]:
+                if score > per_entry.get(ordinal, 0.0):
+                    per_entry[ordinal] = score
+        if scores is None:
+            scores = per_entry
+        else:
+            scores = {o: s + per_entry[o] for o, s in scores.items() if o in per_entry}
+        if not scores:
+            return []
+    ranked = sorted(scores.items(), key=lambda kv: (-kv[1], kv[0]))[:limit]
+    return [(index["ids"][o], s) for o, s in ranked]
+
+
+def print_search_index_report(path: str, index: Dict, size: int) -> None:
+    print(f"  Wrote: {path} ({size:,} bytes, {len(index['terms'])} terms, {len(index['ids'])} entries)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build (or query) the prebuilt search index for medicines.json.")
+    parser.add_argument("--json", default=os.path.join(os.getcwd(), "src", "data", "medicines.json"), help="Path to medicines.json")
+    parser.add_argument("--index", default=None, help="Search index path (default: <json base>.search.json)")
+    parser.add_argument("--query", default=None, help="Query an existing index instead of building it")
+    args = parser.parse_args()
+
+    index_path = args.index or default_index_path(args.json)
+    if args.query is not None:
+        for slug, score in search(load_search_index(index_path), args.query):
+            print(f"{score:4.1f}  {slug}")
+        return
+
+    from catalog_io import iter_entries
+    index = build_search_index(e for e in iter_entries(args.json) if isinstance(e, dict))
+    print_search_index_report(index_path, index, write_search_index(index, index_path))
+
+
+if __name__ == "__main__":
+    main()
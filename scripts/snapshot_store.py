@@ -0,0 +1,281 @@
+"""Append-only SQLite history of catalog entries, replacing medicines.previous*.json copies.
+
+A build adds a version row for every entry whose content (hash) differs from that
+entry's latest version, so rebuilding an unchanged catalog adds nothing, while an
+entry that changes A -> B -> A gets a third version (A again, in build order).
+Each new version records its non-empty fields, one row per field (top-level
+scalars such as dosage or storage, and every details row as "details.<Label>"),
+indexed by (id, field, version). "Last non-empty value of field X for entry Y" is
+then a single index lookup instead of a scan over whole-file snapshots. Entry JSON
+is stored once per distinct content.
+
+Tables:
+  builds(build, created, source, entries)          - one row per recorded build
+  versions(version, id, hash, build)               - entry content per build, in build order
+  contents(id, hash, data)                         - entry JSON, once per distinct content
+  field_values(id, field, version, value)          - non-empty fields, JSON-encoded values
+
+generate_unified_medicines_json.py records every build (default: <output>.snapshots.sqlite)
+and merge_old_details.py --store restores missing details from it. The post-processing
+scripts (auto_fill_details.py, merge_old_details.py, fix_encoding_artifacts.py,
+catalog_pipeline.py) record the catalog they write as well, whenever its store exists,
+so auto-filled and restored values enter the history too. Existing snapshot files can
+be imported once, oldest first, after which they no longer need to be kept. The
+snapshots that used to be tracked in client/src/data (medicines.previous2.json,
+medicines.previous.json, medicines.backup.json) are in git history for that:
+  git log --diff-filter=D -- client/src/data/medicines.previous.json
+
+The store is local build state, not source: *.snapshots.sqlite is ignored by git
+(client/.gitignore).
+
+Usage (PowerShell):
+  py .\\scripts\\snapshot_store.py import --store "s:\\MedCare\\src\\data\\medicines.snapshots.sqlite" "s:\\MedCare\\src\\data\\medicines.previous2.json" "s:\\MedCare\\src\\data\\medicines.previous.json" "s:\\MedCare\\src\\data\\medicines.json"
+  py .\\scripts\\snapshot_store.py stats --store "s:\\MedCare\\src\\data\\medicines.snapshots.sqlite"
+  py .\\scripts\\snapshot_store.py last --store "s:\\MedCare\\src\\data\\medicines.snapshots.sqlite" --id "3mg-melatonin-tablets" --field dosage
+"""
+from __future__ import annotations
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import argparse
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from catalog_io import iter_entries, sniff_encoding
+
+STORE_VERSION = 2
+DETAILS_PREFIX = "details."
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS builds (
+    build INTEGER PRIMARY KEY,
+    created TEXT NOT NULL,
+    source TEXT,
+    entries INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS versions (
+    version INTEGER PRIMARY KEY,
+    id TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    build INTEGER NOT NULL REFERENCES builds(build)
+);
+CREATE INDEX IF NOT EXISTS versions_by_id ON versions (id, version);
+CREATE TABLE IF NOT EXISTS contents (
+    id TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (id, hash)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS field_values (
+    id TEXT NOT NULL,
+    field TEXT NOT NULL,
+    version INTEGER NOT NULL REFERENCES versions(version),
+    value TEXT NOT NULL,
+    PRIMARY KEY (id, field, version)
+) WITHOUT ROWID;
+"""
+
+
+def default_store_path(output_path: str) -> str:
+    base, _ = os.path.splitext(output_path)
+    return f"{base}.snapshots.sqlite"
+
+
+def content_hash(entry: Dict) -> str:
+    canonical = json.dumps(entry, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(canonical.encode("utf-8")).hexdigest()
+
+
+def _non_empty(value: Any) -> bool:
+    return isinstance(value, (str, int, float, bool)) and bool(str(value).strip())
+
+
+def entry_fields(entry: Dict) -> Iterator[Tuple[str, Any]]:
+    """Non-empty scalar fields of an entry, with details rows as details.<Label>."""
+    for key, value in entry.items():
+        if key != "id" and _non_empty(value):
+            yield key, value
+    details = entry.get("details")
+    if isinstance(details, list):
+        for row in details:
+            if isinstance(row, dict) and row.get("label") and _non_empty(row.get("value")):
+                yield f"{DETAILS_PREFIX}{row['label']}", row["value"]
+
+
+class SnapshotStore:
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.db = sqlite3.connect(path)
+        version = self.db.execute("PRAGMA user_version").fetchone()[0]
+        if version == 1:
+            self._migrate_v1()
+        elif version not in (0, STORE_VERSION):
+            raise ValueError(f"{path}: unsupported snapshot store version {version}")
+        self.db.executescript(_SCHEMA)
+        self.db.execute(f"PRAGMA user_version = {STORE_VERSION}")
+
+    def _migrate_v1(self) -> None:
+        # Version 1 kept one versions row per distinct (id, hash), with the JSON inline
+        self.db.executescript("""
+            BEGIN;
+            ALTER TABLE versions RENAME TO versions_v1;
+            CREATE TABLE contents (id TEXT NOT NULL, hash TEXT NOT NULL, data TEXT NOT NULL, PRIMARY KEY (id, hash)) WITHOUT ROWID;
+            INSERT INTO contents SELECT id, hash, data FROM versions_v1;
+            CREATE TABLE versions (
+                version INTEGER PRIMARY KEY, id TEXT NOT NULL, hash TEXT NOT NULL,
+                build INTEGER NOT NULL REFERENCES builds(build)
+            );
+            INSERT INTO versions SELECT version, id, hash, build FROM versions_v1;
+            DROP TABLE versions_v1;
+            COMMIT;
+        """)
+
+    def close(self) -> None:
+        self.db.close()
+
+    def __enter__(self) -> "SnapshotStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def record(self, entries: Iterable[Dict], source: str = "") -> Tuple[int, int]:
+        """Record one build in a single transaction. Returns (entries seen, new versions):
+        an entry gets a new version when its content differs from its latest one."""
+        seen = 0
+        added = 0
+        with self.db:
+            build = self.db.execute(
+                "INSERT INTO builds (created, source) VALUES (?, ?)",
+                (time.strftime("%Y-%m-%dT%H:%M:%S"), source),
+            ).lastrowid
+            for entry in entries:
+                if not isinstance(entry, dict) or not entry.get("id"):
+                    continue
+                seen += 1
+                entry_id = str(entry["id"])
+                digest = content_hash(entry)
+                latest = self.db.execute(
+                    "SELECT hash FROM versions WHERE id = ? ORDER BY version DESC LIMIT 1", (entry_id,)
+                ).fetchone()
+                if latest and latest[0] == digest:
+                    continue
+                self.db.execute(
+                    "INSERT OR IGNORE INTO contents (id, hash, data) VALUES (?, ?, ?)",
+                    (entry_id, digest, json.dumps(entry, ensure_ascii=False, separators=(",", ":"))),
+                )
+                cur = self.db.execute("INSERT INTO versions (id, hash, build) VALUES (?, ?, ?)", (entry_id, digest, build))
+                added += 1
+                # dict(): a label repeated in details keeps its last value, as when the details are read
+                self.db.executemany(
+                    "INSERT INTO field_values (id, field, version, value) VALUES (?, ?, ?, ?)",
+                    [(entry_id, field, cur.lastrowid, json.dumps(value, ensure_ascii=False)) for field, value in dict(entry_fields(entry)).items()],
+                )
+            self.db.execute("UPDATE builds SET entries = ? WHERE build = ?", (seen, build))
+        return seen, added
+
+    def last_value(self, entry_id: str, field: str) -> Optional[Any]:
+        """Most recent non-empty value of field for entry_id (None if it never had one)."""
+        row = self.db.execute(
+            "SELECT value FROM field_values WHERE id = ? AND field = ? ORDER BY version DESC LIMIT 1",
+            (entry_id, field),
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def last_values(self, entry_id: str) -> Dict[str, Any]:
+        """Most recent non-empty value of every field ever recorded for entry_id."""
+        values: Dict[str, Any] = {}
+        for field, value in self.db.execute(
+            "SELECT field, value FROM field_values WHERE id = ? ORDER BY version",
+            (entry_id,),
+        ):
+            values[field] = json.loads(value)
+        return values
+
+    def restore_view(self, entry_id: str) -> Dict:
+        """An entry assembled from the last non-empty value of each field, in the
+        shape of a previous snapshot entry (details as a label/value list)."""
+        view: Dict[str, Any] = {"id": entry_id}
+        details: List[Dict] = []
+        for field, value in self.last_values(entry_id).items():
+            if field.startswith(DETAILS_PREFIX):
+                details.append({"label": field[len(DETAILS_PREFIX):], "value": value})
+            else:
+                view[field] = value
+        if details:
+            view["details"] = details
+        return view
+
+    def names(self) -> Iterator[Tuple[str, str, str]]:
+        """(id, field, value) for every name and brand name ever recorded."""
+        for entry_id, field, value in self.db.execute(
+            "SELECT id, field, value FROM field_values WHERE field IN ('name', ?) ORDER BY version",
+            (f"{DETAILS_PREFIX}Brand Name",),
+        ):
+            yield entry_id, field, json.loads(value)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "builds": self.db.execute("SELECT COUNT(*) FROM builds").fetchone()[0],
+            "entries": self.db.execute("SELECT COUNT(DISTINCT id) FROM versions").fetchone()[0],
+            "versions": self.db.execute("SELECT COUNT(*) FROM versions").fetchone()[0],
+            "contents": self.db.execute("SELECT COUNT(*) FROM contents").fetchone()[0],
+            "field_values": self.db.execute("SELECT COUNT(*) FROM field_values").fetchone()[0],
+        }
+
+
+def print_snapshot_report(path: str, seen: int, added: int) -> None:
+    print(f"  Snapshot: {path} ({added} new versions of {seen} entries)")
+
+
+def record_catalog(json_path: str, store_path: Optional[str] = None) -> None:
+    """Record a catalog that was just written in its snapshot store, if one is kept
+    (store_path, else <json>.snapshots.sqlite; nothing happens when the file is missing)."""
+    path = store_path or default_store_path(json_path)
+    if not os.path.isfile(path):
+        return
+    with SnapshotStore(path) as store:
+        print_snapshot_report(path, *store.record(iter_entries(json_path), source=os.path.basename(json_path)))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Versioned catalog history in SQLite.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_import = sub.add_parser("import", help="Record JSON catalog files as builds, oldest first")
+    p_import.add_argument("--store", required=True, help="Snapshot store path")
+    p_import.add_argument("files", nargs="+", help="medicines.json snapshots, oldest first")
+    p_stats = sub.add_parser("stats", help="Show store size")
+    p_stats.add_argument("--store", required=True, help="Snapshot store path")
+    p_last = sub.add_parser("last", help="Last non-empty value of a field for an entry")
+    p_last.add_argument("--store", required=True, help="Snapshot store path")
+    p_last.add_argument("--id", required=True, help="Entry id")
+    p_last.add_argument("--field", required=True, help="Field name, or details.<Label>")
+    args = parser.parse_args()
+
+    if args.command != "import" and not os.path.isfile(args.store):
+        print(f"ERROR: Snapshot store not found: {args.store}")
+        return
+    with SnapshotStore(args.store) as store:
+        if args.command == "import":
+            for path in args.files:
+                if not os.path.isfile(path):
+                    print(f"ERROR: Snapshot file not found: {path}")
+                    continue
+                encoding = sniff_encoding(path)
+                seen, added = store.record(iter_entries(path, encoding), source=os.path.basename(path))
+                print(f"Imported: {path} ({encoding}): {added} new versions of {seen} entries")
+            print("\nSummary:")
+            for key, value in store.stats().items():
+                print(f"  {key.replace('_', ' ').capitalize()}: {value}")
+            print(f"  Size: {os.path.getsize(args.store):,} bytes")
+        elif args.command == "stats":
+            for key, value in store.stats().items():
+                print(f"{key.replace('_', ' ').capitalize()}: {value}")
+        else:
+            value = store.last_value(args.id, args.field)
+            print(json.dumps(value, ensure_ascii=False) if value is not None else f"No value recorded for {args.id}.{args.field}")
+
+
+if __name__ == "__main__":
+    main()
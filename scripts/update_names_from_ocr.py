@@ -28,10 +28,13 @@ Notes:
 from __future__ import annotations
 import os
 import re
-import json
 import argparse
+from contextlib import nullcontext
 from typing import Tuple, Optional
 
+from catalog_io import CatalogWriter, iter_entries
+from name_parser import strip_dosage
+
 try:
     from PIL import Image
     import pytesseract
@@ -40,16 +43,12 @@ except Exception as e:  # pragma: no cover - optional dependency notification
     pytesseract = None
 
 
-def load_json(path: str):
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
-
-
-DOSAGE_RE = re.compile(r"\b\d+\s*(?:mg|ml|g)\b", re.IGNORECASE)
 FORM_WORDS = [
     "Tablet", "Tablets", "Capsule", "Capsules", "Injection", "Injections",
     "Gel", "Cream", "Syrup", "Suspension"
 ]
+# Compiled once; checked in FORM_WORDS order so the first listed word still wins
+FORM_WORD_RES = [(w, re.compile(rf"\b{re.escape(w)}\b", re.IGNORECASE)) for w in FORM_WORDS]
 
 
 def ocr_image(path: str) -> str:
@@ -82,15 +81,15 @@ def extract_name_brand(text: str) -> Tuple[Optional[str], Optional[str]]:
         return None, None
 
     # Remove dosage tokens and excessive symbols
-    cleaned = DOSAGE_RE.sub("", best_line)
+    cleaned = strip_dosage(best_line)
     cleaned = re.sub(r"[^A-Za-z0-9 +\-]", " ", cleaned)
     cleaned = re.sub(r"\s+", " ", cleaned).strip()
 
     # If the line contains a form word, trim to include the form word at end
     form_pos = None
     form_word = None
-    for w in FORM_WORDS:
-        m = re.search(rf"\b{re.escape(w)}\b", cleaned, re.IGNORECASE)
+    for w, form_re in FORM_WORD_RES:
+        m = form_re.search(cleaned)
         if m:
             form_pos = m.end()
             form_word = w
@@ -120,6 +119,43 @@ def extract_name_brand(text: str) -> Tuple[Optional[str], Optional[str]]:
     return (name if name else None), brand
 
 
+def update_item(item, args) -> int:
+    """OCR one entry and update its name/brand in place. Returns 1 if it was changed."""
+    images = item.get("images") or ([item.get("image")] if item.get("image") else [])
+    if not images:
+        return 0
+    # Resolve first image path under root/public
+    img_rel = images[0].lstrip("/")  # e.g., medicines/slug/file.jpg
+    img_path = os.path.join(args.root, "public", img_rel.replace("/", os.sep))
+    if not os.path.exists(img_path):
+        # Try direct relative to root
+        img_path = os.path.join(args.root, img_rel.replace("/", os.sep))
+        if not os.path.exists(img_path):
+            print(f"[skip] image not found for {item.get('id')}: {images[0]}")
+            return 0
+
+    try:
+        text = ocr_image(img_path)
+    except Exception as e:
+        print(f"[error] OCR failed for {item.get('id')}: {e}")
+        return 0
+
+    new_name, brand = extract_name_brand(text)
+    if not new_name:
+        print(f"[info] No name detected for {item.get('id')} (kept: {item.get('name')})")
+        return 0
+
+    old_name = item.get("name")
+    if new_name != old_name or (brand and not item.get("brand")):
+        print(f"[change] {item.get('id')}: '{old_name}' -> '{new_name}'" + (f" | brand: {brand}" if brand else ""))
+        if args.apply:
+            item["name"] = new_name
+            if brand:
+                item["brand"] = brand
+            return 1
+    return 0
+
+
 def main():
     ap = argparse.ArgumentParser(description="Update medicine names from OCR of images.")
     ap.add_argument("--root", required=True, help="Project root path. Used to resolve /medicines paths.")
@@ -128,48 +164,20 @@ def main():
     ap.add_argument("--limit", type=int, default=0, help="Limit number of entries to process (0=all)")
     args = ap.parse_args()
 
-    data = load_json(args.json)
     updated = 0
 
-    for i, item in enumerate(data):
-        if args.limit and i >= args.limit:
-            break
-        images = item.get("images") or ([item.get("image")] if item.get("image") else [])
-        if not images:
-            continue
-        # Resolve first image path under root/public
-        img_rel = images[0].lstrip("/")  # e.g., medicines/slug/file.jpg
-        img_path = os.path.join(args.root, "public", img_rel.replace("/", os.sep))
-        if not os.path.exists(img_path):
-            # Try direct relative to root
-            img_path = os.path.join(args.root, img_rel.replace("/", os.sep))
-            if not os.path.exists(img_path):
-                print(f"[skip] image not found for {item.get('id')}: {images[0]}")
-                continue
-
-        try:
-            text = ocr_image(img_path)
-        except Exception as e:
-            print(f"[error] OCR failed for {item.get('id')}: {e}")
-            continue
-
-        new_name, brand = extract_name_brand(text)
-        if not new_name:
-            print(f"[info] No name detected for {item.get('id')} (kept: {item.get('name')})")
-            continue
-
-        old_name = item.get("name")
-        if new_name != old_name or (brand and not item.get("brand")):
-            print(f"[change] {item.get('id')}: '{old_name}' -> '{new_name}'" + (f" | brand: {brand}" if brand else ""))
-            if args.apply:
-                item["name"] = new_name
-                if brand:
-                    item["brand"] = brand
-                updated += 1
+    # Entries are streamed; with --apply every entry (processed or not) is written back in order
+    with (CatalogWriter(args.json, ensure_ascii=True) if args.apply else nullcontext()) as out:
+        for i, item in enumerate(iter_entries(args.json)):
+            if args.limit and i >= args.limit:
+                if out is None:
+                    break
+            else:
+                updated += update_item(item, args)
+            if out is not None:
+                out.write(item)
 
     if args.apply:
-        with open(args.json, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2)
         print(f"Updated {updated} entries and wrote to {args.json}")
     else:
         print("Dry run complete. Use --apply to write changes.")